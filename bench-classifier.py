@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Offline accuracy/latency benchmark: local category classifier vs Claude labels.
+
+Reads listings labelled by Claude (the JSONL that categorize_product_with_anthropic
+records to CATEGORY_LABELS_PATH) and scores the local classifier against them
+with k-fold cross-validation, so no listing is ever classified by an index that
+was built from it. Pass --llm-sample N to also time N live Claude calls.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+)
+
+from category_classifier import (  # noqa: E402
+    CATEGORY_CONFIDENCE_THRESHOLD,
+    CATEGORY_LABELS_PATH,
+    CategoryClassifier,
+    load_labelled_listings,
+)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_local(listings, folds, threshold):
+    predictions = []
+    latencies_us = []
+    for fold in range(folds):
+        train = [l for i, l in enumerate(listings) if i % folds != fold]
+        test = [l for i, l in enumerate(listings) if i % folds == fold]
+        classifier = CategoryClassifier(train)
+        for listing in test:
+            start = time.perf_counter()
+            category, confidence = classifier.classify(
+                listing.get("title", ""), listing.get("description", "")
+            )
+            latencies_us.append((time.perf_counter() - start) * 1e6)
+            predictions.append((listing["category"], category, confidence))
+
+    correct = sum(expected == got for expected, got, _ in predictions)
+    confident = [p for p in predictions if p[2] >= threshold]
+    confident_correct = sum(expected == got for expected, got, _ in confident)
+
+    print(f"\n🏷️  Local classifier ({len(listings)} listings, {folds}-fold)")
+    print(f"   Top-1 agreement with Claude: {correct / len(predictions):.1%}")
+    print(
+        f"   Answered locally at threshold {threshold}: "
+        f"{len(confident) / len(predictions):.1%} of listings"
+    )
+    if confident:
+        print(
+            f"   Agreement on those: {confident_correct / len(confident):.1%} "
+            f"({len(confident) - confident_correct} would differ from Claude)"
+        )
+    print(
+        f"   Latency: p50 {percentile(latencies_us, 50):.1f} µs, "
+        f"p95 {percentile(latencies_us, 95):.1f} µs"
+    )
+
+
+def run_llm(listings, sample):
+    from handleImage import categorize_with_llm
+
+    latencies_ms = []
+    agree = 0
+    for listing in listings[:sample]:
+        start = time.perf_counter()
+        category = categorize_with_llm(listing["title"], listing["description"])
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+        agree += category == listing["category"]
+
+    print(f"\n🤖 Claude ({len(latencies_ms)} live calls)")
+    print(f"   Agreement with its own earlier labels: {agree / len(latencies_ms):.1%}")
+    print(
+        f"   Latency: p50 {percentile(latencies_ms, 50):.0f} ms, "
+        f"p95 {percentile(latencies_ms, 95):.0f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--labels", default=CATEGORY_LABELS_PATH)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument(
+        "--threshold", type=float, default=CATEGORY_CONFIDENCE_THRESHOLD
+    )
+    parser.add_argument(
+        "--llm-sample",
+        type=int,
+        default=0,
+        help="also time this many live Claude calls (needs ANTHROPIC_API_KEY)",
+    )
+    args = parser.parse_args()
+
+    listings = load_labelled_listings(args.labels)
+    if len(listings) < args.folds:
+        print(f"❌ Need at least {args.folds} labelled listings in {args.labels}")
+        print("   Labels are recorded each time Claude categorizes a listing.")
+        sys.exit(1)
+
+    run_local(listings, args.folds, args.threshold)
+    if args.llm_sample:
+        run_llm(listings, args.llm_sample)
+
+
+if __name__ == "__main__":
+    main()
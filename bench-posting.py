@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Benchmark the scripted Kijiji posting engine against a local mock form.
+
+Serves the posting flow from stand_ins.KijijiStandIn and posts --listings ads
+through it with Playwright, reporting per-step and per-listing timings. Pass
+--broken price (or any SELECTORS name) to see where the script hands over to
+the agent, and --agent to time the browser-use agent on the same form (needs
+ANTHROPIC_API_KEY). Set CHROME_PATH to use a Chromium other than Playwright's.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+)
+
+from playwright.async_api import async_playwright  # noqa: E402
+
+from kijiji_poster import (  # noqa: E402
+    POSTING_STEPS,
+    ScriptedStepFailed,
+    post_listing,
+    remaining_instructions,
+)
+from stand_ins import KijijiStandIn  # noqa: E402
+
+PRODUCT_INFO = {
+    "title": "Benchmark bookshelf",
+    "description": "Solid wood, five shelves, minor scratches.",
+    "price": "40",
+    "category": "Books",
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_scripted(kijiji, listings):
+    step_timings = {name: [] for name, _, _ in POSTING_STEPS}
+    totals = []
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(
+            executable_path=os.environ.get("CHROME_PATH"), headless=True
+        )
+        page = await browser.new_page()
+        for _ in range(listings):
+            start = time.perf_counter()
+            try:
+                timings = await post_listing(
+                    page, PRODUCT_INFO, base_url=kijiji.url, timeout_ms=2000
+                )
+            except ScriptedStepFailed as e:
+                print(f"\n↪️  {e}")
+                print("   The agent would take over with:")
+                print(f"   {remaining_instructions(PRODUCT_INFO, e.index, kijiji.url)}")
+                break
+            totals.append((time.perf_counter() - start) * 1000)
+            for name, ms in timings.items():
+                step_timings[name].append(ms)
+        await browser.close()
+
+    if not totals:
+        return None
+
+    print(f"\n📝 Scripted engine ({len(totals)} listings)")
+    for name, values in step_timings.items():
+        print(
+            f"   {name:<16} mean {statistics.mean(values):7.1f} ms   "
+            f"p95 {percentile(values, 95):7.1f} ms"
+        )
+    print(
+        f"   per listing      mean {statistics.mean(totals):7.1f} ms   "
+        f"p95 {percentile(totals, 95):7.1f} ms"
+    )
+    print(f"   throughput       {60000 / statistics.mean(totals):.1f} listings/min")
+    return statistics.mean(totals)
+
+
+async def run_agent(kijiji):
+    from browser_use import Agent, Browser, ChatAnthropic
+
+    browser = Browser(headless=True, executable_path=os.environ.get("CHROME_PATH"))
+    llm = ChatAnthropic(model="claude-sonnet-4-0", temperature=0.0)
+    agent = Agent(
+        task=remaining_instructions(PRODUCT_INFO, base_url=kijiji.url),
+        browser_session=browser,
+        llm=llm,
+    )
+    start = time.perf_counter()
+    try:
+        history = await agent.run()
+    finally:
+        await browser.kill()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print("\n🤖 browser-use agent (1 listing)")
+    print(f"   per listing      {elapsed:7.1f} ms in {history.number_of_steps()} steps")
+    if history.usage:
+        print(f"   tokens           {history.usage.total_tokens}")
+    print(f"   posted           {'yes' if kijiji.ads else 'no'}")
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listings", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="mock server delay per request (s)"
+    )
+    parser.add_argument(
+        "--broken", action="append", default=[], help="selector name to break"
+    )
+    parser.add_argument(
+        "--agent", action="store_true", help="also time the LLM agent path"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"🧪 Benchmarking Kijiji posting against a mock form ({args.latency}s/request)"
+    )
+    with KijijiStandIn(latency=args.latency, broken=args.broken) as kijiji:
+        scripted_ms = await run_scripted(kijiji, args.listings)
+
+    if args.agent:
+        with KijijiStandIn(latency=args.latency) as kijiji:
+            agent_ms = await run_agent(kijiji)
+        if scripted_ms:
+            print(f"\n⚡ Scripted engine is {agent_ms / scripted_ms:.0f}x faster")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Live benchmark of Anthropic prompt caching per call site.
+
+Streams --calls requests for analyze_image and categorize_product_with_anthropic
+with the static system prompt cached and uncached, and reports time to first
+token, total latency, and uncached / cache-read / cache-write input tokens with
+the relative input cost. First prints each call site's static prefix size
+from count_tokens, against the 1024-token minimum below which nothing is
+cached. Needs ANTHROPIC_API_KEY (it makes real calls).
+"""
+
+import argparse
+import base64
+import io
+import os
+import statistics
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+)
+
+from handleImage import (  # noqa: E402
+    build_analysis_request,
+    build_categorize_request,
+    client,
+)
+
+# Input price multipliers relative to uncached input tokens
+CACHE_READ_COST = 0.1
+CACHE_WRITE_COST = 1.25
+# Shortest prefix Sonnet will cache
+CACHE_MIN_TOKENS = 1024
+
+LISTINGS = [
+    ("IKEA Billy bookcase", "White, 5 shelves, some scuffs on the side."),
+    ("Sony WH-1000XM4 headphones", "Noise cancelling, case and cable included."),
+    ("Trek mountain bike", "Medium frame, new tires, shifts smoothly."),
+    ("KitchenAid stand mixer", "Red, 5 quart bowl, works perfectly."),
+]
+
+
+def photo() -> str:
+    image = Image.new("RGB", (800, 600), "navy")
+    ImageDraw.Draw(image).rectangle((200, 150, 600, 450), fill="white")
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=85)
+    return base64.b64encode(output.getvalue()).decode()
+
+
+def without_cache(request: dict) -> dict:
+    system = [
+        {key: value for key, value in block.items() if key != "cache_control"}
+        for block in request["system"]
+    ]
+    return {**request, "system": system}
+
+
+def with_cache(request: dict) -> dict:
+    # Marked here whatever PROMPT_CACHE says, so both modes are measured
+    system = without_cache(request)["system"]
+    system[-1] = {**system[-1], "cache_control": {"type": "ephemeral"}}
+    return {**request, "system": system}
+
+
+def prefix_tokens(request: dict) -> int:
+    """Tokens in the tools + system prefix, without the per-call content"""
+    counted = {
+        key: request[key]
+        for key in ("model", "system", "tools", "tool_choice")
+        if key in request
+    }
+    empty = client.messages.count_tokens(
+        **counted, messages=[{"role": "user", "content": "x"}]
+    )
+    return empty.input_tokens
+
+
+def timed_stream(request: dict):
+    start = time.perf_counter()
+    first_token = None
+    with client.messages.stream(**request) as stream:
+        for event in stream:
+            if first_token is None and event.type == "content_block_delta":
+                first_token = time.perf_counter() - start
+        message = stream.get_final_message()
+    return first_token, time.perf_counter() - start, message.usage
+
+
+def run(requests, cached: bool):
+    ttfts, totals = [], []
+    tokens = {"input": 0, "cache_read": 0, "cache_write": 0}
+    for request in requests:
+        ttft, total, usage = timed_stream(
+            with_cache(request) if cached else without_cache(request)
+        )
+        ttfts.append(ttft * 1000)
+        totals.append(total * 1000)
+        tokens["input"] += usage.input_tokens
+        tokens["cache_read"] += usage.cache_read_input_tokens or 0
+        tokens["cache_write"] += usage.cache_creation_input_tokens or 0
+
+    cost = (
+        tokens["input"]
+        + tokens["cache_read"] * CACHE_READ_COST
+        + tokens["cache_write"] * CACHE_WRITE_COST
+    )
+    label = "cached" if cached else "uncached"
+    print(
+        f"   {label:<9} TTFT p50 {statistics.median(ttfts):7.0f} ms   "
+        f"total p50 {statistics.median(totals):7.0f} ms   "
+        f"input {tokens['input']:6}  read {tokens['cache_read']:6}  "
+        f"write {tokens['cache_write']:6}  (cost {cost:,.0f} input-token units)"
+    )
+    return {"ttft": statistics.median(ttfts), "cost": cost}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=8)
+    args = parser.parse_args()
+
+    image = photo()
+    call_sites = {
+        "analyze_image": [
+            build_analysis_request(image, "image/jpeg") for _ in range(args.calls)
+        ],
+        "categorize_product_with_anthropic": [
+            build_categorize_request(*LISTINGS[n % len(LISTINGS)])
+            for n in range(args.calls)
+        ],
+    }
+
+    print(f"🧪 Prompt caching, {args.calls} calls per call site and mode")
+    for call_site, requests in call_sites.items():
+        tokens = prefix_tokens(requests[0])
+        print(f"\n📞 {call_site}")
+        print(
+            f"   📏 static prefix {tokens} tokens "
+            + (
+                "(cacheable)"
+                if tokens >= CACHE_MIN_TOKENS
+                else f"(under the {CACHE_MIN_TOKENS}-token minimum, never cached)"
+            )
+        )
+        uncached = run(requests, cached=False)
+        cached = run(requests, cached=True)
+        print(
+            f"   ⚡ TTFT {uncached['ttft'] - cached['ttft']:+.0f} ms saved, "
+            f"input cost {1 - cached['cost'] / uncached['cost']:.0%} lower"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark of the MCP server against local stand-ins.
+
+Starts stand-ins for the Anthropic API, Kijiji, DuckDuckGo and the Poke
+webhook (each with its own --*-latency), points the server at them, submits
+--searches and --posts jobs through the MCP tools and waits for them with
+wait_for_job. Reports throughput and p50/p95/p99 latency of completed jobs,
+time spent in each job stage and peak RSS (server plus browsers), and writes
+the numbers to a JSON file so runs can be compared. Needs a local Chromium
+for browser-use.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import psutil
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+)
+
+from stand_ins import (  # noqa: E402
+    AnthropicStandIn,
+    DuckDuckGoStandIn,
+    KijijiStandIn,
+    PokeWebhookStandIn,
+)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(values_ms) -> dict:
+    if not values_ms:
+        return {}
+    return {
+        "count": len(values_ms),
+        "mean": round(statistics.mean(values_ms), 1),
+        "p50": round(percentile(values_ms, 50), 1),
+        "p95": round(percentile(values_ms, 95), 1),
+        "p99": round(percentile(values_ms, 99), 1),
+        "max": round(max(values_ms), 1),
+    }
+
+
+class PeakRSS:
+    """Samples the RSS of this process and its children (browsers) in a thread"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        process = psutil.Process()
+        while not self._stop.is_set():
+            total = 0
+            for proc in [process, *process.children(recursive=True)]:
+                try:
+                    total += proc.memory_info().rss
+                except psutil.Error:
+                    pass
+            self.peak_mb = max(self.peak_mb, total / (1024 * 1024))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def configure_environment(args, tmp, anthropic, kijiji, duckduckgo, poke):
+    """Point every external dependency at a stand-in and keep state in ``tmp``"""
+    accounts = {
+        f"bench-{n}": {"username": f"bench-{n}", "password": "bench"}
+        for n in range(1, args.accounts + 1)
+    }
+    os.environ.update(
+        {
+            "ANTHROPIC_BASE_URL": anthropic.url,
+            "ANTHROPIC_API_KEY": "bench-key",
+            "KIJIJI_BASE_URL": kijiji.url,
+            "KIJIJI_ACCOUNTS": json.dumps(accounts),
+            "KIJIJI_SESSION_DIR": os.path.join(tmp, "sessions"),
+            "DUCKDUCKGO_URL": duckduckgo.url,
+            "POKE_WEBHOOK_URL": poke.url,
+            "POKE_API_KEY": "bench-key",
+            "SCHEDULER_WORKERS": str(args.workers),
+            "SCHEDULER_MAX_QUEUE": str(args.searches + args.posts),
+            "JOB_STORE_PATH": os.path.join(tmp, "jobs.db"),
+            "CATEGORY_CACHE_PATH": os.path.join(tmp, "category_cache.db"),
+            "CATEGORY_LABELS_PATH": os.path.join(tmp, "labelled_listings.jsonl"),
+            "NOTIFY_OUTBOX_PATH": os.path.join(tmp, "outbox.db"),
+            "BROWSER_HEADLESS": "true",
+            "INBOX_POLL_MIN": "0.2",
+            "INBOX_WATCH_TIMEOUT": str(args.timeout),
+        }
+    )
+    return sorted(accounts)
+
+
+async def run_jobs(args, accounts):
+    import server
+    from fastmcp import Client
+    from job_store import FINISHED_STATUSES, job_stage, job_store
+
+    # (perf_counter, stage) transitions per job, recorded as the store updates
+    stage_log = {}
+    finished_at = {}
+
+    def record(job_id):
+        job = job_store.get(job_id)
+        if job is None:
+            return
+        now = time.perf_counter()
+        log = stage_log.setdefault(job_id, [])
+        stage = job_stage(job)
+        if not log or log[-1][1] != stage:
+            log.append((now, stage))
+        if job["status"] in FINISHED_STATUSES:
+            finished_at.setdefault(job_id, now)
+
+    unwatch = job_store.watch(None, record)
+    server.scheduler.start()
+    server.outbox.start()
+
+    submitted = []
+    async with Client(server.mcp) as client:
+        start = time.perf_counter()
+        for n in range(args.searches):
+            submitted_at = time.perf_counter()
+            result = await client.call_tool("search_web", {"query": f"bench {n}"})
+            submitted.append(("search", submitted_at, result.data))
+        for n in range(args.posts):
+            submitted_at = time.perf_counter()
+            result = await client.call_tool(
+                "post_to_kijiji",
+                {
+                    "title": f"Bench bookshelf {n}",
+                    "description": "Solid wood, five shelves, minor scratches.",
+                    "price": "40",
+                    "account": accounts[n % len(accounts)],
+                },
+            )
+            submitted.append(("post", submitted_at, result.data))
+
+        waits = [
+            client.call_tool(
+                "wait_for_job", {"job_id": data["job_id"], "timeout": args.timeout}
+            )
+            for _, _, data in submitted
+            if data.get("job_id")
+        ]
+        finals = {
+            result.data["job_id"]: result.data
+            for result in await asyncio.gather(*waits)
+        }
+        wall = time.perf_counter() - start
+
+    unwatch()
+    server.outbox.stop()
+    return submitted, finals, stage_log, finished_at, wall
+
+
+def build_report(args, submitted, finals, stage_log, finished_at, wall, peak_mb):
+    latencies = {"search": [], "post": []}
+    stages = {}
+    statuses = {}
+    for kind, submitted_at, data in submitted:
+        job_id = data.get("job_id")
+        final = finals.get(job_id, {"status": data.get("status", "rejected")})
+        statuses[final["status"]] = statuses.get(final["status"], 0) + 1
+        if final["status"] == "completed" and job_id in finished_at:
+            latencies[kind].append((finished_at[job_id] - submitted_at) * 1000)
+
+        transitions = stage_log.get(job_id, [])
+        for (entered, stage), (left, _) in zip(transitions, transitions[1:]):
+            stages.setdefault(f"{kind}.{stage}", []).append((left - entered) * 1000)
+
+    all_latencies = latencies["search"] + latencies["post"]
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "jobs": len(submitted),
+        "statuses": statuses,
+        "wall_seconds": round(wall, 2),
+        "throughput_jobs_per_min": round(len(all_latencies) / wall * 60, 2),
+        "latency_ms": summarize(all_latencies),
+        "latency_ms_by_kind": {
+            kind: summarize(values) for kind, values in latencies.items() if values
+        },
+        "stages_ms": {stage: summarize(values) for stage, values in stages.items()},
+        "peak_rss_mb": round(peak_mb, 1),
+    }
+
+
+def print_report(report):
+    print(
+        f"\n📊 {report['jobs']} jobs in {report['wall_seconds']}s: {report['statuses']}"
+    )
+    print(f"   throughput   {report['throughput_jobs_per_min']} jobs/min")
+    latency = report["latency_ms"]
+    if latency:
+        print(
+            f"   latency      p50 {latency['p50']} ms   p95 {latency['p95']} ms   "
+            f"p99 {latency['p99']} ms"
+        )
+    for stage, stats in sorted(report["stages_ms"].items()):
+        print(
+            f"   {stage:<22} mean {stats['mean']:9.1f} ms   p95 {stats['p95']:9.1f} ms"
+        )
+    print(f"   peak RSS     {report['peak_rss_mb']} MB")
+    print(f"   stand-ins    {report['stand_in_requests']}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--searches", type=int, default=10)
+    parser.add_argument("--posts", type=int, default=10)
+    parser.add_argument("--accounts", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--anthropic-latency", type=float, default=1.0)
+    parser.add_argument("--kijiji-latency", type=float, default=0.1)
+    parser.add_argument("--duckduckgo-latency", type=float, default=0.1)
+    parser.add_argument("--poke-latency", type=float, default=0.2)
+    parser.add_argument(
+        "--output", default=None, help="JSON file (default bench-results/server-*.json)"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"🧪 Benchmarking {args.searches} searches + {args.posts} postings "
+        f"on {args.workers} workers against local stand-ins..."
+    )
+    with tempfile.TemporaryDirectory() as tmp, AnthropicStandIn(
+        latency=args.anthropic_latency
+    ) as anthropic, KijijiStandIn(
+        latency=args.kijiji_latency
+    ) as kijiji, DuckDuckGoStandIn(
+        latency=args.duckduckgo_latency
+    ) as duckduckgo, PokeWebhookStandIn(
+        latency=args.poke_latency
+    ) as poke:
+        accounts = configure_environment(args, tmp, anthropic, kijiji, duckduckgo, poke)
+        with PeakRSS() as rss:
+            submitted, finals, stage_log, finished_at, wall = await run_jobs(
+                args, accounts
+            )
+        report = build_report(
+            args, submitted, finals, stage_log, finished_at, wall, rss.peak_mb
+        )
+        report["stand_in_requests"] = {
+            "anthropic": len(anthropic.requests),
+            "kijiji": len(kijiji.requests),
+            "duckduckgo": len(duckduckgo.requests),
+            "poke": len(poke.requests),
+        }
+
+    print_report(report)
+    output = args.output or os.path.join(
+        "bench-results", f"server-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Cold-start benchmark of the MCP server.
+
+Runs ``import server`` under ``python -X importtime`` and reports the
+cumulative import time of each module the server pulls in (the --top
+slowest), then starts server.py on a free port and measures how long it
+takes until /mcp answers greet and get_server_info. Results are written to a
+JSON file so runs can be compared. Needs no API keys or browser.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(ROOT, "mcp", "src")
+
+
+def bench_environment(tmp: str) -> dict:
+    env = dict(os.environ)
+    env.update(
+        {
+            "JOB_STORE": "memory",
+            "CATEGORY_CACHE_PATH": os.path.join(tmp, "category_cache.db"),
+            "NOTIFY_OUTBOX_PATH": os.path.join(tmp, "outbox.db"),
+            "PYTHONDONTWRITEBYTECODE": "1",
+        }
+    )
+    return env
+
+
+def import_times(env: dict) -> dict:
+    """``{module: cumulative seconds}`` from ``-X importtime`` for ``import server``"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=SRC,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if depth == 0 and name == "server":
+            times[name] = int(cumulative) / 1e6
+        elif depth == 1:
+            # What server imports directly, summed per top-level package
+            package = name.split(".")[0]
+            times[package] = times.get(package, 0) + int(cumulative) / 1e6
+    return times
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def time_to_first_response(env: dict, timeout: float) -> dict:
+    """Start server.py and poll /mcp until greet and get_server_info answer"""
+    from fastmcp import Client
+
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "server.py"],
+        cwd=SRC,
+        env={**env, "PORT": str(port)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                async with Client(f"http://127.0.0.1:{port}/mcp") as client:
+                    await client.call_tool("greet", {"name": "bench"})
+                    greet = time.perf_counter() - start
+                    info = await client.call_tool("get_server_info", {})
+                    return {
+                        "greet_seconds": round(greet, 3),
+                        "server_info_seconds": round(time.perf_counter() - start, 3),
+                        "kijiji_integration": info.data.get("kijiji_integration"),
+                    }
+            except Exception:
+                await asyncio.sleep(0.05)
+        raise TimeoutError(f"server did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="JSON file (default bench-results/startup-*.json)",
+    )
+    args = parser.parse_args()
+
+    print(f"🧪 Measuring server cold start over {args.runs} runs...")
+    with tempfile.TemporaryDirectory() as tmp:
+        env = bench_environment(tmp)
+        runs = [import_times(env) for _ in range(args.runs)]
+        modules = {name: min(run.get(name, 0) for run in runs) for name in runs[0]}
+        starts = [
+            await time_to_first_response(env, args.timeout) for _ in range(args.runs)
+        ]
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "import_server_seconds": modules.get("server"),
+        "import_seconds": dict(
+            sorted(modules.items(), key=lambda item: item[1], reverse=True)
+        ),
+        "first_response": starts,
+    }
+
+    print(f"\n📦 import server: {report['import_server_seconds']:.3f}s (best run)")
+    slowest = [item for item in report["import_seconds"].items() if item[0] != "server"]
+    for name, seconds in slowest[: args.top]:
+        print(f"   {name:<28} {seconds * 1000:8.1f} ms")
+    print("\n⏱️ Time until /mcp answers")
+    for run in starts:
+        print(
+            f"   greet {run['greet_seconds']:.2f}s   get_server_info "
+            f"{run['server_info_seconds']:.2f}s   (kijiji {run['kijiji_integration']})"
+        )
+
+    output = args.output or os.path.join(
+        "bench-results", f"startup-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
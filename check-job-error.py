@@ -12,9 +12,10 @@ async def check_error():
         job_id = job_result.data["job_id"]
         print(f"Started job: {job_id}")
 
-        # Wait and check error
-        await asyncio.sleep(15)
-        status_result = await client.call_tool("get_search_status", {"job_id": job_id})
+        # Wait (up to 15 seconds) for the job to finish and check the error
+        status_result = await client.call_tool(
+            "wait_for_job", {"job_id": job_id, "timeout": 15}
+        )
         status = status_result.data
 
         print(f"Status: {status['status']}")
@@ -1,71 +1,250 @@
-from browser_use import Agent, Browser, ChatAnthropic
+from browser_use import Agent
 from dotenv import load_dotenv
+from browser_pool import agent_llm, get_browser_pool
+from kijiji_poster import (
+    KIJIJI_SCRIPTED_POSTING,
+    ScriptedStepFailed,
+    post_listing_in_session,
+    remaining_instructions,
+)
+from kijiji_session import ensure_logged_in
+from inbox_watcher import INBOX_URL, InboxUnreadable, InboxWatcher
+from metrics import record_agent_usage, stage_timer
 import asyncio
 import os
+from contextlib import asynccontextmanager
 
 load_dotenv()
 
+# Replies the agent may send before the negotiation is abandoned
+NEGOTIATION_MAX_REPLIES = int(os.environ.get("NEGOTIATION_MAX_REPLIES", 20))
+MEETUP_AGREED = "MEETUP AGREED"
+# Per-stage deadlines in seconds; login and form fill fail the job when
+# exceeded, negotiation just ends (the listing is already up)
+POST_LOGIN_TIMEOUT = float(os.environ.get("POST_LOGIN_TIMEOUT", 300))
+POST_FORM_TIMEOUT = float(os.environ.get("POST_FORM_TIMEOUT", 600))
+NEGOTIATION_TIMEOUT = float(os.environ.get("NEGOTIATION_TIMEOUT", 12 * 3600))
 
-async def main(product_info=None):
-    llm = ChatAnthropic(model="claude-sonnet-4-0", temperature=0.0)
-
-    browser = Browser(
-        headless=False, window_size={"width": 1000, "height": 700}, keep_alive=True
-    )
-
-    await browser.start()
-
-    task = f"""Go to kijiji.ca and sign in with these credentials (in 2 separate text fields):
-    - Username: {os.getenv("KIJIJI_USERNAME")}
-    - Password: {os.getenv("KIJIJI_PASSWORD")}
-    and complete the sign-in process."""
-
-    agent = Agent(
-        task=task,
-        browser_session=browser,
-        llm=llm,
-    )
-
-    await agent.run()
-
-    if product_info:
-        title = product_info.get("title", "sample product")
-        description = product_info.get("description", "sample description here")
-        price = product_info.get("price", "13")
-        category = product_info.get("category", "Books")
-    else:
-        title = "sample product"
-        description = "sample description here"
-        price = "13"
-        category = "Books"
-
-    task2 = f"""Go to https://www.kijiji.ca/p-select-category.html. Click Alberta and then click Red Deer. Click Go. Go to post ad button again
-    - Click x on the middle right to close the popup
-    - Title (text input): {title}
-    - Category Buy and Sell
-    - Select a category that is {category}
-    - If you are on a subcategory page, select a random subcategory
-    - Select Im offering for ad type
-    - Select for sale by owner
-    - Description (text input): {description}
-    - In the location field, enter Markham, Ontario L6C 2W6
-    - DO NOT CLICK SELECT IMAGES
-    - Enter the price (input field): '{price}'
-    - Click the Post Your Ad button at the bottom of the page to finish the process
-    -Check only my most recent (first) conversation on Kijiji. You are acting as a seller for my item and your goal is to sell the item to the interested buyer.
+
+class StageTimeout(Exception):
+    """A posting stage ran past its deadline"""
+
+
+@asynccontextmanager
+async def stage_deadline(stage: str, seconds: float):
+    deadline = asyncio.timeout(seconds)
+    try:
+        async with deadline:
+            yield
+    except TimeoutError:
+        if deadline.expired():
+            raise StageTimeout(
+                f"Kijiji {stage} took longer than {seconds:g} seconds"
+            ) from None
+        raise
+
+
+async def main(product_info=None, username=None, password=None, on_stage=None):
+    """Post one listing and return the inbox fingerprint for ``negotiate_listing``"""
+    llm = agent_llm()
+
+    async with get_browser_pool().session() as browser:
+        return await run_posting(
+            llm, browser, product_info, username, password, on_stage
+        )
+
+
+async def run_posting(
+    llm, browser, product_info=None, username=None, password=None, on_stage=None
+):
+    # on_stage(name) reports progress, e.g. to the job store
+    on_stage = on_stage or (lambda stage: None)
+
+    on_stage("login")
+    await log_in(llm, browser, username, password)
+
+    product_info = {
+        "title": "sample product",
+        "description": "sample description here",
+        "price": "13",
+        "category": "Books",
+        **(product_info or {}),
+    }
+
+    on_stage("form_fill")
+    await post_listing_form(llm, browser, product_info)
+    on_stage("posted")
+    return await read_last_seen(browser)
+
+
+async def read_last_seen(browser):
+    """Fingerprint of the inbox right after posting, so the negotiation only
+    answers messages that arrive later; None if the inbox cannot be read"""
+    try:
+        return await InboxWatcher(browser).mark_seen()
+    except InboxUnreadable as e:
+        print(f"⚠️ {e} - the negotiation will start from an unread inbox")
+        return None
+
+
+async def negotiate_listing(
+    price, username=None, password=None, last_seen=None, on_stage=None
+):
+    """Answer buyers about a posted listing in a browser session of its own.
+
+    Runs as a job separate from the posting, so hours of waiting on buyers
+    never hold up the posting's account or its worker slot.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    llm = agent_llm()
+
+    async with get_browser_pool().session() as browser:
+        on_stage("login")
+        await log_in(llm, browser, username, password)
+
+        on_stage("negotiating")
+        with stage_timer("negotiate"):
+            return await negotiate(
+                llm, browser, price, NEGOTIATION_TIMEOUT, last_seen=last_seen
+            )
+
+
+async def post_many(
+    product_infos, username=None, password=None, on_stage=None, on_item=None
+):
+    """Post several listings in one browser session with a single login.
+
+    Items are posted one after another; one that fails is reported through
+    ``on_item(index, "failed", error)`` and the rest still go up. There is no
+    buyer negotiation here. Returns the number of items posted.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    on_item = on_item or (lambda index, status, error=None: None)
+    llm = agent_llm()
+
+    async with get_browser_pool().session() as browser:
+        on_stage("login")
+        await log_in(llm, browser, username, password)
+
+        on_stage("posting")
+        posted = 0
+        for index, product_info in enumerate(product_infos):
+            on_item(index, "posting")
+            try:
+                await post_listing_form(llm, browser, product_info)
+            except Exception as e:
+                print(f"❌ Bulk item {index + 1} failed: {e}")
+                on_item(index, "failed", str(e))
+                continue
+            posted += 1
+            on_item(index, "posted")
+        return posted
+
+
+async def log_in(llm, browser, username=None, password=None):
+    # Skips the sign-in agent entirely when the saved session is still valid
+    with stage_timer("login"):
+        async with stage_deadline("login", POST_LOGIN_TIMEOUT):
+            await ensure_logged_in(
+                browser,
+                llm,
+                username or os.getenv("KIJIJI_USERNAME"),
+                password or os.getenv("KIJIJI_PASSWORD"),
+            )
+
+
+async def post_listing_form(llm, browser, product_info: dict):
+    """Fill in and submit one listing on a logged-in session, within
+    POST_FORM_TIMEOUT: the scripted engine first, the agent for whatever
+    it could not do."""
+    async with stage_deadline("form fill", POST_FORM_TIMEOUT):
+        posting_task = remaining_instructions(product_info)
+        submitted = False
+        if KIJIJI_SCRIPTED_POSTING:
+            try:
+                timings = await post_listing_in_session(browser, product_info)
+                print(f"📝 Posted with the scripted engine: {timings}")
+                posting_task = ""
+            except ScriptedStepFailed as e:
+                print(f"⚠️ {e} - handing the rest of the form to the agent")
+                posting_task = remaining_instructions(product_info, e.index)
+                submitted = e.submitted
+            except Exception as e:
+                print(f"⚠️ Scripted posting unavailable, using the agent: {e}")
+
+        if posting_task:
+            # The agent fills the rest of the form and submits it in one run,
+            # or only checks the ad is live if the script already submitted it
+            with stage_timer("form_fill"):
+                agent = Agent(task=posting_task, browser_session=browser, llm=llm)
+                history = await agent.run()
+                record_agent_usage("agent.post_form", history)
+            if submitted and not history.is_successful():
+                raise RuntimeError(
+                    f"Submitted '{product_info['title']}' but could not confirm it is live on Kijiji"
+                )
+
+
+async def negotiate(
+    llm, browser, price, timeout: float = NEGOTIATION_TIMEOUT, last_seen=None
+):
+    """Answer buyer messages until a meetup is agreed, nobody writes back or
+    ``timeout`` seconds have passed.
+
+    The inbox watcher does the waiting with plain page reads; the LLM agent
+    only runs once per new buyer message, to write a single reply. Only
+    conversations that changed since ``last_seen`` (see ``read_last_seen``)
+    count as new.
+    """
+    reply_task = f"""Go to {INBOX_URL} and open only my most recent (first) conversation. You are acting as a seller for my item and your goal is to sell the item to the interested buyer.
+    You should not need to scroll the page at all.
+    Only send a message if the interested buyer has started the conversation or responded to my last message, otherwise finish with WAITING without sending anything.
+    Send at most one reply to the buyer's latest message, then stop.
+    To end the conversation, discuss a location and time to meetup with the buyer.
+    The price of the item is {price}. If the buyer tries to offer a lower price, you should negotiate and counteroffer a price somewhere between the price and the buyers offer
+    Ensure you correctly click the sendButton after drafting the message.
+    Finish with {MEETUP_AGREED} if the buyer has agreed to a meetup location and time, otherwise finish with WAITING."""
+
+    # Used when the watcher cannot read the inbox: the agent waits by itself
+    agent_task = f"""Check only my most recent (first) conversation on Kijiji at {INBOX_URL}. You are acting as a seller for my item and your goal is to sell the item to the interested buyer.
     You should not need to scroll the page at all.
-    Only send a message if the interested buyer has started the conversation or responded to my last message, otherwise wait for a response. 
+    Only send a message if the interested buyer has started the conversation or responded to my last message, otherwise wait for a response.
     To end the conversation, discuss a location and time to meetup with the buyer.
     While waiting, return to the Messages List page and click back into the most recent (first) conversation to check for new messages.
     The price of the item is {price}. If the buyer tries to offer a lower price, you should negotiate and counteroffer a price somewhere between the price and the buyers offer
     Ensure you correctly click the sendButton after drafting the message."""
 
-    agent.add_new_task(task2)
+    watcher = InboxWatcher(browser, last_seen=last_seen)
+    history = None
+    try:
+        async with stage_deadline("negotiation", timeout):
+            try:
+                for _ in range(NEGOTIATION_MAX_REPLIES):
+                    if await watcher.wait_for_buyer_message() is None:
+                        print("⌛ No new buyer messages, ending negotiation")
+                        break
+                    agent = Agent(task=reply_task, browser_session=browser, llm=llm)
+                    history = await agent.run()
+                    record_agent_usage("agent.negotiate", history)
+                    if MEETUP_AGREED in (history.final_result() or ""):
+                        break
+            except InboxUnreadable as e:
+                print(f"⚠️ {e} - handing the negotiation to the agent")
+                agent = Agent(task=agent_task, browser_session=browser, llm=llm)
+                history = await agent.run()
+                record_agent_usage("agent.negotiate", history)
+    except StageTimeout as e:
+        print(f"⌛ {e}, ending negotiation")
+    return history
 
-    await agent.run()
 
-    await browser.kill()
+async def run_standalone():
+    try:
+        last_seen = await main()
+        await negotiate_listing("13", last_seen=last_seen)
+    finally:
+        await get_browser_pool().close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(run_standalone())
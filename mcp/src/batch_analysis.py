@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import os
+
+from handleImage import build_multi_image_request, stream_analysis
+from image_preprocess import preprocess_image
+
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", 4))
+
+
+def group_images(images) -> list:
+    """Group image indexes by item.
+
+    Only images that share an ``item`` key are combined. Untagged photos are
+    each their own item - perceptual hashes of plain product shots on a white
+    background collide across different items, and a wrong merge silently
+    loses a listing.
+    """
+    groups = {}
+    for index, image in enumerate(images):
+        key = image.get("item", ("photo", index))
+        groups.setdefault(key, []).append(index)
+    return list(groups.values())
+
+
+def prepare_image(image: dict):
+    return preprocess_image(image["data"], image.get("media_type", "image/jpeg"))
+
+
+async def analyze_item(indexes, prepared, semaphore, on_field=None) -> dict:
+    """One multi-image Claude call for the photos of a single item"""
+    request = build_multi_image_request(
+        [(prepared[i][0], prepared[i][1]) for i in indexes]
+    )
+    async with semaphore:
+        product_info = await stream_analysis(request, on_field)
+    product_info["images"] = indexes
+    return product_info
+
+
+async def analyze_images_batch(
+    images: list, max_concurrency: int = BATCH_MAX_CONCURRENCY, on_field=None
+) -> list:
+    """Analyze many photos, returning one product_info per item.
+
+    ``images`` is a list of ``{"data": base64, "media_type": "image/jpeg",
+    "item": optional grouping key}``. Items are analyzed concurrently with at
+    most ``max_concurrency`` Claude calls in flight. Each result lists the
+    indexes of the photos it was built from; an item that fails carries an
+    ``error`` instead of listing details. ``on_field(item, name, value)``
+    is called as each item's fields finish streaming, ``item`` being its
+    position in the result.
+    """
+    prepared = await asyncio.gather(
+        *(asyncio.to_thread(prepare_image, image) for image in images),
+        return_exceptions=True,
+    )
+
+    # A photo that cannot be prepared becomes its own failed item; the rest
+    # of its group is still analyzed
+    entries = []
+    for indexes in group_images(images):
+        for i in indexes:
+            if isinstance(prepared[i], Exception):
+                print(f"Error preparing photo {i}: {prepared[i]}")
+                entries.append({"images": [i], "error": str(prepared[i])})
+        indexes = [i for i in indexes if not isinstance(prepared[i], Exception)]
+        if indexes:
+            entries.append(indexes)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    analyzed = [
+        (item, entry) for item, entry in enumerate(entries) if isinstance(entry, list)
+    ]
+    results = await asyncio.gather(
+        *(
+            analyze_item(
+                indexes,
+                prepared,
+                semaphore,
+                on_field and functools.partial(on_field, item),
+            )
+            for item, indexes in analyzed
+        ),
+        return_exceptions=True,
+    )
+
+    items = list(entries)
+    for (item, indexes), result in zip(analyzed, results):
+        if isinstance(result, Exception):
+            print(f"Error analyzing photos {indexes}: {result}")
+            items[item] = {"images": indexes, "error": str(result)}
+        else:
+            items[item] = result
+    return items
@@ -0,0 +1,205 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from browser_use import Browser, ChatAnthropic
+from handleImage import get_async_http_client
+from job_process import process_tree_rss_mb
+from kijiji_session import KIJIJI_ORIGIN
+from metrics import ACTIVE_BROWSERS, observe_stage
+from scheduler import scheduler
+
+BROWSER_POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", 1))
+BROWSER_MAX_USES = int(os.environ.get("BROWSER_MAX_USES", 20))
+BROWSER_MAX_RSS_MB = float(os.environ.get("BROWSER_MAX_RSS_MB", 1500))
+BROWSER_POOL_PREWARM = os.environ.get("BROWSER_POOL_PREWARM", "true").lower() == "true"
+
+
+def browser_kwargs() -> dict:
+    """Launch options shared by every pooled browser"""
+    headless = os.environ.get("BROWSER_HEADLESS")
+    return {
+        "headless": None if headless is None else headless.lower() == "true",
+        "window_size": {"width": 1000, "height": 700},
+        # The pool decides when a browser dies, not the agent
+        "keep_alive": True,
+    }
+
+
+def browser_rss_mb(browser) -> float:
+    """Resident memory of the Chromium process tree in MB (0 if unknown)"""
+    watchdog = getattr(browser, "_local_browser_watchdog", None)
+    pid = getattr(watchdog, "browser_pid", None)
+    return process_tree_rss_mb(pid) if pid else 0.0
+
+
+class BrowserPool:
+    """Pre-started browser sessions that jobs check out and hand back.
+
+    Each session is its own Chromium with a throwaway profile, wiped of
+    cookies, site storage and tabs on checkin, so jobs never share them
+    unless they load them on purpose. Sessions are
+    health-checked on checkout and recycled after ``max_uses`` jobs or once
+    their RSS passes ``max_rss_mb``.
+
+    Browser sessions are bound to the event loop that started them, so a pool
+    must only be used from a single loop - see ``get_browser_pool``.
+    """
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        max_uses: int = BROWSER_MAX_USES,
+        max_rss_mb: float = BROWSER_MAX_RSS_MB,
+    ):
+        self.size = size
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self._idle = []
+        self._uses = {}
+        self._slots = asyncio.Semaphore(size)
+
+    async def _start_browser(self):
+        browser = Browser(**browser_kwargs())
+        await browser.start()
+        self._uses[id(browser)] = 0
+        return browser
+
+    async def _discard(self, browser):
+        self._uses.pop(id(browser), None)
+        try:
+            await browser.kill()
+        except Exception as e:
+            print(f"⚠️ Error killing pooled browser: {e}")
+
+    def _is_healthy(self, browser) -> bool:
+        return browser.is_cdp_connected
+
+    def _needs_recycle(self, browser) -> bool:
+        if self._uses.get(id(browser), 0) >= self.max_uses:
+            return True
+        return browser_rss_mb(browser) > self.max_rss_mb
+
+    async def _reset(self, browser):
+        """Leave nothing behind for the next job.
+
+        Cookies are browser-wide, but localStorage, IndexedDB and the cache
+        are per origin, so every open tab's origin is cleared, plus Kijiji's
+        (restore_session loads per-account storage there). The storage a
+        restored session injects lives in init scripts on its tabs, so the
+        old tabs are closed in favour of a fresh blank one.
+        """
+        tabs = await browser.get_tabs()
+        origins = {KIJIJI_ORIGIN}
+        for tab in tabs:
+            parts = urlsplit(tab.url)
+            if parts.scheme in ("http", "https"):
+                origins.add(f"{parts.scheme}://{parts.netloc}")
+
+        await browser.clear_cookies()
+        for origin in origins:
+            await browser.cdp_client.send.Storage.clearDataForOrigin(
+                params={"origin": origin, "storageTypes": "all"}
+            )
+        await browser.navigate_to("about:blank", new_tab=True)
+        for tab in tabs:
+            await browser.close_page(tab.target_id)
+
+    async def warm(self):
+        """Start browsers until the pool holds ``size`` idle sessions"""
+        while len(self._idle) + self.in_use < self.size:
+            self._idle.append(await self._start_browser())
+
+    @property
+    def in_use(self) -> int:
+        return len(self._uses) - len(self._idle)
+
+    async def checkout(self):
+        """Take an idle healthy browser, starting a new one if none is ready"""
+        await self._slots.acquire()
+        start = time.perf_counter()
+        try:
+            while self._idle:
+                browser = self._idle.pop()
+                if self._is_healthy(browser):
+                    break
+                print("♻️ Pooled browser failed health check, replacing it")
+                await self._discard(browser)
+            else:
+                browser = await self._start_browser()
+        except BaseException:
+            self._slots.release()
+            raise
+        self._uses[id(browser)] += 1
+        observe_stage("browser_start", time.perf_counter() - start)
+        ACTIVE_BROWSERS.inc()
+        return browser
+
+    async def checkin(self, browser, broken: bool = False):
+        """Return a browser to the pool, or recycle it if it is worn out"""
+        ACTIVE_BROWSERS.dec()
+        try:
+            if broken or not self._is_healthy(browser) or self._needs_recycle(browser):
+                await self._discard(browser)
+                return
+            try:
+                await self._reset(browser)
+            except Exception as e:
+                print(f"⚠️ Could not reset pooled browser, recycling it: {e}")
+                await self._discard(browser)
+                return
+            self._idle.append(browser)
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def session(self):
+        """``async with pool.session() as browser:`` checkout/checkin helper"""
+        browser = await self.checkout()
+        broken = False
+        try:
+            yield browser
+        except BaseException:
+            broken = True
+            raise
+        finally:
+            await self.checkin(browser, broken=broken)
+
+    async def close(self):
+        """Kill every idle browser"""
+        while self._idle:
+            await self._discard(self._idle.pop())
+
+    def stats(self) -> dict:
+        return {"size": self.size, "idle": len(self._idle), "in_use": self.in_use}
+
+
+_local = threading.local()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the pool owned by the current thread's event loop"""
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        # Jobs sharing a loop share its pool, BROWSER_POOL_SIZE browsers each
+        jobs = getattr(scheduler, "jobs_per_loop", 1)
+        pool = _local.pool = BrowserPool(size=BROWSER_POOL_SIZE * jobs)
+    return pool
+
+
+def agent_llm(model: str = "claude-sonnet-4-0") -> ChatAnthropic:
+    """Agent LLM on the running loop's pooled Anthropic connections"""
+    return ChatAnthropic(
+        model=model, temperature=0.0, http_client=get_async_http_client()
+    )
+
+
+async def _prewarm_worker_pool():
+    await get_browser_pool().warm()
+
+
+if BROWSER_POOL_PREWARM:
+    scheduler.on_worker_start(_prewarm_worker_pool)
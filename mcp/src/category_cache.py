@@ -0,0 +1,126 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from sqlite_util import ThreadLocalConnection
+
+CATEGORY_CACHE_SIZE = int(os.environ.get("CATEGORY_CACHE_SIZE", 1024))
+CATEGORY_CACHE_PATH = os.environ.get("CATEGORY_CACHE_PATH", "category_cache.db")
+CATEGORY_CACHE_TTL = float(os.environ.get("CATEGORY_CACHE_TTL", 30 * 24 * 3600))
+
+
+def normalize_listing(title: str, description: str) -> str:
+    """Collapse case, punctuation and whitespace so near-identical reposts match"""
+    text = f"{title or ''}\n{description or ''}".lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def listing_key(title: str, description: str) -> str:
+    return hashlib.sha256(normalize_listing(title, description).encode()).hexdigest()
+
+
+class CategoryCache:
+    """Two-tier memo of listing -> Kijiji category.
+
+    An LRU dict bounded to ``max_size`` entries sits in front of an SQLite
+    table whose rows expire after ``ttl`` seconds, so answers survive restarts
+    without the in-process tier growing.
+    """
+
+    def __init__(
+        self,
+        path: str = CATEGORY_CACHE_PATH,
+        max_size: int = CATEGORY_CACHE_SIZE,
+        ttl: float = CATEGORY_CACHE_TTL,
+    ):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = ThreadLocalConnection(path)
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS categories ("
+            "key TEXT PRIMARY KEY, category TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self.evict_expired()
+
+    def _remember(self, key: str, category: str):
+        with self._lock:
+            self._memory[key] = category
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def get(self, title: str, description: str):
+        """Return the cached category or None"""
+        key = listing_key(title, description)
+        with self._lock:
+            category = self._memory.get(key)
+            if category is not None:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return category
+
+        try:
+            row = (
+                self._conn()
+                .execute(
+                    "SELECT category FROM categories WHERE key = ? AND stored_at > ?",
+                    (key, time.time() - self.ttl),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Category cache read failed: {e}")
+            row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits_disk += 1
+        self._remember(key, row[0])
+        return row[0]
+
+    def put(self, title: str, description: str, category: str):
+        key = listing_key(title, description)
+        self._remember(key, category)
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO categories (key, category, stored_at) VALUES (?, ?, ?)",
+                (key, category, time.time()),
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Category cache write failed: {e}")
+
+    def evict_expired(self) -> int:
+        cursor = self._conn().execute(
+            "DELETE FROM categories WHERE stored_at <= ?", (time.time() - self.ttl,)
+        )
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": (
+                    round((self.hits_memory + self.hits_disk) / lookups, 3)
+                    if lookups
+                    else 0.0
+                ),
+                "memory_entries": len(self._memory),
+            }
+
+
+category_cache = CategoryCache()
@@ -0,0 +1,214 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict, deque
+
+CATEGORY_LABELS_PATH = os.environ.get("CATEGORY_LABELS_PATH", "labelled_listings.jsonl")
+# Newest labels kept on disk and loaded at start
+CATEGORY_LABELS_MAX = int(os.environ.get("CATEGORY_LABELS_MAX", 20000))
+# Off until the threshold has been checked with bench-classifier.py against
+# real labels; until then Claude categorizes and the labels accumulate
+LOCAL_CATEGORY_CLASSIFIER = (
+    os.environ.get("LOCAL_CATEGORY_CLASSIFIER", "false").lower() == "true"
+)
+CATEGORY_CONFIDENCE_THRESHOLD = float(
+    os.environ.get("CATEGORY_CONFIDENCE_THRESHOLD", 0.5)
+)
+# Distinct listing words that must hit the winning category - one keyword
+# ("TV stand", "iPhone case") says little about what the item is
+CATEGORY_MIN_MATCHED_TERMS = int(os.environ.get("CATEGORY_MIN_MATCHED_TERMS", 2))
+
+# Seed vocabulary for each Kijiji category. "Buy & Sell" (the parent) and
+# "Other" are deliberately absent - those are left for the LLM to decide.
+CATEGORY_DESCRIPTIONS = {
+    "Arts & Collectibles": "art painting print canvas poster sculpture antique vintage collectible collection coin stamp figurine memorabilia signed autograph frame",
+    "Audio": "speaker speakers headphones earbuds amplifier amp receiver subwoofer soundbar turntable record player stereo audio bluetooth speaker sonos bose",
+    "Baby Items": "baby stroller crib car seat high chair bassinet diaper infant toddler playpen bottle carrier nursery",
+    "Bags & Luggage": "bag backpack suitcase luggage purse handbag duffel tote wallet carry on",
+    "Bikes": "bike bicycle mountain bike road bike bmx cycling helmet ebike e-bike tricycle fixie",
+    "Books": "book books novel textbook hardcover paperback comic comics magazine encyclopedia edition author",
+    "Business & Industrial": "commercial industrial restaurant equipment forklift pallet shelving cash register office printer warehouse wholesale",
+    "Cameras & Camcorders": "camera dslr mirrorless lens lenses camcorder gopro tripod canon nikon sony alpha fujifilm film camera",
+    "CDs, DVDs & Blu-ray": "cd cds dvd dvds blu-ray bluray movie movies album disc box set",
+    "Clothing": "clothing clothes jacket coat shirt pants jeans dress shoes sneakers boots hoodie sweater size mens womens",
+    "Computers": "computer laptop desktop macbook imac pc notebook chromebook thinkpad gaming pc ram ssd processor",
+    "Computer Accessories": "monitor keyboard mouse webcam docking station usb hub router modem hard drive external drive graphics card gpu",
+    "Electronics": "electronics charger cable smart watch tablet ipad kindle e-reader drone gadget smart home alexa",
+    "Free Stuff": "free giveaway curb alert must take",
+    "Furniture": "furniture sofa couch chair table desk dresser bed frame mattress bookshelf shelf cabinet nightstand ottoman futon recliner",
+    "Garage Sales": "garage sale yard sale moving sale estate sale",
+    "Health & Special Needs": "wheelchair walker mobility scooter cane hospital bed medical brace",
+    "Hobbies & Crafts": "craft crafts sewing yarn knitting scrapbook model kit beads hobby paint brushes",
+    "Home Appliances": "appliance fridge refrigerator freezer washer dryer dishwasher microwave stove oven range vacuum air conditioner dehumidifier",
+    "Home - Indoor": "lamp rug curtains decor mirror kitchenware dishes cookware pots pans bedding pillow blanket",
+    "Home - Outdoor & Garden": "garden patio bbq grill lawn mower snow blower planter hose outdoor furniture shed",
+    "Home Renovation Materials": "lumber drywall tiles flooring paint cabinets doors windows insulation shingles countertop",
+    "Jewellery & Watches": "jewellery jewelry watch watches ring necklace bracelet earrings gold silver diamond rolex",
+    "Musical Instruments": "guitar bass piano keyboard drums drum kit violin ukulele saxophone trumpet amp fender gibson yamaha instrument",
+    "Phones": "phone iphone android samsung galaxy pixel cell phone smartphone unlocked",
+    "Sporting Goods & Exercise": "treadmill dumbbells weights exercise fitness gym yoga skates hockey golf clubs ski skis snowboard tennis camping kayak",
+    "Tools": "drill saw tool tools wrench toolbox dewalt milwaukee makita ladder compressor sander",
+    "Toys & Games": "toy toys lego board game puzzle doll action figure playset kids",
+    "TVs & Video": "tv television smart tv projector oled qled lcd inch streaming roku",
+    "Video Games & Consoles": "playstation ps4 ps5 xbox nintendo switch console video game games controller gaming",
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for token in TOKEN_RE.findall((text or "").lower()):
+        # Cheap plural folding so "speakers" and "speaker" share a term
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def load_labelled_listings(
+    path: str = CATEGORY_LABELS_PATH, limit: int = CATEGORY_LABELS_MAX
+) -> list:
+    """Read the newest ``limit`` past labels, skipping bad lines"""
+    listings = []
+    if not os.path.exists(path):
+        return listings
+    with open(path) as f:
+        for line in deque(f, maxlen=limit):
+            try:
+                listing = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if listing.get("category") in CATEGORY_DESCRIPTIONS:
+                listings.append(listing)
+    return listings
+
+
+class CategoryClassifier:
+    """Keyword + TF-IDF nearest-category classifier.
+
+    Each category is one document built from its seed description plus every
+    labelled listing in that category. A query is scored by cosine similarity
+    against the category vectors through an inverted index, so classifying a
+    listing is a few dict lookups per token.
+    """
+
+    def __init__(self, listings: list = ()):
+        documents = defaultdict(list)
+        for category, description in CATEGORY_DESCRIPTIONS.items():
+            documents[category].extend(tokenize(description))
+        for listing in listings:
+            documents[listing["category"]].extend(
+                tokenize(f"{listing.get('title', '')} {listing.get('description', '')}")
+            )
+
+        document_frequency = Counter()
+        for tokens in documents.values():
+            document_frequency.update(set(tokens))
+        total = len(documents)
+        self.idf = {
+            token: math.log((1 + total) / (1 + count)) + 1
+            for token, count in document_frequency.items()
+        }
+
+        # token -> [(category, weight)] with each category vector L2-normalised
+        self.index = defaultdict(list)
+        for category, tokens in documents.items():
+            weights = {
+                token: (1 + math.log(count)) * self.idf[token]
+                for token, count in Counter(tokens).items()
+            }
+            norm = math.sqrt(sum(w * w for w in weights.values()))
+            for token, weight in weights.items():
+                self.index[token].append((category, weight / norm))
+
+    def scores(self, title: str, description: str) -> dict:
+        # The title says what the item is - weight it above the description
+        counts = Counter(tokenize(title) * 2 + tokenize(description))
+        query = {
+            token: (1 + math.log(count)) * self.idf[token]
+            for token, count in counts.items()
+            if token in self.idf
+        }
+        norm = math.sqrt(sum(w * w for w in query.values()))
+        scores = defaultdict(float)
+        if not norm:
+            return scores
+        for token, weight in query.items():
+            for category, category_weight in self.index[token]:
+                scores[category] += weight / norm * category_weight
+        return scores
+
+    def classify(self, title: str, description: str):
+        """Return ``(category, confidence)``; confidence is 0.0 - 1.0.
+
+        Confidence is the best match's cosine similarity scaled by its lead
+        over the runner-up, so a listing that is close to two categories
+        scores low even when both similarities are high. Matches on fewer
+        than ``CATEGORY_MIN_MATCHED_TERMS`` distinct words score 0.
+        """
+        ranked = sorted(
+            self.scores(title, description).items(), key=lambda item: -item[1]
+        )
+        if not ranked:
+            return None, 0.0
+        best_category, best = ranked[0]
+        matched = sum(
+            any(category == best_category for category, _ in self.index[token])
+            for token in set(tokenize(f"{title} {description}"))
+            if token in self.index
+        )
+        if matched < CATEGORY_MIN_MATCHED_TERMS:
+            return best_category, 0.0
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        margin = (best - runner_up) / best
+        return best_category, round(best * margin, 3)
+
+
+# The labels are only worth parsing when the classifier answers
+_classifier = CategoryClassifier(
+    load_labelled_listings() if LOCAL_CATEGORY_CLASSIFIER else ()
+)
+_labels_lock = threading.Lock()
+_label_count = None
+
+
+def classify_locally(title: str, description: str):
+    """Classify with the index built at import time"""
+    return _classifier.classify(title, description)
+
+
+def record_label(title: str, description: str, category: str):
+    """Append an LLM-confirmed label so the next start learns from it.
+
+    Once the file passes CATEGORY_LABELS_MAX lines by a tenth, it is
+    rewritten with only the newest CATEGORY_LABELS_MAX.
+    """
+    global _label_count
+    if category not in CATEGORY_DESCRIPTIONS:
+        return
+    line = json.dumps(
+        {"title": title, "description": description, "category": category}
+    )
+    try:
+        with _labels_lock:
+            if _label_count is None:
+                _label_count = 0
+                if os.path.exists(CATEGORY_LABELS_PATH):
+                    with open(CATEGORY_LABELS_PATH) as f:
+                        _label_count = sum(1 for _ in f)
+            with open(CATEGORY_LABELS_PATH, "a") as f:
+                f.write(line + "\n")
+            _label_count += 1
+            if _label_count > CATEGORY_LABELS_MAX * 1.1:
+                with open(CATEGORY_LABELS_PATH) as f:
+                    newest = deque(f, maxlen=CATEGORY_LABELS_MAX)
+                tmp = f"{CATEGORY_LABELS_PATH}.tmp"
+                with open(tmp, "w") as f:
+                    f.writelines(newest)
+                os.replace(tmp, CATEGORY_LABELS_PATH)
+                _label_count = len(newest)
+    except OSError as e:
+        print(f"⚠️ Could not record category label: {e}")
@@ -1,6 +1,6 @@
-import os
 import asyncio
-import threading
+import json
+import os
 import time
 import uuid
 import sys
@@ -9,158 +9,397 @@ from dotenv import load_dotenv
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from agent_to_integrate import main as run_agent
-from handleImage import analyze_image, categorize_product_with_anthropic
+from agent_to_integrate import (
+    NEGOTIATION_TIMEOUT,
+    POST_FORM_TIMEOUT,
+    POST_LOGIN_TIMEOUT,
+    main as run_agent,
+    negotiate_listing,
+    post_many,
+)
+from handleImage import (
+    categorize_product_with_anthropic_async,
+    categorize_without_llm,
+)
+from job_store import job_store
+from metrics import stage_timer
+from notifications import send_poke_notification
+from scheduler import PRIORITY_NEGOTIATE, PRIORITY_POST, QueueFull, scheduler
 
 load_dotenv()
 
 mcp = FastMCP("Kijiji Auto-Posting MCP Server")
 
-jobs = {}
-agent_running = False
+# Postings for one account run one at a time by default, in the order they
+# were submitted; different accounts post in parallel.
+KIJIJI_ACCOUNT_CONCURRENCY = int(os.environ.get("KIJIJI_ACCOUNT_CONCURRENCY", 1))
+# Hard limit for a posting job; buyer negotiation is a job of its own
+POST_JOB_TIMEOUT = float(os.environ.get("POST_JOB_TIMEOUT", 3600))
+# Negotiations hold a browser for hours, so only this many run at once
+# across all accounts, leaving the other workers to searches and postings.
+# Keep it below SCHEDULER_WORKERS.
+NEGOTIATION_CONCURRENCY = int(os.environ.get("NEGOTIATION_CONCURRENCY", 1))
+# Items accepted by one post_many_to_kijiji call
+BULK_POST_MAX_ITEMS = int(os.environ.get("BULK_POST_MAX_ITEMS", 30))
+# Claude categorizations in flight at once for a bulk posting
+BULK_CATEGORIZE_CONCURRENCY = int(os.environ.get("BULK_CATEGORIZE_CONCURRENCY", 4))
+
+
+def load_accounts() -> dict:
+    """Kijiji accounts by name.
+
+    ``default`` comes from KIJIJI_USERNAME/KIJIJI_PASSWORD. More accounts can
+    be added with KIJIJI_ACCOUNTS, a JSON object of
+    ``{"name": {"username": ..., "password": ...}}``.
+    """
+    accounts = {
+        "default": {
+            "username": os.getenv("KIJIJI_USERNAME"),
+            "password": os.getenv("KIJIJI_PASSWORD"),
+        }
+    }
+    accounts.update(json.loads(os.environ.get("KIJIJI_ACCOUNTS") or "{}"))
+    return accounts
 
 
-def send_poke_notification(message: str):
-    """Send notification via Poke API when browser automation completes"""
-    try:
-        import requests
+KIJIJI_ACCOUNTS = load_accounts()
 
-        poke_api_key = os.environ.get("POKE_API_KEY")
-        if not poke_api_key:
-            print("⚠️ No POKE_API_KEY found - skipping notification")
-            return
 
-        response = requests.post(
-            "https://poke.com/api/v1/inbound-sms/webhook",
-            headers={
-                "Authorization": f"Bearer {poke_api_key}",
-                "Content-Type": "application/json",
-            },
-            json={"message": message},
+async def run_kijiji_posting_background(job_id: str, product_info: dict, account: str):
+    try:
+        job_store.update(job_id, status="running", started_at=time.time())
+
+        if not product_info.get("category"):
+            with stage_timer("categorize"):
+                product_info["category"] = (
+                    await categorize_product_with_anthropic_async(
+                        product_info["title"], product_info["description"]
+                    )
+                )
+            job_store.update(job_id, product_info=product_info)
+
+        credentials = KIJIJI_ACCOUNTS[account]
+        last_seen = await run_agent(
+            product_info,
+            credentials["username"],
+            credentials["password"],
+            on_stage=lambda stage: job_store.update(job_id, stage=stage),
+        )
+        negotiation_job_id = queue_negotiation(product_info, account, last_seen)
+
+        job_store.update(
+            job_id,
+            status="completed",
+            stage="completed",
+            result="Successfully posted to Kijiji",
+            negotiation_job_id=negotiation_job_id,
+            completed_at=time.time(),
         )
 
-        if response.ok:
-            print(f"✅ Poke notification sent: {message[:100]}...")
-        else:
-            print(f"❌ Poke notification failed: {response.status_code}")
+        notification_message = f"This is a message from the Kijiji integration. The browser agent has finished posting '{product_info['title']}' and will now answer buyers in the background. Alert the user now in your natural voice."
+        send_poke_notification(notification_message)
 
     except Exception as e:
-        print(f"❌ Error sending Poke notification: {e}")
+        job_store.update(
+            job_id, status="failed", error=str(e), completed_at=time.time()
+        )
 
 
-def run_kijiji_posting_background(job_id: str, product_info: dict):
-    global agent_running
+def queue_negotiation(product_info: dict, account: str, last_seen: str):
+    """Queue buyer negotiation for a posted listing; its job ID, or None if
+    the queue is full"""
+    job_id = str(uuid.uuid4())
+    job_store.create(
+        job_id, "negotiate", {"product_info": product_info, "account": account}
+    )
     try:
-        jobs[job_id]["status"] = "running"
-
-        jobs[job_id]["started_at"] = time.time()
-        agent_running = True
-
-        async def post_to_kijiji():
-            return await run_agent(product_info)
+        scheduler.submit(
+            job_id,
+            run_kijiji_negotiation_background,
+            job_id,
+            product_info["price"],
+            account,
+            last_seen,
+            priority=PRIORITY_NEGOTIATE,
+            key="negotiation",
+            key_limit=NEGOTIATION_CONCURRENCY,
+            timeout=300 + POST_LOGIN_TIMEOUT + NEGOTIATION_TIMEOUT,
+        )
+    except QueueFull as e:
+        print(f"⚠️ Could not queue the negotiation: {e}")
+        job_store.update(
+            job_id, status="failed", error=str(e), completed_at=time.time()
+        )
+        return None
+    return job_id
 
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(post_to_kijiji())
-        loop.close()
 
-        jobs[job_id].update(
-            {
-                "status": "completed",
-                "result": "Successfully posted to Kijiji",
-                "product_info": product_info,
-                "completed_at": time.time(),
-            }
+async def run_kijiji_negotiation_background(
+    job_id: str, price: str, account: str, last_seen: str
+):
+    try:
+        job_store.update(job_id, status="running", started_at=time.time())
+
+        credentials = KIJIJI_ACCOUNTS[account]
+        history = await negotiate_listing(
+            price,
+            credentials["username"],
+            credentials["password"],
+            last_seen=last_seen,
+            on_stage=lambda stage: job_store.update(job_id, stage=stage),
+        )
+        result = (history and history.final_result()) or "No buyer messages"
+
+        job_store.update(
+            job_id,
+            status="completed",
+            stage="completed",
+            result=result,
+            completed_at=time.time(),
         )
 
-        notification_message = f"This is a message from the Kijiji integration. The browser agent has finished posting the item and returned: {str(result)[:200]}... Alert the user now in your natural voice."
+        notification_message = f"This is a message from the Kijiji integration. The browser agent has finished negotiating with buyers and returned: {str(result)[:200]}... Alert the user now in your natural voice."
         send_poke_notification(notification_message)
 
-        return result
-
     except Exception as e:
-        jobs[job_id].update(
-            {"status": "failed", "error": str(e), "completed_at": time.time()}
+        job_store.update(
+            job_id, status="failed", error=str(e), completed_at=time.time()
         )
-    finally:
-        agent_running = False
 
 
 # @mcp.tool(description="Analyze image and post to Kijiji")
 # def analyze_and_post_to_kijiji(image_data: str, image_media_type: str = "image/jpeg") -> dict:
-def post_to_kijiji(title: str, description: str, price: str) -> dict:
-    global agent_running, post_status
-
-    if agent_running:
+async def post_to_kijiji(
+    title: str, description: str, price: str, account: str = "default"
+) -> dict:
+    if account not in KIJIJI_ACCOUNTS:
         return {
             "success": False,
-            "error": "Agent already running",
-            "message": "Please wait for the current posting to complete",
+            "error": f"Unknown Kijiji account '{account}'",
+            "accounts": sorted(KIJIJI_ACCOUNTS),
         }
 
     try:
-        # product_info = analyze_image(image_data, image_media_type)
-        # product_info = {
-        #     "title": "sample product",
-        #     "description": "sample description here",
-        #     "price": price,
-        #     "category": "Books",
-        # }
-        category = categorize_product_with_anthropic(title, description)
+        # product_info = await analyze_image_async(image_data, image_media_type)
+        # Only the cheap cache/local lookups run here so the caller gets a job
+        # ID right away; a Claude categorization happens inside the job.
         product_info = {
             "title": title,
             "description": description,
             "price": price,
-            "category": category,
+            "category": categorize_without_llm(title, description),
         }
 
         job_id = str(uuid.uuid4())
 
-        jobs[job_id] = {
-            "product_info": product_info,
-            "status": "queued",
-            "created_at": time.time(),
-        }
-
-        thread = threading.Thread(
-            target=run_kijiji_posting_background,
-            args=(job_id, product_info),
-            daemon=True,
+        job_store.create(
+            job_id, "post", {"product_info": product_info, "account": account}
         )
-        thread.start()
 
-        post_status = {
+        try:
+            position = scheduler.submit(
+                job_id,
+                run_kijiji_posting_background,
+                job_id,
+                product_info,
+                account,
+                priority=PRIORITY_POST,
+                key=account,
+                key_limit=KIJIJI_ACCOUNT_CONCURRENCY,
+                timeout=POST_JOB_TIMEOUT,
+            )
+        except QueueFull as e:
+            job_store.delete(job_id)
+            return {"success": False, "error": str(e), "status": "rejected"}
+
+        return {
             "success": True,
-            "message": "Image analyzed and agent started",
+            "message": (
+                f"Queued, position {position}" if position else "Agent started"
+            ),
             "product_info": product_info,
             "job_id": job_id,
+            "account": account,
             "status": "queued",
+            "position": position,
         }
-        return post_status
 
     except Exception as e:
-        post_status = {
+        return {
             "success": False,
             "error": f"Error processing image: {str(e)}",
         }
-        return post_status
 
 
-@mcp.tool(description="Check if conversation/agent is finished")
-def conversation_finished() -> dict:
-    global agent_running, post_status
+async def run_kijiji_bulk_posting_background(job_id: str, items: list, account: str):
+    try:
+        job_store.update(
+            job_id, status="running", stage="categorizing", started_at=time.time()
+        )
+
+        semaphore = asyncio.Semaphore(BULK_CATEGORIZE_CONCURRENCY)
+
+        async def categorize(item):
+            if not item.get("category"):
+                async with semaphore:
+                    item["category"] = await categorize_product_with_anthropic_async(
+                        item["title"], item["description"]
+                    )
+
+        with stage_timer("categorize"):
+            await asyncio.gather(*(categorize(item) for item in items))
+        job_store.update(job_id, items=items)
+
+        def on_item(index: int, status: str, error: str = None):
+            items[index]["status"] = status
+            if error:
+                items[index]["error"] = error
+            job_store.update(job_id, items=items)
+
+        credentials = KIJIJI_ACCOUNTS[account]
+        posted = await post_many(
+            [
+                {
+                    key: item[key]
+                    for key in ("title", "description", "price", "category")
+                }
+                for item in items
+            ],
+            credentials["username"],
+            credentials["password"],
+            on_stage=lambda stage: job_store.update(job_id, stage=stage),
+            on_item=on_item,
+        )
+
+        failed = [item["title"] for item in items if item["status"] == "failed"]
+        summary = f"Posted {posted} of {len(items)} items to Kijiji"
+        if failed:
+            summary += f"; failed: {', '.join(failed)}"
+        job_store.update(
+            job_id,
+            status="completed" if posted else "failed",
+            stage="completed",
+            result=summary,
+            **({} if posted else {"error": "No items could be posted"}),
+            completed_at=time.time(),
+        )
+
+        notification_message = f"This is a message from the Kijiji integration. The bulk posting has finished. {summary}. Alert the user now in your natural voice."
+        send_poke_notification(notification_message)
+
+    except Exception as e:
+        job_store.update(
+            job_id, status="failed", error=str(e), completed_at=time.time()
+        )
+
 
-    if post_status["status"] == "completed":
+async def post_many_to_kijiji(items: list, account: str = "default") -> dict:
+    if account not in KIJIJI_ACCOUNTS:
         return {
-            "success": True,
-            "message": "Conversation finished",
+            "success": False,
+            "error": f"Unknown Kijiji account '{account}'",
+            "accounts": sorted(KIJIJI_ACCOUNTS),
         }
-    else:
+    if not items:
+        return {"success": False, "error": "No items provided"}
+    if len(items) > BULK_POST_MAX_ITEMS:
         return {
             "success": False,
-            "message": "Conversation not finished",
+            "error": f"At most {BULK_POST_MAX_ITEMS} items per call, got {len(items)}",
         }
 
+    listings = []
+    for index, item in enumerate(items):
+        # price 0 is a valid free item, so only absent or blank values count
+        missing = [
+            key
+            for key in ("title", "description", "price")
+            if key not in item or item[key] in (None, "")
+        ]
+        if missing:
+            return {
+                "success": False,
+                "error": f"Item {index + 1} is missing {', '.join(missing)}",
+            }
+        title, description = item["title"], item["description"]
+        listings.append(
+            {
+                "title": title,
+                "description": description,
+                "price": str(item["price"]),
+                # Cheap lookups only; Claude categorizes the rest inside the job
+                "category": item.get("category")
+                or categorize_without_llm(title, description),
+                "status": "pending",
+            }
+        )
+
+    job_id = str(uuid.uuid4())
+    job_store.create(job_id, "bulk_post", {"items": listings, "account": account})
+    try:
+        position = scheduler.submit(
+            job_id,
+            run_kijiji_bulk_posting_background,
+            job_id,
+            listings,
+            account,
+            priority=PRIORITY_POST,
+            key=account,
+            key_limit=KIJIJI_ACCOUNT_CONCURRENCY,
+            # Categorizing, one login and one form per item
+            timeout=300 + POST_LOGIN_TIMEOUT + len(listings) * POST_FORM_TIMEOUT,
+        )
+    except QueueFull as e:
+        job_store.delete(job_id)
+        return {"success": False, "error": str(e), "status": "rejected"}
+
+    return {
+        "success": True,
+        "message": (
+            f"Queued, position {position}"
+            if position
+            else f"Posting {len(listings)} items in one session"
+        ),
+        "job_id": job_id,
+        "account": account,
+        "items": listings,
+        "status": "queued",
+        "position": position,
+    }
+
+
+def conversation_finished(job_id: str) -> dict:
+    """Whether the posting (and buyer conversation) for ``job_id`` is done"""
+    job = job_store.get(job_id)
+    if job is None:
+        return {"success": False, "job_id": job_id, "status": "not_found"}
+
+    # Once posted, the buyer conversation is the negotiation job's
+    negotiation_job_id = job.get("negotiation_job_id")
+    negotiation = negotiation_job_id and job_store.get(negotiation_job_id)
+    if negotiation:
+        job = negotiation
+
+    response = {
+        "success": job["status"] == "completed",
+        "job_id": job_id,
+        "negotiation_job_id": negotiation_job_id,
+        "account": job.get("account"),
+        "status": job["status"],
+        "message": (
+            "Conversation finished"
+            if job["status"] == "completed"
+            else "Conversation not finished"
+        ),
+    }
+    if job["status"] == "queued":
+        response["position"] = scheduler.position(
+            negotiation_job_id if negotiation else job_id
+        )
+    elif job["status"] in ("failed", "cancelled"):
+        response["error"] = job["error"]
+    return response
+
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
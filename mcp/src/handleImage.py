@@ -1,9 +1,56 @@
-import json
-import re
-from anthropic import Anthropic
+import asyncio
+import inspect
+import os
+import time
+import weakref
+import httpx
+from anthropic import Anthropic, AsyncAnthropic, DefaultAsyncHttpxClient
+from category_cache import category_cache
+from image_preprocess import preprocess_image
+from metrics import record_usage
+from category_classifier import (
+    CATEGORY_CONFIDENCE_THRESHOLD,
+    LOCAL_CATEGORY_CLASSIFIER,
+    classify_locally,
+    record_label,
+)
 
 client = Anthropic()
 
+# Pooled async clients, one set per event loop: httpx connections are bound
+# to the loop that opened them, so the server's loop and each job runtime
+# get their own, shared by every tool handler or job on that loop
+_loop_clients = weakref.WeakKeyDictionary()
+
+
+def _clients_for_running_loop() -> dict:
+    loop = asyncio.get_running_loop()
+    clients = _loop_clients.get(loop)
+    if clients is None:
+        http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=int(os.environ.get("ANTHROPIC_MAX_CONNECTIONS", 20)),
+                max_keepalive_connections=10,
+                keepalive_expiry=30.0,
+            )
+        )
+        clients = _loop_clients[loop] = {
+            "http": http_client,
+            "anthropic": AsyncAnthropic(http_client=http_client),
+        }
+    return clients
+
+
+def get_async_client() -> AsyncAnthropic:
+    """The running event loop's shared AsyncAnthropic client"""
+    return _clients_for_running_loop()["anthropic"]
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """The running event loop's pooled HTTP client for Anthropic calls"""
+    return _clients_for_running_loop()["http"]
+
+
 # Valid categories from the Kijiji category selection
 VALID_CATEGORIES = [
     "Buy & Sell",
@@ -41,21 +88,65 @@ VALID_CATEGORIES = [
 ]
 
 
-def extract_json_from_text(text):
-    """Extract JSON from text that might contain other content"""
-    # Look for JSON object in the text
-    json_match = re.search(r"\{[^{}]*\}", text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group())
-        except json.JSONDecodeError:
-            pass
+# Static prompt parts are built once and can be sent as a cached system
+# prefix. Off by default: these prefixes are well under the 1024-token
+# minimum Sonnet caches, so marking them only adds a breakpoint that never
+# hits. Turn it on once bench-prompt-cache.py shows a prefix past the minimum.
+PROMPT_CACHE = os.environ.get("PROMPT_CACHE", "false").lower() == "true"
 
-    # If no JSON found, try to parse the entire text
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        return None
+CATEGORY_GUIDE = "\n".join(f"- {category}" for category in VALID_CATEGORIES)
+
+ANALYSIS_INSTRUCTIONS = f"""You turn photos of second-hand items into Kijiji listings.
+
+Record the listing with the create_listing tool. Fill in the fields in order: title and category first, then price, then the description.
+
+The category MUST be one of these exact options:
+{CATEGORY_GUIDE}
+
+Choose the most appropriate category from the list above."""
+
+# Schema-enforced listing output. Properties are listed in the order Claude
+# writes them, so the short fields stream in before the description.
+LISTING_TOOL = {
+    "name": "create_listing",
+    "description": "Record the Kijiji listing for the item in the photos",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string", "description": "Short listing title"},
+            "category": {"type": "string", "enum": VALID_CATEGORIES},
+            "price": {
+                "type": "string",
+                "description": "Asking price in Canadian dollars, digits only",
+            },
+            "description": {
+                "type": "string",
+                "description": "Detailed listing description",
+            },
+        },
+        "required": ["title", "category", "price", "description"],
+    },
+}
+LISTING_FIELDS = tuple(LISTING_TOOL["input_schema"]["properties"])
+
+CATEGORIZE_INSTRUCTIONS = f"""You categorize products for Kijiji listings.
+
+Choose the MOST APPROPRIATE category from this list:
+{CATEGORY_GUIDE}
+
+Respond with ONLY the exact category name from the list above. No explanations or additional text."""
+
+
+def cached_system(text: str) -> list:
+    """System prompt blocks, marked as a prompt-cache breakpoint"""
+    block = {"type": "text", "text": text}
+    if PROMPT_CACHE:
+        block["cache_control"] = {"type": "ephemeral"}
+    return [block]
+
+
+ANALYSIS_SYSTEM = cached_system(ANALYSIS_INSTRUCTIONS)
+CATEGORIZE_SYSTEM = cached_system(CATEGORIZE_INSTRUCTIONS)
 
 
 def validate_and_fix_category(category):
@@ -74,138 +165,251 @@ def validate_and_fix_category(category):
     return "Other"
 
 
-def analyze_image(image_data, image_media_type):
-    """Analyze base64 image using Claude Vision to extract product info and price"""
-    try:
-        # Create the categories list for the prompt
-        categories_text = "\n".join([f"- {cat}" for cat in VALID_CATEGORIES])
-
-        message = client.messages.create(
-            model="claude-sonnet-4-0",
-            max_tokens=1024,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
+def build_analysis_request(image_data, image_media_type) -> dict:
+    """Keyword arguments for the Claude Vision call behind analyze_image"""
+    return build_multi_image_request([(image_data, image_media_type)])
+
+
+def build_multi_image_request(images) -> dict:
+    """Vision request for one item shown in ``images`` [(data, media_type), ...]"""
+    if len(images) == 1:
+        intro = (
+            "Analyze this image and provide product information for a Kijiji listing."
+        )
+    else:
+        intro = f"These {len(images)} photos all show the same item. Analyze them together and provide product information for a single Kijiji listing."
+
+    return {
+        "model": "claude-sonnet-4-0",
+        "max_tokens": 1024,
+        "system": ANALYSIS_SYSTEM,
+        "tools": [LISTING_TOOL],
+        "tool_choice": {"type": "tool", "name": LISTING_TOOL["name"]},
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    *(
                         {
                             "type": "image",
                             "source": {
                                 "type": "base64",
-                                "media_type": image_media_type,
-                                "data": image_data,
+                                "media_type": media_type,
+                                "data": data,
                             },
-                        },
-                        {
-                            "type": "text",
-                            "text": f"""Analyze this image and provide product information for a Kijiji listing.
+                        }
+                        for data, media_type in images
+                    ),
+                    {"type": "text", "text": intro},
+                ],
+            }
+        ],
+    }
 
-IMPORTANT: Respond ONLY with valid JSON in this exact format:
-{{
-    "title": "Product title here",
-    "description": "Detailed product description here",
-    "price": "25",
-    "category": "Electronics"
-}}
 
-The category MUST be one of these exact options:
-{categories_text}
+class ListingStream:
+    """Picks completed fields out of a streamed create_listing call.
+
+    The tool input arrives as partial JSON in schema order, so a field is
+    final once the next one has started, and the last one when its block
+    stops. ``feed`` returns the ``(name, value)`` pairs that just completed.
+    """
+
+    def __init__(self):
+        self.fields = {}
+
+    def feed(self, event) -> list:
+        if event.type == "input_json":
+            snapshot = event.snapshot or {}
+            # The newest key may still be mid-string
+            names = list(snapshot)[:-1]
+        elif (
+            event.type == "content_block_stop"
+            and event.content_block.type == "tool_use"
+        ):
+            snapshot = event.content_block.input
+            names = list(snapshot)
+        else:
+            return []
+        completed = [
+            (name, snapshot[name]) for name in names if name not in self.fields
+        ]
+        self.fields.update(completed)
+        return completed
+
+
+def parse_analysis_response(message) -> dict:
+    """Turn Claude's create_listing call into validated product info;
+    raises ValueError if the listing is missing or was cut off"""
+    if message.stop_reason == "max_tokens":
+        raise ValueError("Listing was cut off at max_tokens")
+    tool_use = next(
+        (block for block in message.content if block.type == "tool_use"), None
+    )
+    if tool_use is None:
+        raise ValueError(f"Claude did not call {LISTING_TOOL['name']}")
+
+    product_info = dict(tool_use.input)
+    missing = [field for field in LISTING_FIELDS if field not in product_info]
+    if missing:
+        raise ValueError(f"Missing required field: {', '.join(missing)}")
+
+    # The cache key is Claude's own title and description, so a lookup here
+    # could never save the call - only record the answer for categorize calls
+    product_info["category"] = validate_and_fix_category(product_info["category"])
+    category_cache.put(
+        product_info["title"], product_info["description"], product_info["category"]
+    )
+
+    # Ensure price is a string with proper format
+    if isinstance(product_info["price"], (int, float)):
+        product_info["price"] = str(int(product_info["price"]))
+
+    print(f"Parsed product info: {product_info}")
+    return product_info
+
+
+def analyze_image(image_data, image_media_type, on_field=None):
+    """Analyze base64 image using Claude Vision to extract product info and price.
+
+    ``on_field(name, value)`` is called as each field finishes streaming, so
+    title and category arrive before the description is written.
+    """
+    image_data, image_media_type, _ = preprocess_image(image_data, image_media_type)
+    start = time.perf_counter()
+    listing = ListingStream()
+    with client.messages.stream(
+        **build_analysis_request(image_data, image_media_type)
+    ) as stream:
+        for event in stream:
+            for name, value in listing.feed(event):
+                if on_field is not None:
+                    on_field(name, value)
+        message = stream.get_final_message()
+    record_usage("analyze_image", message.usage, time.perf_counter() - start)
+    return parse_analysis_response(message)
+
+
+async def stream_analysis(request: dict, on_field=None) -> dict:
+    """Stream one vision request on the shared async client.
+
+    ``on_field(name, value)`` may be a plain function or a coroutine function.
+    """
+    start = time.perf_counter()
+    listing = ListingStream()
+    async with get_async_client().messages.stream(**request) as stream:
+        async for event in stream:
+            for name, value in listing.feed(event):
+                if on_field is not None:
+                    result = on_field(name, value)
+                    if inspect.isawaitable(result):
+                        await result
+        message = await stream.get_final_message()
+    record_usage("analyze_image", message.usage, time.perf_counter() - start)
+    return parse_analysis_response(message)
+
+
+async def analyze_image_async(image_data, image_media_type, on_field=None):
+    """Non-blocking analyze_image on the shared async client"""
+    # Decoding/resizing is CPU work - keep it off the event loop
+    image_data, image_media_type, _ = await asyncio.to_thread(
+        preprocess_image, image_data, image_media_type
+    )
+    return await stream_analysis(
+        build_analysis_request(image_data, image_media_type), on_field
+    )
+
+
+def build_categorize_request(title: str, description: str) -> dict:
+    """Keyword arguments for the Claude call behind categorize_with_llm"""
+    return {
+        "model": "claude-sonnet-4-0",
+        "max_tokens": 100,
+        "system": CATEGORIZE_SYSTEM,
+        "messages": [
+            {
+                "role": "user",
+                "content": f"""Categorize this product for a Kijiji listing:
 
-Choose the most appropriate category from the list above. Do not include any other text, explanations, or formatting outside the JSON object.""",
-                        },
-                    ],
-                }
-            ],
-        )
+Title: {title}
+Description: {description}""",
+            }
+        ],
+    }
 
-        content = message.content[0].text
-        print(f"Claude raw response: {content}")  # Debug line
 
-        # Try to extract JSON from the response
-        product_info = extract_json_from_text(content)
+def categorize_with_llm(title: str, description: str) -> str:
+    """Ask Claude for the category of a listing; raises on API errors"""
+    start = time.perf_counter()
+    message = client.messages.create(**build_categorize_request(title, description))
+    record_usage(
+        "categorize_product_with_anthropic", message.usage, time.perf_counter() - start
+    )
+    return validate_and_fix_category(message.content[0].text.strip())
 
-        if product_info is None:
-            print("Failed to extract JSON from Claude response")
-            raise ValueError("Invalid JSON response from Claude")
 
-        # Validate required fields
-        required_fields = ["title", "description", "price", "category"]
-        for field in required_fields:
-            if field not in product_info:
-                print(f"Missing required field: {field}")
-                raise ValueError(f"Missing required field: {field}")
+async def categorize_with_llm_async(title: str, description: str) -> str:
+    """Non-blocking categorize_with_llm on the shared async client"""
+    start = time.perf_counter()
+    message = await get_async_client().messages.create(
+        **build_categorize_request(title, description)
+    )
+    record_usage(
+        "categorize_product_with_anthropic", message.usage, time.perf_counter() - start
+    )
+    return validate_and_fix_category(message.content[0].text.strip())
 
-        # Validate and fix category
-        product_info["category"] = validate_and_fix_category(product_info["category"])
 
-        # Ensure price is a string with proper format
-        if isinstance(product_info["price"], (int, float)):
-            product_info["price"] = str(int(product_info["price"]))
+def categorize_without_llm(title: str, description: str):
+    """Answer from the cache or a confident local classification, else None"""
+    cached_category = category_cache.get(title, description)
+    if cached_category:
+        return cached_category
 
-        print(f"Parsed product info: {product_info}")
-        return product_info
+    if not LOCAL_CATEGORY_CLASSIFIER:
+        return None
 
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
-        print(f"Raw content: {content}")
-        return get_fallback_product_info()
-    except Exception as e:
-        print(f"Error analyzing image: {e}")
-        return get_fallback_product_info()
+    # Most listings are obvious - only ask Claude when the local index is unsure
+    local_category, confidence = classify_locally(title, description)
+    if confidence >= CATEGORY_CONFIDENCE_THRESHOLD:
+        category_cache.put(title, description, local_category)
+        return local_category
+    return None
 
 
-def get_fallback_product_info():
-    """Return a fallback product info if analysis fails"""
-    return {
-        "title": "Sample Product",
-        "description": "Product description could not be generated. Please add details manually.",
-        "price": "13",
-        "category": "Other",
-    }
+def remember_llm_category(title: str, description: str, category: str):
+    # Only real answers are cached - API errors fall through uncached
+    category_cache.put(title, description, category)
+    record_label(title, description, category)
 
 
 def categorize_product_with_anthropic(title: str, description: str) -> str:
-    """Use Anthropic API to categorize product based on title and description"""
-    try:
-        # Create the categories list for the prompt
-        categories_text = "\n".join([f"- {cat}" for cat in VALID_CATEGORIES])
-
-        message = client.messages.create(
-            model="claude-sonnet-4-0",
-            max_tokens=100,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"""Categorize this product for a Kijiji listing:
-
-Title: {title}
-Description: {description}
-
-Choose the MOST APPROPRIATE category from this list:
-{categories_text}
-
-Respond with ONLY the exact category name from the list above. No explanations or additional text.""",
-                }
-            ],
-        )
+    """Categorize a listing: cache, then the local classifier, then Claude"""
+    category = categorize_without_llm(title, description)
+    if category:
+        return category
 
-        category = message.content[0].text.strip()
+    try:
+        category = categorize_with_llm(title, description)
+    except Exception as e:
+        print(f"Error categorizing with Anthropic: {e}")
+        return "Other"
 
-        # Validate the response
-        if category in VALID_CATEGORIES:
-            return category
+    remember_llm_category(title, description, category)
+    return category
 
-        # Try case-insensitive match
-        category_lower = category.lower()
-        for valid_cat in VALID_CATEGORIES:
-            if valid_cat.lower() == category_lower:
-                return valid_cat
 
-        # If no match found, return 'Other'
-        print(
-            f"Anthropic returned invalid category '{category}', defaulting to 'Other'"
-        )
-        return "Other"
+async def categorize_product_with_anthropic_async(title: str, description: str) -> str:
+    """Non-blocking categorize_product_with_anthropic"""
+    category = categorize_without_llm(title, description)
+    if category:
+        return category
 
+    try:
+        category = await categorize_with_llm_async(title, description)
     except Exception as e:
         print(f"Error categorizing with Anthropic: {e}")
         return "Other"
+
+    remember_llm_category(title, description, category)
+    return category
@@ -0,0 +1,81 @@
+import base64
+import io
+import os
+import time
+
+from PIL import Image, ImageOps
+
+# Claude Vision downscales anything past ~1568px on the long edge anyway
+IMAGE_MAX_EDGE = int(os.environ.get("IMAGE_MAX_EDGE", 1568))
+IMAGE_FORMAT = os.environ.get("IMAGE_FORMAT", "JPEG").upper()
+IMAGE_QUALITY = int(os.environ.get("IMAGE_QUALITY", 82))
+
+MEDIA_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+def preprocess_image(image_data: str, image_media_type: str):
+    """Shrink a base64 photo before it is sent to Claude Vision.
+
+    Decodes once, applies and then drops the EXIF orientation (the re-encode
+    carries no EXIF, so GPS and camera tags go too), caps the long edge at
+    IMAGE_MAX_EDGE and re-encodes as IMAGE_FORMAT at IMAGE_QUALITY.
+
+    Returns ``(image_data, image_media_type, stats)``. If the image cannot be
+    decoded, the original payload is returned unchanged.
+    """
+    start = time.perf_counter()
+    stats = {}
+
+    try:
+        raw = base64.b64decode(image_data)
+        stats["original_bytes"] = len(raw)
+        with Image.open(io.BytesIO(raw)) as image:
+            had_exif = bool(image.getexif())
+            stats["original_size"] = image.size
+            scale = IMAGE_MAX_EDGE / max(image.size)
+            if image.format == "JPEG" and scale < 1:
+                # Let libjpeg decode at a reduced scale instead of full size
+                image.draft(
+                    "RGB",
+                    (int(image.size[0] * scale) + 1, int(image.size[1] * scale) + 1),
+                )
+            image = ImageOps.exif_transpose(image)
+            resized = max(image.size) > IMAGE_MAX_EDGE
+            if resized:
+                image.thumbnail((IMAGE_MAX_EDGE, IMAGE_MAX_EDGE), Image.LANCZOS)
+
+            if IMAGE_FORMAT == "JPEG" and image.mode != "RGB":
+                image = image.convert("RGB")
+            output = io.BytesIO()
+            image.save(output, IMAGE_FORMAT, quality=IMAGE_QUALITY, optimize=True)
+            stats["processed_size"] = image.size
+    except Exception as e:
+        print(f"⚠️ Could not preprocess image, sending it as-is: {e}")
+        original_bytes = stats.get("original_bytes", len(image_data))
+        stats.update(
+            original_bytes=original_bytes,
+            processed_bytes=original_bytes,
+            bytes_saved=0,
+            elapsed_ms=round((time.perf_counter() - start) * 1000, 1),
+        )
+        return image_data, image_media_type, stats
+
+    processed = output.getvalue()
+    if len(processed) >= len(raw) and not resized and not had_exif:
+        # Already small and clean - re-encoding would only cost quality
+        processed = raw
+        media_type = image_media_type
+        stats["processed_size"] = stats["original_size"]
+    else:
+        media_type = MEDIA_TYPES.get(IMAGE_FORMAT, image_media_type)
+
+    stats.update(
+        processed_bytes=len(processed),
+        bytes_saved=len(raw) - len(processed),
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 1),
+    )
+    print(
+        f"🖼️ Image {stats['original_bytes'] // 1024} KB -> "
+        f"{stats['processed_bytes'] // 1024} KB in {stats['elapsed_ms']} ms"
+    )
+    return base64.b64encode(processed).decode(), media_type, stats
@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from kijiji_session import KIJIJI_ORIGIN
+
+INBOX_URL = f"{KIJIJI_ORIGIN}/m-msg-my-messages/"
+# Poll quickly right after activity, then back off while the inbox is quiet
+INBOX_POLL_MIN = float(os.environ.get("INBOX_POLL_MIN", 15))
+INBOX_POLL_MAX = float(os.environ.get("INBOX_POLL_MAX", 300))
+INBOX_POLL_BACKOFF = float(os.environ.get("INBOX_POLL_BACKOFF", 1.5))
+# Give up on a listing nobody has answered for this long
+INBOX_WATCH_TIMEOUT = float(os.environ.get("INBOX_WATCH_TIMEOUT", 6 * 3600))
+# Failed inbox reads in a row before the watcher gives up on the page
+INBOX_MAX_READ_FAILURES = int(os.environ.get("INBOX_MAX_READ_FAILURES", 3))
+
+# Markup of the Messages List page: the list itself, or the empty-state
+# shown instead while nobody has written. Previews of messages we sent start
+# with OWN_MESSAGE_PREFIX, so our own replies never wake the negotiator.
+INBOX_SELECTOR = "[data-testid='conversation-list']"
+EMPTY_INBOX_SELECTOR = "[data-testid='empty-inbox']"
+CONVERSATION_SELECTOR = "[data-testid='conversation-list-item']"
+OWN_MESSAGE_PREFIX = "You:"
+
+# null when the page shows neither the list nor the empty-state
+READ_INBOX_JS = f"""() => JSON.stringify(
+    document.querySelector("{INBOX_SELECTOR}") || document.querySelector("{EMPTY_INBOX_SELECTOR}")
+        ? Array.from(document.querySelectorAll("{CONVERSATION_SELECTOR}")).map(el => ({{
+            id: el.getAttribute("data-conversation-id") || (el.querySelector("a") || {{}}).href || "",
+            text: el.innerText.trim(),
+        }}))
+        : null
+)"""
+
+
+class InboxUnreadable(Exception):
+    """The Messages List could not be read with the explicit selectors"""
+
+
+def conversation_hash(conversation: dict) -> str:
+    """Fingerprint of a conversation's list entry (last message, time, unread)"""
+    return hashlib.sha256(json.dumps(conversation, sort_keys=True).encode()).hexdigest()
+
+
+def is_from_buyer(conversation: dict) -> bool:
+    lines = conversation["text"].splitlines()
+    return not any(line.strip().startswith(OWN_MESSAGE_PREFIX) for line in lines)
+
+
+class InboxWatcher:
+    """Watches the most recent Kijiji conversation without involving the LLM.
+
+    Each poll reads the Messages List with plain DOM queries and compares the
+    first conversation against the hash from the previous poll. Polls start
+    every ``poll_min`` seconds and back off by ``backoff`` up to ``poll_max``
+    while nothing changes.
+
+    An empty inbox is normal until a buyer writes, so it is only taken as
+    unreadable when the page shows neither the conversation list nor its
+    empty-state (the selectors are stale). That, or ``max_read_failures``
+    failed reads in a row, raises InboxUnreadable so the caller can hand
+    over to the agent instead of polling an inbox it cannot see.
+
+    Call ``mark_seen`` right after posting and pass its result as
+    ``last_seen``, so a conversation already at the top of the inbox
+    (another ad's, say) is not taken for a new message.
+    """
+
+    def __init__(
+        self,
+        browser,
+        poll_min: float = INBOX_POLL_MIN,
+        poll_max: float = INBOX_POLL_MAX,
+        backoff: float = INBOX_POLL_BACKOFF,
+        max_read_failures: int = INBOX_MAX_READ_FAILURES,
+        last_seen: str = None,
+    ):
+        self.browser = browser
+        self.poll_min = poll_min
+        self.poll_max = poll_max
+        self.backoff = backoff
+        self.max_read_failures = max_read_failures
+        self.polls = 0
+        self._failures = 0
+        self._last_hash = last_seen
+
+    async def read_inbox(self):
+        """The listed conversations, or None if the page is not an inbox"""
+        await self.browser.navigate_to(INBOX_URL)
+        page = await self.browser.get_current_page()
+        return json.loads(await page.evaluate(READ_INBOX_JS))
+
+    async def _poll(self):
+        """One inbox read; None if it failed but may be retried"""
+        self.polls += 1
+        try:
+            conversations = await self.read_inbox()
+        except Exception as e:
+            self._failures += 1
+            print(f"⚠️ Could not read the Kijiji inbox ({self._failures}): {e}")
+            if self._failures >= self.max_read_failures:
+                raise InboxUnreadable(
+                    f"Kijiji inbox unreadable after {self._failures} tries: {e}"
+                ) from e
+            return None
+        self._failures = 0
+        if conversations is None:
+            print(f"⚠️ Neither {INBOX_SELECTOR} nor {EMPTY_INBOX_SELECTOR} matched")
+            raise InboxUnreadable(
+                f"Neither {INBOX_SELECTOR} nor {EMPTY_INBOX_SELECTOR} matched on the inbox page"
+            )
+        return conversations
+
+    async def mark_seen(self):
+        """Take the inbox as it is now as already handled; returns the
+        fingerprint to pass as ``last_seen`` to a later watcher"""
+        while True:
+            conversations = await self._poll()
+            if conversations is not None:
+                if conversations:
+                    self._last_hash = conversation_hash(conversations[0])
+                return self._last_hash
+            await asyncio.sleep(self.poll_min)
+
+    async def wait_for_buyer_message(self, timeout: float = INBOX_WATCH_TIMEOUT):
+        """Return the first conversation once it has a new buyer message.
+
+        A conversation counts when its entry changed since the last poll (or
+        ``mark_seen``) and its latest message is not ours. Returns
+        None if nothing arrives within ``timeout`` seconds; raises
+        InboxUnreadable if the inbox cannot be read.
+        """
+        deadline = time.monotonic() + timeout
+        delay = self.poll_min
+        while True:
+            conversations = await self._poll()
+            if conversations:
+                latest = conversations[0]
+                latest_hash = conversation_hash(latest)
+                if latest_hash != self._last_hash:
+                    self._last_hash = latest_hash
+                    delay = self.poll_min
+                    if is_from_buyer(latest):
+                        print(f"📨 New buyer message after {self.polls} inbox polls")
+                        return latest
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * self.backoff, self.poll_max)
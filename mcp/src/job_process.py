@@ -0,0 +1,398 @@
+import asyncio
+import importlib
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import psutil
+
+import job_store as job_store_module
+from job_store import JobStore, job_store
+
+# Replace a job process after this many jobs...
+JOB_PROCESS_MAX_JOBS = int(os.environ.get("JOB_PROCESS_MAX_JOBS", 20))
+# ...or once it and its browsers use this much memory
+JOB_PROCESS_MAX_RSS_MB = float(os.environ.get("JOB_PROCESS_MAX_RSS_MB", 2500))
+# Hard limit for jobs submitted without their own timeout
+JOB_TIMEOUT = float(os.environ.get("JOB_TIMEOUT", 3600))
+# Seconds a cancelled job gets to unwind before its process is killed
+JOB_CANCEL_GRACE = float(os.environ.get("JOB_CANCEL_GRACE", 15))
+
+# Imported before taking jobs so the first one starts warm (browser_pool also
+# registers the browser prewarm)
+WORKER_PRELOAD = ("server", "endpoints", "browser_pool")
+
+_context = multiprocessing.get_context("spawn")
+
+
+def process_tree_rss_mb(pid: int) -> float:
+    """Resident memory of ``pid`` and all its descendants in MB (0 if gone)"""
+    try:
+        root = psutil.Process(pid)
+        processes = [root, *root.children(recursive=True)]
+    except psutil.Error:
+        return 0.0
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / (1024 * 1024)
+
+
+def kill_process_tree(pid: int):
+    """SIGKILL ``pid`` and its descendants, e.g. a stuck job and its Chromium"""
+    try:
+        root = psutil.Process(pid)
+        processes = [*root.children(recursive=True), root]
+    except psutil.Error:
+        return
+    for process in processes:
+        try:
+            process.kill()
+        except psutil.Error:
+            pass
+    psutil.wait_procs(processes, timeout=5)
+
+
+def preload_worker_modules(modules=WORKER_PRELOAD):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"⚠️ Could not preload {name}: {e}")
+
+
+class ParentJobStore(JobStore):
+    """Job store inside a job process: reads and writes go to the server.
+
+    Updates are sent as they happen, so the server's store (and anything
+    watching it, like wait_for_job) sees every stage live.
+    """
+
+    def __init__(self, conn, lock):
+        super().__init__()
+        self._conn = conn
+        self._lock = lock
+
+    def create(self, job_id: str, kind: str, payload: dict) -> dict:
+        with self._lock:
+            self._conn.send(("create", job_id, kind, payload))
+            return self._conn.recv()
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            self._conn.send(("update", job_id, fields))
+
+    def get(self, job_id: str):
+        with self._lock:
+            self._conn.send(("get", job_id))
+            return self._conn.recv()
+
+
+class ParentOutbox:
+    """Hands Poke notifications to the server's outbox"""
+
+    def __init__(self, conn, lock):
+        self._conn = conn
+        self._lock = lock
+
+    def enqueue(self, message: str):
+        with self._lock:
+            self._conn.send(("notify", message))
+
+    def start(self):
+        pass
+
+
+class ParentScheduler:
+    """Scheduler inside a job process: submissions go to the server's.
+
+    Lets a job queue a follow-up job (a posting its buyer negotiation)
+    instead of starting a second scheduler in the child. Worker
+    initializers still run here, on the child's own scheduler.
+    """
+
+    in_process = True
+
+    def __init__(self, conn, lock, local):
+        self._conn = conn
+        self._lock = lock
+        self._local = local
+
+    def on_worker_start(self, fn):
+        self._local.on_worker_start(fn)
+
+    async def run_initializers(self):
+        await self._local.run_initializers()
+
+    def submit(self, job_id: str, fn, *args, **options) -> int:
+        from job_queue import task_name
+
+        with self._lock:
+            self._conn.send(("submit", job_id, task_name(fn), list(args), options))
+            position = self._conn.recv()
+        if isinstance(position, Exception):
+            raise position
+        return position
+
+
+def submit_for_child(job_id: str, task: str, args: list, options: dict):
+    """Queue a job a child process submitted; QueueFull is returned, not raised"""
+    from job_queue import resolve_task
+    from scheduler import QueueFull, scheduler
+
+    try:
+        return scheduler.submit(job_id, resolve_task(task), *args, **options)
+    except QueueFull as e:
+        return e
+
+
+async def _receive(conn):
+    """Wait on the event loop until ``conn`` has a message, then read it"""
+    loop = asyncio.get_running_loop()
+    while not conn.poll():
+        readable = loop.create_future()
+
+        def wake():
+            if not readable.done():
+                readable.set_result(None)
+
+        loop.add_reader(conn.fileno(), wake)
+        try:
+            await readable
+        finally:
+            loop.remove_reader(conn.fileno())
+    return conn.recv()
+
+
+def _fail(job_id: str, error: str):
+    job = job_store_module.job_store.get(job_id)
+    if job is not None and job["status"] in ("queued", "running"):
+        job_store_module.job_store.update(
+            job_id, status="failed", error=error, completed_at=time.time()
+        )
+
+
+def report_timeout(job_id: str, timeout: float):
+    """Fail a job that overran ``timeout`` and tell the user"""
+    from notifications import send_poke_notification
+
+    _fail(job_id, f"Job timed out after {timeout:.0f} seconds")
+    send_poke_notification(
+        "This is a message from the Kijiji integration. A background "
+        f"browser job was stopped after {timeout / 60:.0f} minutes "
+        "without finishing. Alert the user about this timeout in your "
+        "natural voice."
+    )
+
+
+async def run_with_timeout(job_id: str, coro, timeout: float = None):
+    """Await a job on this loop, cancelling it once it overruns ``timeout``"""
+    timeout = timeout or JOB_TIMEOUT
+    try:
+        await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        print(f"⏱️ Job {job_id} overran {timeout:.0f}s, cancelled it")
+        report_timeout(job_id, timeout)
+    except Exception as e:
+        print(f"❌ Job {job_id} raised: {e}")
+        _fail(job_id, str(e))
+
+
+async def run_cancellable(coro, cancelled, poll: float = 0.2):
+    """Run ``coro`` as a task, cancelling it once ``cancelled()`` returns true.
+
+    Cancellation is cooperative: the job unwinds through its ``finally``
+    blocks (handing back its browser) and this returns once it has.
+    """
+    task = asyncio.ensure_future(coro)
+    while not task.done():
+        await asyncio.wait({task}, timeout=poll)
+        if not task.done() and cancelled():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            return
+    return task.result()
+
+
+def _child_main(conn, preload, cancel):
+    # Swap in the forwarding store, outbox and scheduler before the job
+    # modules bind them
+    import notifications
+    import scheduler
+
+    lock = threading.Lock()
+    job_store_module.job_store = ParentJobStore(conn, lock)
+    notifications.outbox = ParentOutbox(conn, lock)
+    scheduler.scheduler = ParentScheduler(conn, lock, scheduler.scheduler)
+    asyncio.run(_child_loop(conn, preload, cancel))
+
+
+async def _child_loop(conn, preload, cancel):
+    """Run jobs one at a time as tasks on this process's single event loop"""
+    from job_queue import resolve_task
+    from scheduler import scheduler
+
+    preload_worker_modules(preload)
+    await scheduler.run_initializers()
+
+    while True:
+        try:
+            job = await _receive(conn)
+        except EOFError:
+            break
+        if job is None:
+            break
+        job_id, task, args = job
+        try:
+            await run_cancellable(resolve_task(task)(*args), cancel.is_set)
+        except Exception as e:
+            print(f"❌ Job {job_id} raised: {e}")
+            _fail(job_id, str(e))
+        conn.send(("done", job_id))
+
+    if "browser_pool" in sys.modules:
+        await sys.modules["browser_pool"].get_browser_pool().close()
+
+
+class JobProcess:
+    """A child process that runs one scheduler slot's jobs one at a time.
+
+    Browser agents, Chromium and LLM clients live in the child, so leaks
+    and stuck jobs stay out of the server. The child is replaced after
+    ``max_jobs`` jobs or once its process tree (browsers included) passes
+    ``max_rss_mb``, and killed outright when a job overruns its timeout.
+    Its pipe is read on the caller's event loop, so waiting on a job ties
+    up no thread.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int = JOB_PROCESS_MAX_JOBS,
+        max_rss_mb: float = JOB_PROCESS_MAX_RSS_MB,
+        preload=WORKER_PRELOAD,
+    ):
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.preload = preload
+        self.process = None
+        self.jobs = 0
+        self._conn = None
+        self._cancel = None
+
+    def start(self):
+        """Spawn the child now, so it preloads and warms browsers before a job"""
+        parent_conn, child_conn = _context.Pipe()
+        self._cancel = _context.Event()
+        self.process = _context.Process(
+            target=_child_main,
+            args=(child_conn, self.preload, self._cancel),
+            name="mcpetsy-job",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self.jobs = 0
+
+    def rss_mb(self) -> float:
+        return process_tree_rss_mb(self.process.pid) if self.process else 0.0
+
+    async def run(self, job_id: str, fn, args, timeout: float = None):
+        """Run ``fn(*args)`` in the child, applying its updates as they arrive"""
+        from job_queue import task_name
+
+        if self.process is None or not self.process.is_alive():
+            await self._discard()
+            self.start()
+        timeout = timeout or JOB_TIMEOUT
+        self._cancel.clear()
+        self._conn.send((job_id, task_name(fn), list(args)))
+
+        try:
+            async with asyncio.timeout(timeout):
+                await self._follow()
+        except asyncio.CancelledError:
+            await self._stop_job(job_id)
+            raise
+        except TimeoutError:
+            print(f"⏱️ Job {job_id} overran {timeout:.0f}s, killing its process")
+            await self._discard()
+            report_timeout(job_id, timeout)
+            return
+        except (EOFError, OSError):
+            await asyncio.to_thread(self.process.join, 5)
+            exitcode = self.process.exitcode
+            print(f"❌ Job process died ({exitcode}) while running job {job_id}")
+            await self._discard()
+            _fail(job_id, f"Job process exited ({exitcode}) during the job")
+            return
+
+        self.jobs += 1
+        rss_mb = self.rss_mb()
+        if self.jobs >= self.max_jobs or rss_mb > self.max_rss_mb:
+            print(f"♻️ Recycling job process after {self.jobs} job(s), {rss_mb:.0f} MB")
+            await self.stop()
+            self.start()
+
+    async def _follow(self):
+        """Apply the child's messages until it reports the job done"""
+        from notifications import send_poke_notification
+
+        while True:
+            message = await _receive(self._conn)
+            kind = message[0]
+            if kind == "update":
+                job_store.update(message[1], **message[2])
+            elif kind == "get":
+                self._conn.send(job_store.get(message[1]))
+            elif kind == "create":
+                self._conn.send(job_store.create(*message[1:]))
+            elif kind == "notify":
+                send_poke_notification(message[1])
+            elif kind == "submit":
+                self._conn.send(submit_for_child(*message[1:]))
+            elif kind == "done":
+                return
+
+    async def _stop_job(self, job_id: str):
+        """Have the child cancel its job, killing it if that takes too long"""
+        self._cancel.set()
+        try:
+            async with asyncio.timeout(JOB_CANCEL_GRACE):
+                await self._follow()
+        except (TimeoutError, EOFError, OSError):
+            print(f"⏱️ Job {job_id} ignored its cancellation, killing its process")
+            await self._discard()
+
+    async def stop(self, timeout: float = 10.0):
+        """Let the child close its browsers and exit, killing it if it hangs"""
+        if self.process is None:
+            return
+        try:
+            self._conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        await asyncio.to_thread(self.process.join, timeout)
+        await self._discard()
+
+    async def _discard(self):
+        if self.process is None:
+            return
+        from metrics import mark_process_dead
+
+        process, conn = self.process, self._conn
+        self.process = None
+        self._conn = None
+        if process.is_alive():
+            await asyncio.to_thread(kill_process_tree, process.pid)
+        await asyncio.to_thread(process.join)
+        mark_process_dead(process.pid)
+        conn.close()
@@ -0,0 +1,349 @@
+import asyncio
+import importlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+from job_process import (
+    JOB_PROCESS_MAX_JOBS,
+    JOB_PROCESS_MAX_RSS_MB,
+    JOB_TIMEOUT,
+    process_tree_rss_mb,
+    run_cancellable,
+)
+from job_store import job_store
+from scheduler import PRIORITY_SEARCH, QueueFull, WorkerInitializers, mark_cancelled
+from sqlite_util import ThreadLocalConnection
+
+JOB_QUEUE_PATH = os.environ.get("JOB_QUEUE_PATH", "queue.db")
+# Seconds an idle worker waits before looking at the queue again
+JOB_QUEUE_POLL = float(os.environ.get("JOB_QUEUE_POLL", 0.5))
+# Seconds between checks for worker processes that died holding a job
+JOB_QUEUE_REAP_INTERVAL = 10.0
+
+
+def task_name(fn) -> str:
+    """``module:function`` a worker process can import ``fn`` by"""
+    module = fn.__module__
+    if module == "__main__":
+        # server.py started as a script - workers import it as "server"
+        script = sys.modules["__main__"].__file__
+        module = os.path.splitext(os.path.basename(script))[0]
+    return f"{module}:{fn.__qualname__}"
+
+
+def resolve_task(name: str):
+    module, _, attr = name.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SharedQueue(WorkerInitializers):
+    """Drop-in for ``Scheduler`` whose queue lives in a SQLite file.
+
+    Front ends only insert jobs; separate worker processes (``worker.py``)
+    claim them one at a time and run them. Claims happen inside an
+    ``IMMEDIATE`` transaction, so every job runs exactly once however many
+    front ends and workers share the file. Priorities and per-key limits
+    behave as in the in-process scheduler. Job status lives in the SQLite
+    job store, so any front end can answer for any job.
+
+    A worker process exits after JOB_PROCESS_MAX_JOBS jobs or once it passes
+    JOB_PROCESS_MAX_RSS_MB, and ``worker.py`` kills it when a job overruns
+    its timeout; either way the supervisor starts a fresh one.
+    """
+
+    in_process = False
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, max_queue: int = None):
+        self.path = path
+        self.max_queue = max_queue or int(os.environ.get("SCHEDULER_MAX_QUEUE", 50))
+        self._conn = ThreadLocalConnection(
+            path, row_factory=sqlite3.Row, pragmas=("synchronous=NORMAL",)
+        )
+        self._initializers = []
+        self._last_reap = 0.0
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS queue (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL UNIQUE,
+                task TEXT NOT NULL,
+                args TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                key TEXT,
+                key_limit INTEGER NOT NULL DEFAULT 1,
+                timeout REAL,
+                worker TEXT,
+                claimed_at REAL,
+                deadline REAL,
+                cancel_requested INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_queue_waiting ON queue (worker, priority, seq);
+            CREATE TABLE IF NOT EXISTS queue_workers (
+                id TEXT PRIMARY KEY,
+                pid INTEGER NOT NULL,
+                started_at REAL NOT NULL
+            );
+            """)
+        columns = {row[1] for row in self._conn().execute("PRAGMA table_info(queue)")}
+        if "cancel_requested" not in columns:
+            # Queue files from before cancel_job
+            self._conn().execute(
+                "ALTER TABLE queue ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0"
+            )
+
+    @contextmanager
+    def _transaction(self):
+        """Hold the write lock for the block, so claims never race"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def start(self):
+        """Nothing to start here - jobs run in ``worker.py`` processes"""
+
+    def submit(
+        self,
+        job_id: str,
+        fn,
+        *args,
+        priority: int = PRIORITY_SEARCH,
+        key: str = None,
+        key_limit: int = None,
+        timeout: float = None,
+    ) -> int:
+        """Queue ``fn(*args)`` for a worker process and return its position.
+
+        ``fn`` must be a module-level coroutine function and ``args``
+        JSON-serializable, since the worker imports and calls it by name.
+        """
+        with self._transaction() as conn:
+            waiting = conn.execute(
+                "SELECT COUNT(*) FROM queue WHERE worker IS NULL"
+            ).fetchone()[0]
+            if waiting >= self.max_queue:
+                raise QueueFull(f"Job queue is full ({self.max_queue} waiting)")
+            conn.execute(
+                "INSERT INTO queue (job_id, task, args, priority, key, key_limit, timeout) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    task_name(fn),
+                    json.dumps(args),
+                    priority,
+                    key,
+                    key_limit or 1,
+                    timeout or JOB_TIMEOUT,
+                ),
+            )
+            return self._position(conn, job_id)
+
+    def _running_for_key(self, conn, key) -> int:
+        return conn.execute(
+            "SELECT COUNT(*) FROM queue WHERE worker IS NOT NULL AND key = ?", (key,)
+        ).fetchone()[0]
+
+    def _position(self, conn, job_id: str):
+        row = conn.execute(
+            "SELECT seq, priority, key, key_limit FROM queue "
+            "WHERE job_id = ? AND worker IS NULL",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        ahead = conn.execute(
+            "SELECT COUNT(*) FROM queue WHERE worker IS NULL "
+            "AND (priority < ? OR (priority = ? AND seq < ?))",
+            (row["priority"], row["priority"], row["seq"]),
+        ).fetchone()[0]
+        workers = conn.execute("SELECT COUNT(*) FROM queue_workers").fetchone()[0]
+        running = conn.execute(
+            "SELECT COUNT(*) FROM queue WHERE worker IS NOT NULL"
+        ).fetchone()[0]
+        position = max(0, ahead + 1 - max(0, workers - running))
+        key = row["key"]
+        if key is not None and self._running_for_key(conn, key) >= row["key_limit"]:
+            # Waiting on its own key, however many workers are idle
+            position = max(position, 1)
+        return position
+
+    def position(self, job_id: str):
+        """Return how many jobs must start before this one, or None if not queued"""
+        return self._position(self._conn(), job_id)
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        running_by_key = {
+            row["key"]: row["count"]
+            for row in conn.execute(
+                "SELECT key, COUNT(*) AS count FROM queue "
+                "WHERE worker IS NOT NULL AND key IS NOT NULL GROUP BY key"
+            )
+        }
+        counts = conn.execute(
+            "SELECT COUNT(worker), COUNT(*) - COUNT(worker) FROM queue"
+        ).fetchone()
+        return {
+            "workers": conn.execute("SELECT COUNT(*) FROM queue_workers").fetchone()[0],
+            "active": counts[0],
+            "queued": counts[1],
+            "max_queue": self.max_queue,
+            "running_by_key": running_by_key,
+        }
+
+    def _claim(self, worker_id: str):
+        """Take the best waiting job whose key has a free slot, or None"""
+        with self._transaction() as conn:
+            row = conn.execute("""
+                SELECT seq, job_id, task, args, timeout FROM queue AS waiting
+                WHERE worker IS NULL AND (
+                    key IS NULL OR (
+                        SELECT COUNT(*) FROM queue AS running
+                        WHERE running.worker IS NOT NULL AND running.key = waiting.key
+                    ) < key_limit
+                )
+                ORDER BY priority, seq LIMIT 1
+                """).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE queue SET worker = ?, claimed_at = ?, deadline = ? WHERE seq = ?",
+                (worker_id, now, now + row["timeout"], row["seq"]),
+            )
+            return row["job_id"], row["task"], json.loads(row["args"])
+
+    def cancel(self, job_id: str):
+        """Drop a waiting job ("dequeued"), or flag a claimed one for its
+        worker to cancel ("cancelling"); None if the queue does not hold it"""
+        with self._transaction() as conn:
+            if conn.execute(
+                "DELETE FROM queue WHERE job_id = ? AND worker IS NULL", (job_id,)
+            ).rowcount:
+                return "dequeued"
+            if conn.execute(
+                "UPDATE queue SET cancel_requested = 1 WHERE job_id = ?", (job_id,)
+            ).rowcount:
+                return "cancelling"
+        return None
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        row = (
+            self._conn()
+            .execute("SELECT cancel_requested FROM queue WHERE job_id = ?", (job_id,))
+            .fetchone()
+        )
+        return bool(row and row[0])
+
+    def overdue_workers(self) -> list:
+        """PIDs of worker processes whose job has passed its deadline"""
+        return [
+            row["pid"]
+            for row in self._conn().execute(
+                "SELECT DISTINCT queue_workers.pid FROM queue "
+                "JOIN queue_workers ON queue_workers.id = queue.worker "
+                "WHERE queue.deadline < ?",
+                (time.time(),),
+            )
+        ]
+
+    def reap_dead_workers(self) -> int:
+        """Fail the jobs of worker processes that exited mid-job"""
+        self._last_reap = time.time()
+        with self._transaction() as conn:
+            dead = [
+                row["id"]
+                for row in conn.execute("SELECT id, pid FROM queue_workers")
+                if not _pid_alive(row["pid"])
+            ]
+            orphaned = []
+            for worker_id in dead:
+                orphaned += conn.execute(
+                    "SELECT job_id, timeout, deadline FROM queue WHERE worker = ?",
+                    (worker_id,),
+                ).fetchall()
+                conn.execute("DELETE FROM queue WHERE worker = ?", (worker_id,))
+                conn.execute("DELETE FROM queue_workers WHERE id = ?", (worker_id,))
+        now = time.time()
+        for job_id, timeout, deadline in orphaned:
+            if deadline is not None and deadline < now:
+                error = f"Job timed out after {timeout:.0f} seconds"
+            else:
+                error = "Worker process exited while running the job"
+            print(f"⚠️ Job {job_id} failed: {error}")
+            job_store.update(job_id, status="failed", error=error, completed_at=now)
+        return len(orphaned)
+
+    async def serve(self, stop: asyncio.Event = None):
+        """Run queued jobs one at a time on this process's event loop until
+        ``stop`` is set.
+
+        Returns early once the process is due for recycling.
+        """
+        stop = stop or asyncio.Event()
+        worker_id = f"{os.getpid()}-{time.time():.0f}"
+        self._conn().execute(
+            "INSERT INTO queue_workers (id, pid, started_at) VALUES (?, ?, ?)",
+            (worker_id, os.getpid(), time.time()),
+        )
+        try:
+            await self.run_initializers()
+            jobs = 0
+            while not stop.is_set():
+                claimed = self._claim(worker_id)
+                if claimed is None:
+                    if time.time() - self._last_reap > JOB_QUEUE_REAP_INTERVAL:
+                        self.reap_dead_workers()
+                    try:
+                        await asyncio.wait_for(stop.wait(), JOB_QUEUE_POLL)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                job_id, task, args = claimed
+                try:
+                    await run_cancellable(
+                        resolve_task(task)(*args),
+                        lambda: self._cancel_requested(job_id),
+                        poll=JOB_QUEUE_POLL,
+                    )
+                    if self._cancel_requested(job_id):
+                        print(f"🛑 Queue job {job_id} cancelled")
+                        mark_cancelled(job_id)
+                except Exception as e:
+                    print(f"❌ Queue job {job_id} raised: {e}")
+                    job = job_store.get(job_id)
+                    if job is not None and job["status"] in ("queued", "running"):
+                        job_store.update(
+                            job_id,
+                            status="failed",
+                            error=str(e),
+                            completed_at=time.time(),
+                        )
+                finally:
+                    self._conn().execute(
+                        "DELETE FROM queue WHERE job_id = ?", (job_id,)
+                    )
+                jobs += 1
+                rss_mb = process_tree_rss_mb(os.getpid())
+                if jobs >= JOB_PROCESS_MAX_JOBS or rss_mb > JOB_PROCESS_MAX_RSS_MB:
+                    print(f"♻️ Recycling worker after {jobs} job(s), {rss_mb:.0f} MB")
+                    return
+        finally:
+            self._conn().execute("DELETE FROM queue_workers WHERE id = ?", (worker_id,))
@@ -0,0 +1,265 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from sqlite_util import ThreadLocalConnection
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+# Columns stored alongside the job payload
+JOB_FIELDS = ("status", "result", "error", "created_at", "started_at", "completed_at")
+
+# Progress stages reported to clients, in order, per job kind
+JOB_STAGES = {
+    "post": ("queued", "login", "form_fill", "posted", "completed"),
+    "negotiate": ("queued", "login", "negotiating", "completed"),
+    "search": ("queued", "searching", "completed"),
+    "bulk_post": ("queued", "categorizing", "login", "posting", "completed"),
+}
+
+
+def job_stage(job: dict) -> str:
+    return job.get("stage") or job["status"]
+
+
+class JobStore:
+    """Interface for background job storage.
+
+    Jobs are plain dicts: the payload the job was created with (query,
+    product_info, ...) merged with the status/result/timestamp fields.
+    Finished jobs are evicted once they are older than ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl: float = None):
+        self.ttl = ttl or float(os.environ.get("JOB_TTL_SECONDS", 24 * 3600))
+        self._watchers = {}
+        self._watchers_lock = threading.Lock()
+
+    def watch(self, job_id, callback):
+        """Call ``callback(job_id)`` after every update to ``job_id``.
+
+        Pass ``job_id=None`` to watch every job. Callbacks run on the updating
+        thread, so they should only hand off (e.g. ``loop.call_soon_threadsafe``).
+        Returns a function that stops watching.
+        """
+        with self._watchers_lock:
+            self._watchers.setdefault(job_id, []).append(callback)
+
+        def unwatch():
+            with self._watchers_lock:
+                callbacks = self._watchers.get(job_id, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+                if not callbacks:
+                    self._watchers.pop(job_id, None)
+
+        return unwatch
+
+    def _notify(self, job_id: str):
+        with self._watchers_lock:
+            callbacks = [
+                *self._watchers.get(job_id, ()),
+                *self._watchers.get(None, ()),
+            ]
+        for callback in callbacks:
+            callback(job_id)
+
+    def create(self, job_id: str, kind: str, payload: dict) -> dict:
+        raise NotImplementedError
+
+    def update(self, job_id: str, **fields):
+        raise NotImplementedError
+
+    def get(self, job_id: str):
+        raise NotImplementedError
+
+    def delete(self, job_id: str):
+        raise NotImplementedError
+
+    def evict_expired(self) -> int:
+        raise NotImplementedError
+
+    def fail_interrupted(self) -> int:
+        """Mark jobs left queued/running by a previous process as failed"""
+        raise NotImplementedError
+
+
+class MemoryJobStore(JobStore):
+    """In-process store capped at ``max_jobs`` entries.
+
+    Past the cap the oldest finished jobs are evicted first. Queued and
+    running jobs are never dropped (the scheduler's queue limit bounds them),
+    so their later updates always land.
+    """
+
+    def __init__(self, ttl: float = None, max_jobs: int = 1000):
+        super().__init__(ttl)
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, kind: str, payload: dict) -> dict:
+        job = {**payload, "kind": kind, "status": "queued", "created_at": time.time()}
+        with self._lock:
+            self._jobs[job_id] = job
+            excess = len(self._jobs) - self.max_jobs
+            if excess > 0:
+                finished = [
+                    old_id
+                    for old_id, old in self._jobs.items()
+                    if old["status"] in FINISHED_STATUSES
+                ]
+                for old_id in finished[:excess]:
+                    del self._jobs[old_id]
+        self.evict_expired()
+        return dict(job)
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+        self._notify(job_id)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def evict_expired(self) -> int:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job["status"] in FINISHED_STATUSES
+                and job.get("completed_at", cutoff) < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def fail_interrupted(self) -> int:
+        return 0
+
+
+class SQLiteJobStore(JobStore):
+    """Durable store in a WAL-mode SQLite file.
+
+    Results live on disk rather than in the process, so memory stays flat no
+    matter how many jobs have run, and jobs survive a restart. Each thread
+    gets its own connection.
+    """
+
+    EVICT_INTERVAL = 60.0
+
+    def __init__(self, path: str, ttl: float = None):
+        super().__init__(ttl)
+        self.path = path
+        # Keep the page cache small (~2 MB) - rows are read one at a time
+        self._conn = ThreadLocalConnection(
+            path,
+            row_factory=sqlite3.Row,
+            pragmas=("synchronous=NORMAL", "cache_size=-2000"),
+        )
+        self._last_evict = 0.0
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                completed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+            CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at);
+            """)
+
+    def create(self, job_id: str, kind: str, payload: dict) -> dict:
+        created_at = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, status, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, kind, "queued", json.dumps(payload), created_at),
+        )
+        if created_at - self._last_evict > self.EVICT_INTERVAL:
+            self.evict_expired()
+        return {**payload, "kind": kind, "status": "queued", "created_at": created_at}
+
+    def update(self, job_id: str, **fields):
+        assignments = []
+        values = []
+        extra = {}
+        for key, value in fields.items():
+            if key in JOB_FIELDS:
+                assignments.append(f"{key} = ?")
+                values.append(value)
+            else:
+                extra[key] = value
+        if extra:
+            # Anything that is not a column is merged into the JSON payload
+            assignments.append("payload = json_patch(payload, ?)")
+            values.append(json.dumps(extra))
+        if assignments:
+            self._conn().execute(
+                f"UPDATE jobs SET {', '.join(assignments)} WHERE id = ?",
+                (*values, job_id),
+            )
+        self._notify(job_id)
+
+    def get(self, job_id: str):
+        row = (
+            self._conn()
+            .execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            .fetchone()
+        )
+        if row is None:
+            return None
+        job = json.loads(row["payload"])
+        job["kind"] = row["kind"]
+        for field in JOB_FIELDS:
+            if row[field] is not None:
+                job[field] = row[field]
+        return job
+
+    def delete(self, job_id: str):
+        self._conn().execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def evict_expired(self) -> int:
+        self._last_evict = time.time()
+        cursor = self._conn().execute(
+            f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED_STATUSES))}) "
+            "AND completed_at < ?",
+            (*FINISHED_STATUSES, self._last_evict - self.ttl),
+        )
+        return cursor.rowcount
+
+    def fail_interrupted(self) -> int:
+        cursor = self._conn().execute(
+            "UPDATE jobs SET status = 'failed', error = ?, completed_at = ? "
+            "WHERE status IN ('queued', 'running')",
+            ("Interrupted by a server restart", time.time()),
+        )
+        return cursor.rowcount
+
+
+def open_job_store() -> JobStore:
+    """Build the store selected by JOB_STORE (``sqlite`` or ``memory``)"""
+    backend = os.environ.get("JOB_STORE", "sqlite")
+    if backend == "memory":
+        return MemoryJobStore()
+    if backend == "sqlite":
+        return SQLiteJobStore(os.environ.get("JOB_STORE_PATH", "jobs.db"))
+    raise ValueError(f"Unknown JOB_STORE backend: {backend}")
+
+
+job_store = open_job_store()
@@ -0,0 +1,194 @@
+import os
+import time
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import async_playwright
+
+from kijiji_session import KIJIJI_ORIGIN
+from metrics import observe_stage
+
+KIJIJI_SCRIPTED_POSTING = (
+    os.environ.get("KIJIJI_SCRIPTED_POSTING", "true").lower() == "true"
+)
+# How long each scripted step may wait for its element before giving up
+KIJIJI_STEP_TIMEOUT_MS = int(os.environ.get("KIJIJI_STEP_TIMEOUT_MS", 10000))
+
+POSTING_PROVINCE = "Alberta"
+POSTING_CITY = "Red Deer"
+POSTING_LOCATION = "Markham, Ontario L6C 2W6"
+
+# Explicit selectors for the posting form. When Kijiji changes its markup the
+# step that uses a stale selector hands over to the LLM agent, so keep these
+# (and the mock in stand_ins.KijijiStandIn) in sync when fixing one.
+SELECTORS = {
+    "province": f"a:has-text('{POSTING_PROVINCE}')",
+    "city": f"a:has-text('{POSTING_CITY}')",
+    "location_go": "button:has-text('Go')",
+    "popup_close": "[aria-label='Close']",
+    "title": "#AdTitleForm",
+    "title_next": "button:has-text('Next')",
+    "category_group": "a:has-text('Buy & Sell')",
+    "category": "a.category-link:text-is('{category}')",
+    "subcategory": "a.subcategory-link",
+    "ad_type_offering": "#adType1",
+    "for_sale_by_owner": "#forsaleby_ownr",
+    "description": "#pstad-descrptn",
+    "location": "#location",
+    "price": "#PriceAmount",
+    "submit": "button:has-text('Post Your Ad')",
+}
+POSTED_URL = "**/v-view-details.html**"
+
+
+class ScriptedStepFailed(Exception):
+    """A scripted step could not find or drive its element"""
+
+    def __init__(self, step: str, index: int, error: Exception):
+        super().__init__(f"Scripted step '{step}' failed: {error}")
+        self.step = step
+        self.index = index
+
+    @property
+    def submitted(self) -> bool:
+        """The Post Your Ad click already went through - never submit again"""
+        return self.index > SUBMIT_STEP
+
+
+async def select_location(page, product_info, base_url):
+    await page.goto(f"{base_url}/p-select-category.html")
+    await page.click(SELECTORS["province"])
+    await page.click(SELECTORS["city"])
+    await page.click(SELECTORS["location_go"])
+    # The welcome popup only shows sometimes - don't fail the step over it
+    popup = page.locator(SELECTORS["popup_close"])
+    if await popup.count():
+        await popup.first.click()
+
+
+async def enter_title(page, product_info, base_url):
+    await page.fill(SELECTORS["title"], product_info["title"])
+    await page.click(SELECTORS["title_next"])
+
+
+async def choose_category(page, product_info, base_url):
+    await page.click(SELECTORS["category_group"])
+    await page.click(SELECTORS["category"].format(category=product_info["category"]))
+    subcategories = page.locator(SELECTORS["subcategory"])
+    if await subcategories.count():
+        await subcategories.first.click()
+
+
+async def fill_details(page, product_info, base_url):
+    await page.check(SELECTORS["ad_type_offering"])
+    await page.check(SELECTORS["for_sale_by_owner"])
+    await page.fill(SELECTORS["description"], product_info["description"])
+    await page.fill(SELECTORS["location"], POSTING_LOCATION)
+    await page.fill(SELECTORS["price"], str(product_info["price"]))
+
+
+async def submit_ad(page, product_info, base_url):
+    await page.click(SELECTORS["submit"])
+
+
+async def confirm_posted(page, product_info, base_url):
+    await page.wait_for_url(POSTED_URL)
+
+
+# (name, scripted action, instruction the agent gets if it has to take over)
+POSTING_STEPS = [
+    (
+        "select_location",
+        select_location,
+        f"Go to {{base_url}}/p-select-category.html. Click {POSTING_PROVINCE} and then click {POSTING_CITY}. Click Go. Go to post ad button again\n"
+        "    - Click x on the middle right to close the popup",
+    ),
+    ("enter_title", enter_title, "- Title (text input): {title}"),
+    (
+        "choose_category",
+        choose_category,
+        "- Category Buy and Sell\n"
+        "    - Select a category that is {category}\n"
+        "    - If you are on a subcategory page, select a random subcategory",
+    ),
+    (
+        "fill_details",
+        fill_details,
+        "- Select Im offering for ad type\n"
+        "    - Select for sale by owner\n"
+        "    - Description (text input): {description}\n"
+        f"    - In the location field, enter {POSTING_LOCATION}\n"
+        "    - DO NOT CLICK SELECT IMAGES\n"
+        "    - Enter the price (input field): '{price}'",
+    ),
+    (
+        "submit_ad",
+        submit_ad,
+        "- Click the Post Your Ad button at the bottom of the page to finish the process",
+    ),
+    # Split from submit_ad so a missed redirect is checked, not re-submitted
+    (
+        "confirm_posted",
+        confirm_posted,
+        "- The ad has ALREADY been submitted. DO NOT click Post Your Ad again or post anything.\n"
+        "    - Go to {base_url}/m-my-ads/active and check whether an ad titled '{title}' is listed\n"
+        "    - Finish with success only if it is listed",
+    ),
+]
+SUBMIT_STEP = [name for name, _, _ in POSTING_STEPS].index("submit_ad")
+
+
+def remaining_instructions(product_info: dict, start: int = 0, base_url=None) -> str:
+    """Agent instructions for the posting steps from ``start`` onwards"""
+    values = {**product_info, "base_url": base_url or KIJIJI_ORIGIN}
+    instructions = "\n    ".join(
+        instruction.format(**values) for _, _, instruction in POSTING_STEPS[start:]
+    )
+    if start:
+        return f"You are part-way through posting an ad on Kijiji. Continue on the current page:\n    {instructions}"
+    return instructions
+
+
+async def post_listing(
+    page, product_info: dict, base_url=None, timeout_ms=KIJIJI_STEP_TIMEOUT_MS
+) -> dict:
+    """Run the posting steps on a Playwright ``page``.
+
+    Returns the time each step took in ms. Raises ScriptedStepFailed at the
+    first step whose selectors no longer match, so the caller can hand the
+    rest of the form to the agent.
+    """
+    base_url = base_url or KIJIJI_ORIGIN
+    page.set_default_timeout(timeout_ms)
+    timings = {}
+    for index, (name, action, _) in enumerate(POSTING_STEPS):
+        start = time.perf_counter()
+        try:
+            await action(page, product_info, base_url)
+        except PlaywrightError as e:
+            raise ScriptedStepFailed(name, index, e) from e
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    submit_ms = timings["submit_ad"] + timings["confirm_posted"]
+    observe_stage("form_fill", (sum(timings.values()) - submit_ms) / 1000)
+    observe_stage("submit", submit_ms / 1000)
+    return timings
+
+
+async def post_listing_in_session(browser, product_info: dict) -> dict:
+    """Run the scripted posting inside a browser-use session's Chromium.
+
+    Playwright attaches over CDP to the same browser (and the tab the session
+    is focused on), so on failure the agent continues from the exact page
+    the script stopped at.
+    """
+    current_url = await browser.get_current_page_url()
+    async with async_playwright() as playwright:
+        chromium = await playwright.chromium.connect_over_cdp(browser.cdp_url)
+        context = chromium.contexts[0]
+        page = next(
+            (page for page in context.pages if page.url == current_url),
+            context.pages[0] if context.pages else None,
+        )
+        if page is None:
+            page = await context.new_page()
+        return await post_listing(page, product_info)
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+
+from browser_use import Agent
+from browser_use.browser.events import LoadStorageStateEvent
+from metrics import record_agent_usage
+
+# Overridable so benchmarks can point the whole flow at a local mock
+KIJIJI_ORIGIN = os.environ.get("KIJIJI_BASE_URL", "https://www.kijiji.ca")
+KIJIJI_SESSION_DIR = os.environ.get("KIJIJI_SESSION_DIR", ".kijiji_sessions")
+
+# Only visible to signed-in users; logged-out visitors get bounced to sign-in
+LOGIN_CHECK_URL = f"{KIJIJI_ORIGIN}/m-my-ads/active"
+LOGGED_OUT_MARKERS = ("id.kijiji.ca", "/login", "sign-in", "signin")
+
+
+def session_path(username: str) -> str:
+    """Storage-state file for one Kijiji account"""
+    digest = hashlib.sha256((username or "").encode()).hexdigest()[:16]
+    return os.path.join(KIJIJI_SESSION_DIR, f"{digest}.json")
+
+
+async def save_session(browser, username: str):
+    """Write cookies and Kijiji localStorage to disk for the next run"""
+    state = await browser.export_storage_state()
+
+    # export_storage_state only covers cookies, so pull localStorage ourselves
+    page = await browser.get_current_page()
+    if page and (await page.get_url()).startswith(KIJIJI_ORIGIN):
+        entries = json.loads(
+            await page.evaluate("() => JSON.stringify(Object.entries(localStorage))")
+        )
+        state["origins"] = [
+            {
+                "origin": KIJIJI_ORIGIN,
+                "localStorage": [
+                    {"name": name, "value": value} for name, value in entries
+                ],
+            }
+        ]
+
+    path = session_path(username)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    # The file holds live auth cookies - keep it private to this user
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+    print(f"💾 Saved Kijiji session ({len(state['cookies'])} cookies)")
+
+
+async def restore_session(browser, username: str) -> bool:
+    """Load a saved storage state into the browser; False if there is none"""
+    path = session_path(username)
+    if not os.path.exists(path):
+        return False
+    event = browser.event_bus.dispatch(LoadStorageStateEvent(path=path))
+    await event
+    await event.event_result(raise_if_any=True, raise_if_none=False)
+    return True
+
+
+async def is_logged_in(browser) -> bool:
+    """Open a members-only page and check Kijiji did not redirect to sign-in"""
+    await browser.navigate_to(LOGIN_CHECK_URL)
+    url = (await browser.get_current_page_url()).lower()
+    return not any(marker in url for marker in LOGGED_OUT_MARKERS)
+
+
+async def ensure_logged_in(browser, llm, username: str, password: str) -> bool:
+    """Make sure ``browser`` is signed in to Kijiji.
+
+    Reuses the saved session when it is still valid and only falls back to
+    the LLM sign-in agent when it is missing or expired. Returns True if the
+    agent had to run.
+    """
+    try:
+        if await restore_session(browser, username) and await is_logged_in(browser):
+            print("🔑 Reusing saved Kijiji session")
+            return False
+    except Exception as e:
+        print(f"⚠️ Could not reuse saved Kijiji session: {e}")
+
+    task = f"""Go to {KIJIJI_ORIGIN} and sign in with these credentials (in 2 separate text fields):
+    - Username: {username}
+    - Password: {password}
+    and complete the sign-in process."""
+
+    agent = Agent(task=task, browser_session=browser, llm=llm)
+    record_agent_usage("agent.sign_in", await agent.run())
+
+    try:
+        await save_session(browser, username)
+    except Exception as e:
+        print(f"⚠️ Could not save Kijiji session: {e}")
+    return True
@@ -0,0 +1,146 @@
+import atexit
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Jobs run in child processes (JOB_ISOLATION=process), so samples go to files
+# in a directory shared with them. This must happen before the first metric
+# is created; children inherit the variable.
+_own_metrics_dir = None
+if (
+    os.environ.get("JOB_ISOLATION", "process") == "process"
+    and "PROMETHEUS_MULTIPROC_DIR" not in os.environ
+):
+    _own_metrics_dir = tempfile.mkdtemp(prefix="mcpetsy-metrics-")
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = _own_metrics_dir
+    atexit.register(shutil.rmtree, _own_metrics_dir, ignore_errors=True)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily  # noqa: E402
+
+from scheduler import scheduler  # noqa: E402
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# Stages span milliseconds (categorize) to tens of minutes (negotiate)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+STAGE_SECONDS = Histogram(
+    "mcpetsy_stage_seconds",
+    "Time spent in each stage of a search or posting job",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+LLM_CALLS = Counter(
+    "mcpetsy_llm_calls_total",
+    "Claude calls (or agent runs) per call site",
+    ["call_site"],
+)
+LLM_TOKENS = Counter(
+    "mcpetsy_llm_tokens_total",
+    "Claude tokens per call site",
+    ["call_site", "direction"],
+)
+LLM_SECONDS = Histogram(
+    "mcpetsy_llm_seconds",
+    "Claude call latency per call site",
+    ["call_site"],
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60),
+)
+ACTIVE_BROWSERS = Gauge(
+    "mcpetsy_active_browsers",
+    "Pooled browsers currently checked out by a job",
+    multiprocess_mode="livesum",
+)
+
+
+class SchedulerCollector:
+    """Queue depth and running jobs, read from the scheduler at scrape time"""
+
+    def collect(self):
+        stats = scheduler.stats()
+        yield GaugeMetricFamily(
+            "mcpetsy_queue_depth",
+            "Jobs waiting for a scheduler worker",
+            value=stats["queued"],
+        )
+        yield GaugeMetricFamily(
+            "mcpetsy_jobs_running",
+            "Jobs currently running on a worker",
+            value=stats["active"],
+        )
+
+
+# Kept out of the multiprocess files - only this process knows these values
+LIVE = CollectorRegistry()
+LIVE.register(SchedulerCollector())
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """``with stage_timer("login"):`` records the block's duration, even on error"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def record_usage(call_site: str, usage, seconds: float = None):
+    """Count tokens from an Anthropic ``message.usage``.
+
+    ``input`` only counts uncached input; prompt-cache reads and writes are
+    counted separately so the cache hit rate per call site is visible.
+    """
+    LLM_CALLS.labels(call_site).inc()
+    if seconds is not None:
+        LLM_SECONDS.labels(call_site).observe(seconds)
+    if usage is None:
+        return
+    LLM_TOKENS.labels(call_site, "input").inc(usage.input_tokens or 0)
+    LLM_TOKENS.labels(call_site, "output").inc(usage.output_tokens or 0)
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    LLM_TOKENS.labels(call_site, "cache_read").inc(cache_read)
+    LLM_TOKENS.labels(call_site, "cache_write").inc(cache_write)
+
+
+def record_agent_usage(call_site: str, history):
+    """Count tokens from a browser-use agent run's history"""
+    LLM_CALLS.labels(call_site).inc()
+    usage = getattr(history, "usage", None)
+    if usage is None:
+        return
+    LLM_TOKENS.labels(call_site, "input").inc(usage.total_prompt_tokens or 0)
+    LLM_TOKENS.labels(call_site, "output").inc(usage.total_completion_tokens or 0)
+
+
+def mark_process_dead(pid: int):
+    """Drop the live gauges of an exited job process"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
+
+def render():
+    """Prometheus text exposition: ``(body, content_type)``"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry) + generate_latest(LIVE), CONTENT_TYPE_LATEST
@@ -0,0 +1,246 @@
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import httpx
+from metrics import observe_stage
+from sqlite_util import ThreadLocalConnection
+
+POKE_WEBHOOK_URL = os.environ.get(
+    "POKE_WEBHOOK_URL", "https://poke.com/api/v1/inbound-sms/webhook"
+)
+NOTIFY_OUTBOX_PATH = os.environ.get("NOTIFY_OUTBOX_PATH", "outbox.db")
+NOTIFY_TIMEOUT = float(os.environ.get("NOTIFY_TIMEOUT", 5.0))
+NOTIFY_BASE_DELAY = float(os.environ.get("NOTIFY_BASE_DELAY", 1.0))
+NOTIFY_MAX_DELAY = float(os.environ.get("NOTIFY_MAX_DELAY", 300.0))
+NOTIFY_MAX_ATTEMPTS = int(os.environ.get("NOTIFY_MAX_ATTEMPTS", 8))
+NOTIFY_CONCURRENCY = int(os.environ.get("NOTIFY_CONCURRENCY", 4))
+
+
+class NotificationOutbox:
+    """Persistent, retrying queue of Poke messages.
+
+    Messages are written to SQLite before anything is sent, so a slow or
+    failing webhook (or a restart) never loses them. A single background
+    thread delivers them over one pooled async HTTP client with strict
+    timeouts, retrying failures with exponential backoff and jitter.
+    Messages still failing after ``max_attempts`` are kept as ``dead``.
+    """
+
+    # Longest one delivery attempt may hold a message before others retry it
+    LEASE_SECONDS = 60.0
+
+    def __init__(
+        self,
+        path: str = NOTIFY_OUTBOX_PATH,
+        url: str = POKE_WEBHOOK_URL,
+        timeout: float = NOTIFY_TIMEOUT,
+        base_delay: float = NOTIFY_BASE_DELAY,
+        max_delay: float = NOTIFY_MAX_DELAY,
+        max_attempts: int = NOTIFY_MAX_ATTEMPTS,
+    ):
+        self.path = path
+        self.url = url
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self._conn = ThreadLocalConnection(path)
+        self._thread = None
+        self._loop = None
+        self._wake = None
+        self._stopping = False
+        self._start_lock = threading.Lock()
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                message TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+            """)
+
+    def enqueue(self, message: str) -> int:
+        """Persist ``message`` and wake the sender; returns the outbox row id"""
+        now = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO outbox (message, next_attempt_at, created_at) VALUES (?, ?, ?)",
+            (message, now, now),
+        )
+        self.start()
+        self._poke()
+        return cursor.lastrowid
+
+    def pending(self) -> int:
+        return (
+            self._conn()
+            .execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'")
+            .fetchone()[0]
+        )
+
+    def start(self):
+        """Start the delivery thread (idempotent)"""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            ready = threading.Event()
+            self._thread = threading.Thread(
+                target=self._thread_main, args=(ready,), name="poke-outbox", daemon=True
+            )
+            self._thread.start()
+            ready.wait()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop delivering; anything undelivered stays in the outbox"""
+        self._stopping = True
+        self._poke()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _poke(self):
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass
+
+    def _thread_main(self, ready: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._wake = asyncio.Event()
+        ready.set()
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+
+    async def _run(self):
+        limits = httpx.Limits(
+            max_connections=NOTIFY_CONCURRENCY, max_keepalive_connections=2
+        )
+        timeout = httpx.Timeout(self.timeout, connect=min(self.timeout, 3.0))
+        async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+            while not self._stopping:
+                # Cleared before reading so an enqueue during the query still wakes us
+                self._wake.clear()
+                try:
+                    rows = self._claim_due()
+                    if rows:
+                        await asyncio.gather(
+                            *(self._deliver(client, *row) for row in rows)
+                        )
+                        continue
+
+                    next_due = (
+                        self._conn()
+                        .execute(
+                            "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'"
+                        )
+                        .fetchone()[0]
+                    )
+                    wait = (
+                        60.0 if next_due is None else max(0.0, next_due - time.time())
+                    )
+                except sqlite3.Error as e:
+                    # Keep the sender alive; leased messages retry when the lease ends
+                    print(f"❌ Poke outbox database error: {e}")
+                    wait = self.base_delay
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _claim_due(self) -> list:
+        """Lease due messages so other processes sharing the outbox skip them.
+
+        A sender that dies mid-attempt leaves the message to be retried once
+        its lease runs out.
+        """
+        now = time.time()
+        conn = self._conn()
+        # SELECT then UPDATE under the write lock; UPDATE ... RETURNING needs
+        # SQLite 3.35, newer than the one in the Docker image
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, message, attempts FROM outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (now, NOTIFY_CONCURRENCY),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET next_attempt_at = ? WHERE id = ?",
+                [(now + self.LEASE_SECONDS, row[0]) for row in rows],
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return rows
+
+    async def _deliver(self, client, row_id: int, message: str, attempts: int):
+        poke_api_key = os.environ.get("POKE_API_KEY")
+        start = time.perf_counter()
+        try:
+            response = await client.post(
+                self.url,
+                headers={"Authorization": f"Bearer {poke_api_key}"},
+                json={"message": message},
+            )
+            observe_stage("notify", time.perf_counter() - start)
+            if response.is_success:
+                self._conn().execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                print(f"✅ Poke notification sent: {message[:100]}...")
+                return
+            error = f"HTTP {response.status_code}"
+            # Client errors other than rate limiting will not fix themselves
+            permanent = (
+                400 <= response.status_code < 500 and response.status_code != 429
+            )
+        except httpx.HTTPError as e:
+            error = f"{type(e).__name__}: {e}"
+            permanent = False
+
+        attempts += 1
+        if permanent or attempts >= self.max_attempts:
+            print(
+                f"❌ Poke notification {row_id} gave up after {attempts} attempt(s): {error}"
+            )
+            self._conn().execute(
+                "UPDATE outbox SET status = 'dead', attempts = ?, last_error = ? WHERE id = ?",
+                (attempts, error, row_id),
+            )
+            return
+
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        delay *= random.uniform(0.5, 1.0)
+        print(
+            f"⚠️ Poke notification {row_id} failed ({error}), retrying in {delay:.1f}s"
+        )
+        self._conn().execute(
+            "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (attempts, time.time() + delay, error, row_id),
+        )
+
+
+outbox = NotificationOutbox()
+
+
+def send_poke_notification(message: str):
+    """Queue a Poke notification; delivery happens in the background"""
+    if not os.environ.get("POKE_API_KEY"):
+        print("⚠️ No POKE_API_KEY found - skipping notification")
+        return
+    try:
+        outbox.enqueue(message)
+    except Exception as e:
+        print(f"❌ Error queueing Poke notification: {e}")
@@ -0,0 +1,294 @@
+import asyncio
+import bisect
+import inspect
+import itertools
+import os
+import threading
+import time
+from collections import Counter
+
+from job_store import job_store
+
+# Lower number runs first - postings jump ahead of web searches, and buyer
+# negotiations, which wait on buyers for hours, start last
+PRIORITY_POST = 0
+PRIORITY_SEARCH = 10
+PRIORITY_NEGOTIATE = 20
+
+
+class QueueFull(Exception):
+    """Raised when the scheduler queue is at capacity"""
+
+
+def mark_cancelled(job_id: str):
+    """Mark a queued or running job cancelled (finished jobs keep their result)"""
+    job = job_store.get(job_id)
+    if job is not None and job["status"] in ("queued", "running"):
+        job_store.update(
+            job_id,
+            status="cancelled",
+            stage="cancelled",
+            error="Cancelled by request",
+            completed_at=time.time(),
+        )
+
+
+class WorkerInitializers:
+    """``on_worker_start`` hooks, shared by Scheduler and SharedQueue.
+
+    Subclasses set ``self._initializers = []`` and await
+    ``run_initializers()`` wherever their jobs run, before the first one.
+    """
+
+    def on_worker_start(self, fn):
+        """Register ``fn()`` (sync or async) to run wherever jobs run, before
+        the first one"""
+        self._initializers.append(fn)
+
+    async def run_initializers(self):
+        for initializer in self._initializers:
+            try:
+                result = initializer()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"⚠️ {type(self).__name__} worker initializer failed: {e}")
+
+
+class Scheduler(WorkerInitializers):
+    """Bounded priority queue drained by one asyncio runtime thread.
+
+    Every job starts a Chromium and an LLM agent, so ``workers`` (a semaphore
+    on the runtime loop) caps how many run at once. Jobs beyond that wait in
+    the queue, and submissions beyond ``max_queue`` are rejected instead of
+    piling up.
+
+    Jobs may carry a ``key`` (e.g. a Kijiji account) with its own concurrency
+    limit. The runtime starts the highest-priority, oldest job whose key has
+    a free slot, so jobs sharing a key run in FIFO order while different keys
+    run in parallel.
+
+    Jobs are coroutine functions. With ``isolation="process"`` (JOB_ISOLATION,
+    the default) each one runs in one of ``workers`` child processes (see
+    ``job_process``), recycled after a number of jobs or on an RSS limit and
+    killed when a job overruns its ``timeout``. ``"thread"`` runs jobs as
+    tasks on the runtime loop itself, sharing its browser pool and HTTP
+    clients, and cancels them on timeout.
+    """
+
+    # Jobs run on this process's threads, so job store watchers see updates
+    in_process = True
+
+    def __init__(
+        self, workers: int = None, max_queue: int = None, isolation: str = None
+    ):
+        self.workers = workers or int(os.environ.get("SCHEDULER_WORKERS", 2))
+        self.max_queue = max_queue or int(os.environ.get("SCHEDULER_MAX_QUEUE", 50))
+        self.isolation = isolation or os.environ.get("JOB_ISOLATION", "process")
+        if self.isolation not in ("process", "thread"):
+            raise ValueError(f"Unknown JOB_ISOLATION: {self.isolation}")
+        self._queue = []
+        self._seq = itertools.count()
+        self._key_limits = {}
+        self._running_by_key = Counter()
+        self._lock = threading.Lock()
+        self._active = 0
+        self._initializers = []
+        self._thread = None
+        self._ready = threading.Event()
+        self._loop = None
+        self._wake = None
+        self._running = {}
+
+    @property
+    def jobs_per_loop(self) -> int:
+        """How many jobs may share one event loop (and its browser pool)"""
+        return self.workers if self.isolation == "thread" else 1
+
+    def start(self):
+        """Start the runtime thread now instead of on the first submit"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._runtime, name="job-runtime", daemon=True
+                )
+                self._thread.start()
+        self._ready.wait()
+
+    def _runtime(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._wake = asyncio.Event()
+        self._loop = loop
+        self._ready.set()
+        loop.run_until_complete(self._dispatch())
+
+    async def _dispatch(self):
+        slots = asyncio.Semaphore(self.workers)
+        if self.isolation == "process":
+            from job_process import JobProcess
+
+            # Started right away so the children preload and warm their browsers
+            self._processes = asyncio.Queue()
+            for _ in range(self.workers):
+                process = JobProcess()
+                process.start()
+                self._processes.put_nowait(process)
+        else:
+            await self.run_initializers()
+
+        while True:
+            await slots.acquire()
+            entry = None
+            while entry is None:
+                self._wake.clear()
+                with self._lock:
+                    entry = self._take_runnable_locked()
+                    if entry is not None:
+                        self._active += 1
+                        self._running_by_key[entry[3]] += 1
+                        self._running[entry[2]] = asyncio.create_task(
+                            self._run(entry, slots)
+                        )
+                if entry is None:
+                    await self._wake.wait()
+
+    async def _run(self, entry, slots: asyncio.Semaphore):
+        _, _, job_id, key, fn, args, timeout = entry
+        try:
+            if self.isolation == "process":
+                # One process per slot, so one is always free here
+                process = self._processes.get_nowait()
+                try:
+                    await process.run(job_id, fn, args, timeout)
+                finally:
+                    self._processes.put_nowait(process)
+            else:
+                from job_process import run_with_timeout
+
+                await run_with_timeout(job_id, fn(*args), timeout)
+        except asyncio.CancelledError:
+            print(f"🛑 Job {job_id} cancelled")
+            # The job may have written "running" before the cancel reached it
+            mark_cancelled(job_id)
+        except Exception as e:
+            print(f"❌ Scheduler job {job_id} raised: {e}")
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+                self._active -= 1
+                self._running_by_key[key] -= 1
+            slots.release()
+            # A key slot freed up - a waiting job may now be runnable
+            self._wake.set()
+
+    def _key_has_slot(self, key) -> bool:
+        if key is None:
+            return True
+        return self._running_by_key[key] < self._key_limits.get(key, 1)
+
+    def _take_runnable_locked(self):
+        for index, entry in enumerate(self._queue):
+            if self._key_has_slot(entry[3]):
+                return self._queue.pop(index)
+        return None
+
+    def submit(
+        self,
+        job_id: str,
+        fn,
+        *args,
+        priority: int = PRIORITY_SEARCH,
+        key: str = None,
+        key_limit: int = None,
+        timeout: float = None,
+    ) -> int:
+        """Queue the coroutine function ``fn(*args)`` and return its position.
+
+        ``key`` groups jobs that may only run ``key_limit`` at a time (default
+        1). ``timeout`` is the hard limit once the job starts (JOB_TIMEOUT if
+        None). With process isolation ``fn`` must be a module-level function
+        and ``args`` picklable. Position 0 means the job starts right away.
+        Raises QueueFull when the queue is already at ``max_queue``.
+        """
+        self.start()
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                raise QueueFull(f"Job queue is full ({self.max_queue} waiting)")
+            if key is not None and key_limit is not None:
+                self._key_limits[key] = key_limit
+            bisect.insort(
+                self._queue,
+                (priority, next(self._seq), job_id, key, fn, args, timeout),
+            )
+            position = self._position_locked(job_id)
+        self._loop.call_soon_threadsafe(self._wake.set)
+        return position
+
+    def cancel(self, job_id: str):
+        """Stop a job: "dequeued" if it had not started, "cancelling" if it is
+        running (it is cancelled on the runtime loop, unwinding its browser
+        session and freeing its slot), None if the scheduler does not hold it.
+        """
+        with self._lock:
+            for index, entry in enumerate(self._queue):
+                if entry[2] == job_id:
+                    del self._queue[index]
+                    return "dequeued"
+            task = self._running.get(job_id)
+        if task is None:
+            return None
+        self._loop.call_soon_threadsafe(task.cancel)
+        return "cancelling"
+
+    def _position_locked(self, job_id: str):
+        idle = self.workers - self._active
+        for index, entry in enumerate(self._queue):
+            if entry[2] == job_id:
+                position = max(0, index + 1 - idle)
+                if not self._key_has_slot(entry[3]):
+                    # Waiting on its own key, however many workers are idle
+                    position = max(position, 1)
+                return position
+        return None
+
+    def position(self, job_id: str):
+        """Return how many jobs must start before this one, or None if not queued"""
+        with self._lock:
+            return self._position_locked(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "active": self._active,
+                "queued": len(self._queue),
+                "max_queue": self.max_queue,
+                "running_by_key": {
+                    key: count
+                    for key, count in self._running_by_key.items()
+                    if key is not None and count
+                },
+            }
+
+
+def open_scheduler():
+    """Build the scheduler selected by JOB_QUEUE.
+
+    ``local`` (default) runs jobs on the runtime thread of this process.
+    ``sqlite`` only queues them in JOB_QUEUE_PATH for ``worker.py`` processes,
+    so several HTTP front ends can share one set of browser workers.
+    """
+    backend = os.environ.get("JOB_QUEUE", "local")
+    if backend == "local":
+        return Scheduler()
+    if backend == "sqlite":
+        if os.environ.get("JOB_STORE", "sqlite") != "sqlite":
+            raise ValueError("JOB_QUEUE=sqlite needs the shared JOB_STORE=sqlite")
+        from job_queue import SharedQueue
+
+        return SharedQueue()
+    raise ValueError(f"Unknown JOB_QUEUE backend: {backend}")
+
+
+scheduler = open_scheduler()
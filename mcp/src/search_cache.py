@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from job_store import job_store
+
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 600))
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 256))
+
+
+def normalize_query(query: str) -> str:
+    """Collapse case and whitespace so retyped queries match"""
+    return " ".join((query or "").casefold().split())
+
+
+class SearchCache:
+    """Normalized query -> the search job that answers it.
+
+    Results live in the job store, so the index only keeps job IDs: a job
+    still queued or running is shared by identical queries (single-flight),
+    and a completed one is served as a cached result until it is ``ttl``
+    seconds old. Failed, evicted and stale jobs are dropped, so the next call
+    starts a fresh search. Hold ``lock`` from ``find`` to ``add`` so
+    concurrent identical queries end up on one job.
+
+    Callers sharing an unfinished job are counted, so cancelling it only
+    stops the search once the last of them lets go (``release``).
+    """
+
+    def __init__(
+        self, ttl: float = SEARCH_CACHE_TTL, max_size: int = SEARCH_CACHE_SIZE
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.RLock()
+        self._jobs = OrderedDict()
+        self._subscribers = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def find(self, query: str):
+        """Return ``(job_id, job, outcome)`` with outcome "hit" or
+        "coalesced", or None if the query needs a new search"""
+        key = normalize_query(query)
+        with self.lock:
+            job_id = self._jobs.get(key)
+            job = job_store.get(job_id) if job_id else None
+            if job is not None:
+                if job["status"] in ("queued", "running"):
+                    self.coalesced += 1
+                    self._subscribers[job_id] = self._subscribers.get(job_id, 1) + 1
+                    return job_id, job, "coalesced"
+                self._subscribers.pop(job_id, None)
+                completed_at = job.get("completed_at") or 0
+                if (
+                    job["status"] == "completed"
+                    and time.time() - completed_at < self.ttl
+                ):
+                    self._jobs.move_to_end(key)
+                    self.hits += 1
+                    return job_id, job, "hit"
+            self._jobs.pop(key, None)
+            self.misses += 1
+            return None
+
+    def add(self, query: str, job_id: str):
+        key = normalize_query(query)
+        with self.lock:
+            self._jobs[key] = job_id
+            self._jobs.move_to_end(key)
+            self._subscribers[job_id] = 1
+            while len(self._jobs) > self.max_size:
+                _, evicted = self._jobs.popitem(last=False)
+                self._subscribers.pop(evicted, None)
+
+    def release(self, job_id: str) -> int:
+        """One caller gives up on ``job_id``; returns how many still share it"""
+        with self.lock:
+            remaining = self._subscribers.get(job_id, 1) - 1
+            if remaining > 0:
+                self._subscribers[job_id] = remaining
+            else:
+                self._subscribers.pop(job_id, None)
+            return remaining
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.coalesced + self.misses
+            return {
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "hit_rate": (
+                    round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0
+                ),
+                "entries": len(self._jobs),
+            }
+
+
+search_cache = SearchCache()
@@ -1,129 +1,156 @@
 import os
 import asyncio
+import importlib
 import threading
 import time
 import uuid
 import sys
-from fastmcp import FastMCP  # type: ignore
+from fastmcp import Context, FastMCP  # type: ignore
 from dotenv import load_dotenv
-from browser_use import Agent, ChatAnthropic
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Load environment variables before importing modules that read them
+load_dotenv()
+
+# Only light modules here: browser-use, the Anthropic SDK and the Kijiji
+# integration take seconds to import and are loaded on first use (or by
+# preload_heavy_modules once the port is bound), so the server answers
+# greet/get_server_info straight away after a cold start.
+from job_store import FINISHED_STATUSES, JOB_STAGES, job_stage, job_store
+from category_cache import category_cache
+from search_cache import search_cache
+from metrics import record_agent_usage, render as render_metrics, stage_timer
+from notifications import outbox, send_poke_notification
+from scheduler import PRIORITY_SEARCH, QueueFull, mark_cancelled, scheduler
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-try:
-    # Import existing Kijiji functions
-    import endpoints
+# Seconds after startup before the heavy modules are imported in the background
+PRELOAD_DELAY = float(os.environ.get("PRELOAD_DELAY", 2.0))
+HEAVY_MODULES = ("browser_use", "browser_pool", "batch_analysis", "endpoints")
+
+endpoints = None
+# None until the Kijiji integration has been imported (or failed to)
+KIJIJI_AVAILABLE = None
+
+
+def load_endpoints():
+    """Import the existing Kijiji functions on first use"""
+    global endpoints, KIJIJI_AVAILABLE
+    if KIJIJI_AVAILABLE is None:
+        try:
+            endpoints = importlib.import_module("endpoints")
+            KIJIJI_AVAILABLE = True
+        except ImportError as e:
+            print(f"⚠️ Kijiji integration not available: {e}")
+            KIJIJI_AVAILABLE = False
+    return endpoints
+
+
+async def import_async(name: str):
+    """Import a heavy module in a thread so the event loop keeps serving"""
+    if name == "endpoints":
+        return await asyncio.to_thread(load_endpoints)
+    return await asyncio.to_thread(importlib.import_module, name)
+
+
+def preload_heavy_modules(delay: float = 0.0):
+    """Warm the heavy imports in the background, then start the workers"""
+    # Let the HTTP server bind and answer its first requests before the
+    # imports start competing with it for the GIL
+    time.sleep(delay)
+    start = time.perf_counter()
+    for name in HEAVY_MODULES:
+        try:
+            if name == "endpoints":
+                load_endpoints()
+            else:
+                importlib.import_module(name)
+        except ImportError as e:
+            print(f"⚠️ Could not preload {name}: {e}")
+    print(f"📦 Heavy modules loaded in {time.perf_counter() - start:.1f}s")
+    # Start workers now so their browser pools are warm before the first job
+    scheduler.start()
 
-    KIJIJI_AVAILABLE = True
-except ImportError:
-    KIJIJI_AVAILABLE = False
-    endpoints = None
-
-# Load environment variables
-load_dotenv()
 
 mcp = FastMCP("Kijiji Auto-Posting MCP Server with Browser Automation")
 
-# Simple in-memory job store for background tasks
-jobs = {}
-
+DUCKDUCKGO_URL = os.environ.get("DUCKDUCKGO_URL", "https://duckduckgo.com")
+# Hard limit for a search job, after which its process is killed
+SEARCH_JOB_TIMEOUT = float(os.environ.get("SEARCH_JOB_TIMEOUT", 300))
 
-async def send_poke_notification(message: str):
-    """Send notification via Poke API when browser automation completes"""
-    try:
-        import requests
-
-        poke_api_key = os.environ.get("POKE_API_KEY")
-        if not poke_api_key:
-            print("⚠️ No POKE_API_KEY found - skipping notification")
-            return
-
-        response = requests.post(
-            "https://poke.com/api/v1/inbound-sms/webhook",
-            headers={
-                "Authorization": f"Bearer {poke_api_key}",
-                "Content-Type": "application/json",
-            },
-            json={"message": message},
-        )
-
-        if response.ok:
-            print(f"✅ Poke notification sent: {message[:100]}...")
-        else:
-            print(f"❌ Poke notification failed: {response.status_code}")
-
-    except Exception as e:
-        print(f"❌ Error sending Poke notification: {e}")
+# Longest a single wait_for_job call may hold its HTTP request open
+WAIT_FOR_JOB_MAX_TIMEOUT = 300.0
+# Jobs run by worker.py processes update the store without notifying this
+# process's watchers, so wait_for_job re-reads the store this often
+WAIT_FOR_JOB_POLL = float(os.environ.get("WAIT_FOR_JOB_POLL", 1.0))
 
 
-def run_browser_search_background(job_id: str, query: str):
-    """Run browser automation in background thread and notify via Poke when done"""
+async def run_browser_search_background(job_id: str, query: str):
+    """Run browser automation as a job runtime task and notify via Poke when done"""
     try:
-        jobs[job_id]["status"] = "running"
-        jobs[job_id]["started_at"] = time.time()
-
-        # Run browser automation
-        async def search():
-            llm = ChatAnthropic(model="claude-sonnet-4-0", temperature=0.0)
-            task = f"Go to https://duckduckgo.com/?t=h_&q={query.replace(' ', '+')}&ia=web, and tell me what the top result is (include the title and the URL)."
-
-            # Simple agent - Docker handles all browser setup
-            agent = Agent(task=task, llm=llm)
-            result = await asyncio.wait_for(
-                agent.run(), timeout=180.0
-            )  # 3 minute timeout
-
-            # Store successful result
-            jobs[job_id].update(
-                {
-                    "status": "completed",
-                    "result": str(result),
-                    "completed_at": time.time(),
-                }
-            )
-
-            # Send Poke notification with result
-            notification_message = f"This is a message from the Kijiji integration. The browser agent has finished searching for '{query}' and returned: {str(result)[:200]}... Alert the user now in your natural voice."
-            await send_poke_notification(notification_message)
+        job_store.update(
+            job_id, status="running", stage="searching", started_at=time.time()
+        )
 
-            return result
+        from browser_use import Agent
+        from browser_pool import agent_llm, get_browser_pool
+
+        task = f"Go to {DUCKDUCKGO_URL}/?t=h_&q={query.replace(' ', '+')}&ia=web, and tell me what the top result is (include the title and the URL)."
+
+        # Borrow a warm browser instead of launching Chromium per search
+        async with get_browser_pool().session() as browser:
+            agent = Agent(task=task, llm=agent_llm(), browser_session=browser)
+            with stage_timer("search"):
+                result = await asyncio.wait_for(
+                    agent.run(), timeout=180.0
+                )  # 3 minute timeout
+            record_agent_usage("agent.search", result)
+
+        # Store successful result
+        job_store.update(
+            job_id,
+            status="completed",
+            stage="completed",
+            result=str(result),
+            completed_at=time.time(),
+        )
 
-        # Run in new event loop (background thread)
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(search())
-        loop.close()
+        # Send Poke notification with result
+        notification_message = f"This is a message from the Kijiji integration. The browser agent has finished searching for '{query}' and returned: {str(result)[:200]}... Alert the user now in your natural voice."
+        send_poke_notification(notification_message)
 
     except asyncio.TimeoutError:
         # Handle timeout specifically
-        jobs[job_id].update(
-            {
-                "status": "failed",
-                "error": "Browser search timed out after 3 minutes",
-                "completed_at": time.time(),
-            }
+        job_store.update(
+            job_id,
+            status="failed",
+            error="Browser search timed out after 3 minutes",
+            completed_at=time.time(),
         )
 
         # Send timeout notification
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
         timeout_message = f"This is a message from the Kijiji integration. The browser agent timed out while searching for '{query}' (took longer than 3 minutes). Alert the user about this timeout in your natural voice."
-        loop.run_until_complete(send_poke_notification(timeout_message))
-        loop.close()
+        send_poke_notification(timeout_message)
 
     except Exception as e:
         # Store error result and notify
-        jobs[job_id].update(
-            {"status": "failed", "error": str(e), "completed_at": time.time()}
+        job_store.update(
+            job_id, status="failed", error=str(e), completed_at=time.time()
         )
 
         # Send Poke notification about failure
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
         error_message = f"This is a message from the Kijiji integration. The browser agent failed while searching for '{query}'. Error: {str(e)}. Alert the user about this failure in your natural voice."
-        loop.run_until_complete(send_poke_notification(error_message))
-        loop.close()
+        send_poke_notification(error_message)
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> Response:
+    """Prometheus scrape endpoint, served next to /mcp"""
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
 
 
 @mcp.tool(description="Greet a user by name with a welcome message from the MCP server")
@@ -142,7 +169,14 @@ def get_server_info() -> dict:
         "environment": os.environ.get("ENVIRONMENT", "development"),
         "python_version": os.sys.version.split()[0],
         "browser_automation": "enabled",
-        "kijiji_integration": "available" if KIJIJI_AVAILABLE else "unavailable",
+        "kijiji_integration": {
+            None: "not_loaded",
+            True: "available",
+            False: "unavailable",
+        }[KIJIJI_AVAILABLE],
+        "scheduler": scheduler.stats(),
+        "category_cache": category_cache.stats(),
+        "search_cache": search_cache.stats(),
     }
 
 
@@ -150,7 +184,10 @@ def get_server_info() -> dict:
 def search_web(query: str) -> dict:
     """
     Start a web search in the background.
-    Returns immediately and sends results via Poke API when complete.
+    Returns immediately and sends results via Poke API when complete. A query
+    that is already being searched shares that job ("coalesced"), and one
+    answered within SEARCH_CACHE_TTL seconds returns its result right away
+    ("cached").
 
     Args:
         query: The search term to look for on the web
@@ -158,21 +195,76 @@ def search_web(query: str) -> dict:
     Returns:
         dict: Immediate response confirming search started
     """
-    # Generate unique job ID
-    job_id = str(uuid.uuid4())
-
-    # Initialize job in store
-    jobs[job_id] = {"query": query, "status": "queued", "created_at": time.time()}
-
-    # Start background thread for browser automation
-    thread = threading.Thread(
-        target=run_browser_search_background, args=(job_id, query), daemon=True
-    )
-    thread.start()
+    with search_cache.lock:
+        found = search_cache.find(query)
+        if found is None:
+            # Generate unique job ID
+            job_id = str(uuid.uuid4())
+
+            # Initialize job in store
+            job_store.create(job_id, "search", {"query": query})
+
+            # Hand off to the worker pool - caps how many browsers run at once
+            try:
+                position = scheduler.submit(
+                    job_id,
+                    run_browser_search_background,
+                    job_id,
+                    query,
+                    priority=PRIORITY_SEARCH,
+                    timeout=SEARCH_JOB_TIMEOUT,
+                )
+            except QueueFull as e:
+                job_store.delete(job_id)
+                return {
+                    "query": query,
+                    "status": "rejected",
+                    "error": str(e),
+                    "message": "⏳ Too many searches in progress, please try again shortly.",
+                }
+            search_cache.add(query, job_id)
+
+    if found is not None:
+        job_id, job, outcome = found
+        if outcome == "hit":
+            age = time.time() - job["completed_at"]
+            return {
+                "job_id": job_id,
+                "query": query,
+                "status": "completed",
+                "cached": True,
+                "age_seconds": round(age),
+                "result": job.get("result"),
+                "message": f"⚡ Already searched for '{job['query']}' {age:.0f}s ago, here is that result.",
+            }
+        position = scheduler.position(job_id)
+        return {
+            "job_id": job_id,
+            "query": query,
+            "status": "queued" if position else "working_on_it",
+            "cached": False,
+            "coalesced": True,
+            **({"position": position} if position else {}),
+            "message": f"🔁 A search for '{job['query']}' is already under way, sharing its result.",
+            "notification": "You'll get a Poke notification when the search completes with results!",
+        }
+
+    if position:
+        return {
+            "job_id": job_id,
+            "query": query,
+            "status": "queued",
+            "cached": False,
+            "position": position,
+            "message": f"⏳ Queued, position {position}. The search for '{query}' will start when a browser frees up.",
+            "notification": "You'll get a Poke notification when the search completes with results!",
+        }
 
     return {
+        "job_id": job_id,
         "query": query,
         "status": "working_on_it",
+        "cached": False,
         "message": f"🔍 Working on it now! Starting web search for '{query}'...",
         "notification": "You'll get a Poke notification when the search completes with results!",
     }
@@ -189,18 +281,24 @@ def get_search_status(job_id: str) -> dict:
     Returns:
         dict: Contains job status and results if completed
     """
-    if job_id not in jobs:
+    job = job_store.get(job_id)
+    if job is None:
         return {"job_id": job_id, "status": "not_found", "error": "Job ID not found"}
 
-    job = jobs[job_id]
     response = {
         "job_id": job_id,
-        "query": job["query"],
+        "query": job.get("query"),
         "status": job["status"],
         "created_at": job["created_at"],
     }
 
-    if job["status"] == "running":
+    if job["status"] == "queued":
+        position = scheduler.position(job_id)
+        if position is not None:
+            response["position"] = position
+        response["message"] = "Waiting for a free browser..."
+
+    elif job["status"] == "running":
         response["message"] = "Browser automation in progress..."
         if "started_at" in job:
             response["running_for"] = f"{int(time.time() - job['started_at'])} seconds"
@@ -225,32 +323,228 @@ def get_search_status(job_id: str) -> dict:
             }
         )
 
+    elif job["status"] == "cancelled":
+        response.update(
+            {
+                "error": job["error"],
+                "completed_at": job["completed_at"],
+                "message": "Browser search was cancelled",
+            }
+        )
+
     return response
 
 
+@mcp.tool(
+    description="Wait for a background job (search or Kijiji posting) to finish and return its result. Returns early with timed_out=true after timeout seconds. Sends progress notifications as the job moves through its stages."
+)
+async def wait_for_job(job_id: str, timeout: float = 60.0, ctx: Context = None) -> dict:
+    """
+    Long-poll a background job instead of calling get_search_status in a loop.
+
+    Args:
+        job_id: The job ID returned from search_web, post_to_kijiji or
+            post_many_to_kijiji
+        timeout: Seconds to wait before returning the current state
+
+    Returns:
+        dict: The job status, with its result or error once finished
+    """
+    loop = asyncio.get_running_loop()
+    changed = asyncio.Event()
+    unwatch = job_store.watch(job_id, lambda _: loop.call_soon_threadsafe(changed.set))
+    deadline = loop.time() + min(max(timeout, 0.0), WAIT_FOR_JOB_MAX_TIMEOUT)
+    reported = None
+
+    try:
+        while True:
+            # Clear before reading so an update landing in between is not lost
+            changed.clear()
+            job = job_store.get(job_id)
+            if job is None:
+                return {
+                    "job_id": job_id,
+                    "status": "not_found",
+                    "error": "Job ID not found",
+                }
+
+            stage = job_stage(job)
+            stages = JOB_STAGES.get(job["kind"], ())
+            items = job.get("items")
+            if items and stage == "posting":
+                # Bulk posts report each item as it goes up
+                done = sum(item["status"] in ("posted", "failed") for item in items)
+                progress = (done, len(items), f"posting {done}/{len(items)}")
+            elif stage in stages:
+                progress = (stages.index(stage) + 1, len(stages), stage)
+            else:
+                progress = reported
+            if ctx is not None and progress != reported:
+                await ctx.report_progress(
+                    progress=progress[0], total=progress[1], message=progress[2]
+                )
+                reported = progress
+
+            response = {
+                "job_id": job_id,
+                "kind": job["kind"],
+                "status": job["status"],
+                "stage": stage,
+            }
+            if items:
+                response["items"] = items
+            if job["status"] in FINISHED_STATUSES:
+                if "result" in job:
+                    response["result"] = job["result"]
+                if "error" in job:
+                    response["error"] = job["error"]
+                response["total_time"] = (
+                    f"{int(job['completed_at'] - job['created_at'])} seconds"
+                )
+                return response
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                if job["status"] == "queued":
+                    response["position"] = scheduler.position(job_id)
+                response["timed_out"] = True
+                return response
+
+            if not scheduler.in_process:
+                remaining = min(remaining, WAIT_FOR_JOB_POLL)
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        unwatch()
+
+
+@mcp.tool(
+    description="Cancel a queued or running background job (search or Kijiji posting). The job is stopped, its browser handed back and its worker freed, and it is marked cancelled. A search shared by several callers (coalesced) keeps running until the last of them cancels it."
+)
+def cancel_job(job_id: str) -> dict:
+    """
+    Cancel a background job.
+
+    Args:
+        job_id: The job ID returned from search_web or post_to_kijiji
+
+    Returns:
+        dict: Whether the job was cancelled, and what it was doing
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        return {"job_id": job_id, "status": "not_found", "error": "Job ID not found"}
+    if job["status"] in FINISHED_STATUSES:
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "cancelled": False,
+            "message": f"Job already {job['status']}, nothing to cancel.",
+        }
+
+    with search_cache.lock:
+        if job["kind"] == "search":
+            # Coalesced searches are shared - only the last caller stops one
+            shared_with = search_cache.release(job_id)
+            if shared_with:
+                return {
+                    "job_id": job_id,
+                    "status": job["status"],
+                    "cancelled": False,
+                    "shared_with": shared_with,
+                    "message": f"🔁 {shared_with} other caller(s) are waiting on this search, so it keeps running for them.",
+                }
+
+        # Running jobs stop cooperatively on the worker; mark them now so callers
+        # (and wait_for_job) see the cancellation right away
+        outcome = scheduler.cancel(job_id)
+        mark_cancelled(job_id)
+    print(f"🛑 Cancel requested for job {job_id}: {outcome}")
+    return {
+        "job_id": job_id,
+        "status": "cancelled",
+        "cancelled": True,
+        "stage": job_stage(job),
+        "message": (
+            "🛑 Removed the job from the queue before it started."
+            if outcome == "dequeued"
+            else f"🛑 Stopping the job (it was at '{job_stage(job)}')."
+        ),
+    }
+
+
+@mcp.tool(
+    description="Analyze several listing photos in one call. Photos that share an item key are combined into one listing; every untagged photo is its own item. Each image is {data: base64, media_type: 'image/jpeg', item: optional key grouping photos of one item}. Returns one product_info per item."
+)
+async def analyze_listing_photos(images: list[dict], ctx: Context = None) -> dict:
+    """
+    Turn a batch of photos into listing drafts.
+
+    Args:
+        images: Base64 photos, optionally tagged with an item key
+
+    Returns:
+        dict: One product_info (title, description, price, category) per item
+    """
+    if not images:
+        return {"success": False, "error": "No images provided"}
+
+    streamed = 0
+
+    async def on_field(item: int, name: str, value):
+        # Title and category show up while the description is still being written
+        nonlocal streamed
+        streamed += 1
+        if ctx is not None:
+            shown = "done" if name == "description" else value
+            await ctx.report_progress(
+                progress=streamed, message=f"item {item + 1} {name}: {shown}"
+            )
+
+    batch_analysis = await import_async("batch_analysis")
+    items = await batch_analysis.analyze_images_batch(images, on_field=on_field)
+    return {"success": True, "items": items}
+
+
 @mcp.tool(
     description="List or post an item to sell on Kijiji. Category must be one of Buy & Sell, Arts & Collectibles, Audio, Baby Items, Bags & Luggage, Bikes, Books, Business & Industrial, Cameras & Camcorders, CDs, DVDs & Blu-ray, Clothing, Computers, Computer Accessories, Electronics, Free Stuff, Furniture, Garage Sales, Health & Special Needs, Hobbies & Crafts, Home Appliances, Home - Indoor, Home - Outdoor & Garden, Home Renovation Materials, Jewellery & Watches, Musical Instruments, Phones, Sporting Goods & Exercise, Tools, Toys & Games, TVs & Video, Video Games & Consoles, Other"
 )
-def post_to_kijiji(
+async def post_to_kijiji(
     title: str,
     description: str,
     price: str,
+    account: str = "default",
 ) -> dict:
-    """Analyze image and post to Kijiji using existing endpoints"""
-    if not KIJIJI_AVAILABLE:
+    """Queue a Kijiji posting on ``account`` and return its job ID"""
+    if not await import_async("endpoints"):
         return {"success": False, "error": "Kijiji integration not available"}
 
-    return endpoints.post_to_kijiji(title, description, price)
+    return await endpoints.post_to_kijiji(title, description, price, account)
     # return endpoints.analyze_and_post_to_kijiji(image_data, image_media_type)
 
 
-# @mcp.tool(description="Check if Kijiji agent is running")
-# def conversation_finished() -> dict:
-#     """Check Kijiji agent status using existing endpoints"""
-#     if not KIJIJI_AVAILABLE:
-#         return {"success": False, "error": "Kijiji integration not available"}
+@mcp.tool(
+    description="Post many items to Kijiji in one go, e.g. when clearing out a home. Each item is {title, description, price, category: optional}. Items are categorized together, then posted one after another in a single logged-in browser session. Returns one job_id; wait_for_job reports each item's status."
+)
+async def post_many_to_kijiji(items: list[dict], account: str = "default") -> dict:
+    """Queue a bulk Kijiji posting on ``account`` and return its job ID"""
+    if not await import_async("endpoints"):
+        return {"success": False, "error": "Kijiji integration not available"}
+
+    return await endpoints.post_many_to_kijiji(items, account)
+
+
+@mcp.tool(
+    description="Check if the Kijiji posting and buyer conversation for a job is finished"
+)
+def conversation_finished(job_id: str) -> dict:
+    """Check a Kijiji posting job using existing endpoints"""
+    if not load_endpoints():
+        return {"success": False, "error": "Kijiji integration not available"}
 
-#     return endpoints.conversation_finished()
+    return endpoints.conversation_finished(job_id)
 
 
 # @mcp.tool(description="Get information about browser automation capabilities")
@@ -279,5 +573,18 @@ def post_to_kijiji(
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
     host = "0.0.0.0"
+    # With a shared queue, other front ends' jobs are still queued or running
+    if scheduler.in_process:
+        interrupted = job_store.fail_interrupted()
+        if interrupted:
+            print(f"⚠️ Marked {interrupted} job(s) from the previous run as failed")
+    threading.Thread(
+        target=preload_heavy_modules,
+        args=(PRELOAD_DELAY,),
+        name="preload",
+        daemon=True,
+    ).start()
+    # Deliver anything the previous run left in the outbox
+    outbox.start()
     print(f"Starting FastMCP server on {host}:{port}")
     mcp.run(transport="http", host=host, port=port, stateless_http=True)
@@ -0,0 +1,29 @@
+import sqlite3
+import threading
+
+
+class ThreadLocalConnection:
+    """Per-thread WAL-mode connections to one SQLite file.
+
+    SQLite connections must not be shared across threads, so each thread
+    gets its own on first use. Calling the instance returns the current
+    thread's connection. ``pragmas`` are applied after journal_mode=WAL.
+    """
+
+    def __init__(self, path: str, row_factory=None, pragmas=()):
+        self.path = path
+        self.row_factory = row_factory
+        self.pragmas = pragmas
+        self._local = threading.local()
+
+    def __call__(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute("PRAGMA journal_mode=WAL")
+            for pragma in self.pragmas:
+                conn.execute(f"PRAGMA {pragma}")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,401 @@
+"""Local stand-ins for the external services the server talks to.
+
+Each stand-in is a small threaded HTTP server bound to 127.0.0.1 on a free
+port, with a configurable latency so tests and benchmarks can run offline.
+"""
+
+import html
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+
+class StandIn:
+    """Base class: serves ``handle(handler, body)`` on a background thread"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = []
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in._dispatch(self, None)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                stand_in._dispatch(self, self.rfile.read(length))
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name=type(self).__name__, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _dispatch(self, handler, body):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests.append((handler.command, handler.path, body))
+        self.handle(handler, body)
+
+    def handle(self, handler, body):
+        raise NotImplementedError
+
+    @staticmethod
+    def respond(handler, status: int, payload=None, content_type="application/json"):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        try:
+            handler.send_response(status)
+            handler.send_header("Content-Type", content_type)
+            handler.send_header("Content-Length", str(len(data)))
+            handler.end_headers()
+            handler.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. hit its timeout) - that is the point
+            pass
+
+
+class PokeWebhookStandIn(StandIn):
+    """Records Poke webhook messages; the first ``fail_first`` calls get a 503"""
+
+    def __init__(self, latency: float = 0.0, fail_first: int = 0):
+        super().__init__(latency)
+        self.fail_first = fail_first
+        self.messages = []
+
+    def handle(self, handler, body):
+        with self._lock:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                status = 503
+            else:
+                self.messages.append(json.loads(body)["message"])
+                status = 200
+        self.respond(handler, status, {"success": status == 200})
+
+
+class AnthropicStandIn(StandIn):
+    """Minimal Messages API: answers POST /v1/messages after ``latency`` seconds.
+
+    ``responder(request)`` returns the reply text, or a dict to answer with a
+    ``tool_use`` block for the request's first tool. The default returns a
+    create_listing call for vision requests, a category name for text
+    requests and an immediate ``done`` action for browser-use agents.
+    Streaming requests get the reply as server-sent events in ``chunk_size``
+    character deltas, ``chunk_delay`` seconds apart. Point the SDK at it with
+    ``ANTHROPIC_BASE_URL=stand_in.url``.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        responder=None,
+        chunk_size: int = 16,
+        chunk_delay: float = 0.0,
+    ):
+        super().__init__(latency)
+        self.responder = responder or self.default_responder
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @staticmethod
+    def default_responder(request: dict):
+        tools = request.get("tools") or []
+        if tools and tools[0]["name"] == "AgentOutput":
+            # A browser-use agent step: finish the task straight away
+            return {
+                "thinking": "",
+                "evaluation_previous_goal": "",
+                "memory": "",
+                "next_goal": "",
+                "action": [
+                    {"done": {"text": "MEETUP AGREED (stand-in)", "success": True}}
+                ],
+            }
+        content = request["messages"][-1]["content"]
+        if isinstance(content, str):
+            return "Furniture"
+        photos = sum(1 for block in content if block.get("type") == "image")
+        return {
+            "title": f"Stand-in item ({photos} photos)",
+            "category": "Furniture",
+            "price": "25",
+            "description": "Generated by the local Anthropic stand-in.",
+        }
+
+    def _dispatch(self, handler, body):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            super()._dispatch(handler, body)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def handle(self, handler, body):
+        request = json.loads(body)
+        reply = self.responder(request)
+        if isinstance(reply, str):
+            content = [{"type": "text", "text": reply}]
+            stop_reason = "end_turn"
+            output_chars = len(reply)
+        else:
+            content = [
+                {
+                    "type": "tool_use",
+                    "id": f"toolu_standin_{len(self.requests)}",
+                    "name": request["tools"][0]["name"],
+                    "input": reply,
+                }
+            ]
+            stop_reason = "tool_use"
+            output_chars = len(json.dumps(reply))
+        message = {
+            "id": f"msg_standin_{len(self.requests)}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "stand-in"),
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": len(body) // 4,
+                "output_tokens": output_chars // 4,
+            },
+        }
+        if request.get("stream"):
+            self.stream(handler, message)
+        else:
+            self.respond(handler, 200, message)
+
+    def stream(self, handler, message: dict):
+        """Send ``message`` as Messages API server-sent events"""
+
+        def send(event_type: str, data: dict):
+            event = f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+            handler.wfile.write(event.encode())
+            handler.wfile.flush()
+
+        try:
+            handler.send_response(200)
+            handler.send_header("Content-Type", "text/event-stream")
+            handler.send_header("Connection", "close")
+            handler.end_headers()
+            send(
+                "message_start",
+                {
+                    "type": "message_start",
+                    "message": {
+                        **message,
+                        "content": [],
+                        "stop_reason": None,
+                        "usage": {**message["usage"], "output_tokens": 0},
+                    },
+                },
+            )
+            for index, block in enumerate(message["content"]):
+                if block["type"] == "text":
+                    start, text = {**block, "text": ""}, block["text"]
+                    delta_type, delta_key = "text_delta", "text"
+                else:
+                    start, text = {**block, "input": {}}, json.dumps(block["input"])
+                    delta_type, delta_key = "input_json_delta", "partial_json"
+                send(
+                    "content_block_start",
+                    {
+                        "type": "content_block_start",
+                        "index": index,
+                        "content_block": start,
+                    },
+                )
+                for offset in range(0, len(text), self.chunk_size):
+                    if self.chunk_delay:
+                        time.sleep(self.chunk_delay)
+                    send(
+                        "content_block_delta",
+                        {
+                            "type": "content_block_delta",
+                            "index": index,
+                            "delta": {
+                                "type": delta_type,
+                                delta_key: text[offset : offset + self.chunk_size],
+                            },
+                        },
+                    )
+                send(
+                    "content_block_stop", {"type": "content_block_stop", "index": index}
+                )
+            send(
+                "message_delta",
+                {
+                    "type": "message_delta",
+                    "delta": {
+                        "stop_reason": message["stop_reason"],
+                        "stop_sequence": None,
+                    },
+                    "usage": {"output_tokens": message["usage"]["output_tokens"]},
+                },
+            )
+            send("message_stop", {"type": "message_stop"})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class KijijiStandIn(StandIn):
+    """Mock of the Kijiji posting flow, with the markup kijiji_poster expects.
+
+    Walks location -> title -> category -> details and records each submitted
+    ad in ``ads``. Element names listed in ``broken`` (e.g. ``{"price"}``) are
+    rendered with a different id, to exercise the agent hand-off. The account
+    page always counts as signed in. The Messages List, in the markup
+    inbox_watcher reads, starts empty; a buyer writes about each ad
+    ``buyer_delay`` seconds after it is posted (never if None).
+    """
+
+    CATEGORIES = ("Books", "Electronics", "Furniture", "Other")
+
+    def __init__(self, latency: float = 0.0, broken=(), buyer_delay=1.0):
+        super().__init__(latency)
+        self.broken = set(broken)
+        self.buyer_delay = buyer_delay
+        self.ads = []
+        self._posted_at = []
+
+    def _id(self, name: str, element_id: str) -> str:
+        return f"{element_id}-moved" if name in self.broken else element_id
+
+    def handle(self, handler, body):
+        url = urlsplit(handler.path)
+        query = dict(parse_qsl(url.query))
+        if handler.command == "POST" and url.path == "/p-submit-ad.html":
+            ad = dict(parse_qsl(body.decode()))
+            with self._lock:
+                self.ads.append(ad)
+                self._posted_at.append(time.time())
+                ad_id = len(self.ads)
+            handler.send_response(303)
+            handler.send_header("Location", f"/v-view-details.html?adId={ad_id}")
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        pages = {
+            "/p-select-category.html": self._location_page,
+            "/p-post-ad.html": self._title_page,
+            "/p-post-ad.html/category": self._category_page,
+            "/p-post-ad.html/details": self._details_page,
+            "/v-view-details.html": lambda q: f"<h1>Ad {html.escape(q.get('adId', ''))} posted</h1>",
+            "/m-my-ads/active": lambda q: "<h1>My Ads</h1>",
+            "/m-msg-my-messages/": self._messages_page,
+        }
+        page = pages.get(url.path)
+        if page is None:
+            self.respond(handler, 404, b"Not found", "text/html")
+            return
+        content = f"<!doctype html><html><body>{page(query)}</body></html>"
+        self.respond(handler, 200, content.encode(), "text/html")
+
+    def _messages_page(self, query):
+        with self._lock:
+            ads = list(zip(self.ads, self._posted_at))
+        now = time.time()
+        written = [
+            (index, ad)
+            for index, (ad, posted_at) in enumerate(ads, 1)
+            if self.buyer_delay is not None and posted_at + self.buyer_delay <= now
+        ]
+        if not written:
+            return '<div data-testid="empty-inbox">No messages yet</div>'
+        items = "".join(
+            f'<div data-testid="conversation-list-item" data-conversation-id="c{index}">'
+            f'Buyer {index}<br>Is the {html.escape(ad.get("title", "item"))} still available?</div>'
+            for index, ad in reversed(written)
+        )
+        return f'<div data-testid="conversation-list">{items}</div>'
+
+    def _location_page(self, query):
+        if "province" not in query:
+            return '<a href="?province=alberta">Alberta</a> <a href="?province=ontario">Ontario</a>'
+        if "city" not in query:
+            return '<a href="?province=alberta&city=red-deer">Red Deer</a>'
+        return '<form action="/p-post-ad.html"><button id="LocationGoButton">Go</button></form>'
+
+    def _title_page(self, query):
+        return (
+            '<div class="popup"><button aria-label="Close" onclick="this.parentNode.remove()">x</button></div>'
+            '<form action="/p-post-ad.html/category">'
+            f'<input id="{self._id("title", "AdTitleForm")}" name="title">'
+            "<button>Next</button></form>"
+        )
+
+    def _category_page(self, query):
+        if "group" not in query:
+            link = urlencode({**query, "group": "buy-sell"})
+            return f'<a href="?{link}">Buy &amp; Sell</a>'
+        links = []
+        for category in self.CATEGORIES:
+            link = urlencode({"title": query.get("title", ""), "category": category})
+            links.append(
+                f'<a class="{self._id("category", "category-link")}" '
+                f'href="/p-post-ad.html/details?{link}">{html.escape(category)}</a>'
+            )
+        return " ".join(links)
+
+    def _details_page(self, query):
+        hidden = "".join(
+            f'<input type="hidden" name="{name}" value="{html.escape(query.get(name, ""))}">'
+            for name in ("title", "category")
+        )
+        return (
+            f'<form method="post" action="/p-submit-ad.html">{hidden}'
+            f'<input type="radio" name="adType" value="OFFER" id="{self._id("ad_type_offering", "adType1")}">'
+            '<input type="radio" name="adType" value="WANTED" id="adType2">'
+            f'<input type="radio" name="forSaleBy" value="ownr" id="{self._id("for_sale_by_owner", "forsaleby_ownr")}">'
+            f'<textarea name="description" id="{self._id("description", "pstad-descrptn")}"></textarea>'
+            f'<input name="location" id="{self._id("location", "location")}">'
+            f'<input name="price" id="{self._id("price", "PriceAmount")}">'
+            "<button>Post Your Ad</button></form>"
+        )
+
+
+class DuckDuckGoStandIn(StandIn):
+    """Serves the same one-result search page for every query"""
+
+    def handle(self, handler, body):
+        query = html.escape(dict(parse_qsl(urlsplit(handler.path).query)).get("q", ""))
+        content = (
+            "<!doctype html><html><body>"
+            f'<article data-testid="result"><h2><a href="https://example.com/{query}">'
+            f"Top result for {query}</a></h2></article></body></html>"
+        )
+        self.respond(handler, 200, content.encode(), "text/html")
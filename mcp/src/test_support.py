@@ -0,0 +1,44 @@
+"""Shared setup for the offline test scripts.
+
+``isolate()`` must run before any server module is imported, since the
+stores and queues read their configuration from the environment at import
+time.
+"""
+
+import os
+import tempfile
+import time
+
+_tmp = None
+
+
+def isolate(**overrides) -> str:
+    """Point every store at a throwaway directory and return its path"""
+    global _tmp
+    if _tmp is None:
+        _tmp = tempfile.TemporaryDirectory()
+    path = _tmp.name
+    os.environ.update(
+        {
+            "JOB_STORE": "memory",
+            "JOB_QUEUE": "local",
+            "ANTHROPIC_API_KEY": "test-key",
+            "POKE_API_KEY": "test-key",
+            "CATEGORY_CACHE_PATH": os.path.join(path, "category_cache.db"),
+            "CATEGORY_LABELS_PATH": os.path.join(path, "category_labels.json"),
+            "NOTIFY_OUTBOX_PATH": os.path.join(path, "outbox.db"),
+            "BROWSER_POOL_PREWARM": "false",
+        }
+    )
+    os.environ.update({k: str(v) for k, v in overrides.items()})
+    return path
+
+
+def wait_until(predicate, timeout: float, interval: float = 0.05) -> bool:
+    """Poll ``predicate`` until it is truthy or ``timeout`` seconds pass"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return False
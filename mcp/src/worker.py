@@ -0,0 +1,102 @@
+"""Browser job workers for the split deployment.
+
+With ``JOB_QUEUE=sqlite`` the MCP front ends (server.py) only queue jobs.
+Run this on the same host, sharing JOB_QUEUE_PATH, JOB_STORE_PATH and
+NOTIFY_OUTBOX_PATH with them:
+
+    JOB_QUEUE=sqlite python worker.py --processes 4
+
+Each process runs one job at a time on its own event loop, with its own
+browser pool and HTTP clients. A process is
+replaced after JOB_PROCESS_MAX_JOBS jobs, past JOB_PROCESS_MAX_RSS_MB, when it
+dies, or when its job overruns its timeout (it is killed, browsers and all);
+the job it held is marked failed.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables before importing modules that read them
+load_dotenv()
+
+
+def run_worker():
+    # Ctrl-C reaches the whole process group - let the supervisor decide
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from job_process import preload_worker_modules
+    from scheduler import scheduler
+
+    preload_worker_modules()
+    print(f"👷 Worker {os.getpid()} waiting for jobs")
+    asyncio.run(scheduler.serve())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=int(os.environ.get("WORKER_PROCESSES", 2)),
+        help="worker processes, i.e. browser jobs that may run at once",
+    )
+    args = parser.parse_args()
+
+    from job_process import kill_process_tree
+    from scheduler import scheduler
+
+    if scheduler.in_process:
+        print("❌ worker.py needs JOB_QUEUE=sqlite (the front end runs jobs itself)")
+        sys.exit(1)
+
+    context = multiprocessing.get_context("spawn")
+
+    def spawn():
+        process = context.Process(target=run_worker, name="mcpetsy-worker")
+        process.start()
+        return process
+
+    stopping = False
+
+    def shutdown(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    # Jobs held by workers of a previous run that did not shut down cleanly
+    scheduler.reap_dead_workers()
+    workers = [spawn() for _ in range(args.processes)]
+    print(f"🚀 Started {args.processes} worker process(es) on {scheduler.path}")
+    while not stopping:
+        time.sleep(1.0)
+        for pid in scheduler.overdue_workers():
+            print(f"⏱️ Worker {pid} overran its job's timeout, killing it")
+            kill_process_tree(pid)
+        for index, process in enumerate(workers):
+            if not process.is_alive() and not stopping:
+                print(
+                    f"🔁 Worker {process.pid} exited ({process.exitcode}), replacing it"
+                )
+                scheduler.reap_dead_workers()
+                workers[index] = spawn()
+
+    print("🛑 Stopping workers...")
+    for process in workers:
+        process.terminate()
+    for process in workers:
+        process.join(10)
+        if process.is_alive():
+            process.kill()
+    scheduler.reap_dead_workers()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Exercise batch photo analysis against a local fake Anthropic endpoint."""
+
+import asyncio
+import base64
+import io
+import os
+import sys
+import time
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+)
+
+from stand_ins import AnthropicStandIn  # noqa: E402
+from test_support import isolate  # noqa: E402
+
+LATENCY = 0.5
+
+
+def photo(color, shape_offset=0, size=(1200, 900)):
+    image = Image.new("RGB", size, color)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((200 + shape_offset, 200, 700 + shape_offset, 600), fill="white")
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=90)
+    return base64.b64encode(output.getvalue()).decode()
+
+
+async def test_batch_analysis():
+    print("🧪 Testing batch photo analysis against a local Anthropic stand-in...")
+    failures = 0
+
+    with AnthropicStandIn(latency=LATENCY) as anthropic:
+        isolate(ANTHROPIC_BASE_URL=anthropic.url)
+        from batch_analysis import analyze_images_batch
+
+        images = [
+            # Same shape, different colour - two items that hash alike
+            {"data": photo("navy"), "media_type": "image/jpeg"},
+            {"data": photo("darkgreen"), "media_type": "image/jpeg"},
+            # Two different-looking photos the caller says are one item
+            {"data": photo("green"), "item": "chair"},
+            {"data": photo("orange", shape_offset=250), "item": "chair"},
+        ]
+
+        start = time.perf_counter()
+        items = await analyze_images_batch(images, max_concurrency=3)
+        elapsed = time.perf_counter() - start
+
+        groups = sorted(item["images"] for item in items)
+        print(f"📦 Items: {groups} in {elapsed:.2f}s")
+        if groups == [[0], [1], [2, 3]]:
+            print("✅ Lookalike photos kept apart, tagged photos grouped")
+        else:
+            print("❌ Unexpected grouping")
+            failures += 1
+
+        if len(anthropic.requests) == 3 and anthropic.max_in_flight == 3:
+            print("✅ One request per item, all 3 in flight together")
+        else:
+            print(
+                f"❌ {len(anthropic.requests)} requests, "
+                f"max {anthropic.max_in_flight} in flight"
+            )
+            failures += 1
+
+        if elapsed < LATENCY * 2:
+            print(f"✅ Concurrent: {elapsed:.2f}s for 3 items at {LATENCY}s each")
+        else:
+            print(f"❌ Looks sequential: {elapsed:.2f}s")
+            failures += 1
+
+        anthropic.max_in_flight = 0
+        await analyze_images_batch(images, max_concurrency=1)
+        if anthropic.max_in_flight == 1:
+            print("✅ Concurrency cap of 1 runs items one at a time")
+        else:
+            print("❌ Concurrency cap not respected")
+            failures += 1
+
+        # Bad photos fail their own item, never the whole batch
+        broken = [
+            {"data": photo("navy")},
+            {"data": "not base64!!!"},
+            {"data": photo("green"), "item": "chair"},
+            {"item": "chair"},
+        ]
+        items = await analyze_images_batch(broken)
+        errors = sorted(item["images"] for item in items if "error" in item)
+        groups = sorted(item["images"] for item in items)
+        if errors == [[3]] and groups == [[0], [1], [2], [3]]:
+            print("✅ A photo without data failed alone, the rest were analyzed")
+        else:
+            print(f"❌ Bad photos: {items}")
+            failures += 1
+
+    print(
+        "\n✅ Batch analysis test complete!"
+        if not failures
+        else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(test_batch_analysis()) else 0)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Exercise post_many_to_kijiji with stand-ins for categorization and the
+browser session - no browser or LLM."""
+
+import asyncio
+import os
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+sys.path.insert(0, SRC)
+
+from test_support import isolate, wait_until  # noqa: E402
+
+isolate(JOB_ISOLATION="thread")
+
+import endpoints  # noqa: E402
+from job_store import job_store  # noqa: E402
+
+categorizing = 0
+peak = 0
+sessions = []
+notifications = []
+
+
+async def fake_categorize(title, description):
+    global categorizing, peak
+    categorizing += 1
+    peak = max(peak, categorizing)
+    await asyncio.sleep(0.2)
+    categorizing -= 1
+    return "Other"
+
+
+async def fake_post_many(product_infos, username, password, on_stage, on_item):
+    sessions.append([item["title"] for item in product_infos])
+    on_stage("login")
+    on_stage("posting")
+    posted = 0
+    for index, product_info in enumerate(product_infos):
+        on_item(index, "posting")
+        await asyncio.sleep(0.05)
+        if "broken" in product_info["title"]:
+            on_item(index, "failed", "form rejected")
+            continue
+        posted += 1
+        on_item(index, "posted")
+    return posted
+
+
+endpoints.categorize_product_with_anthropic_async = fake_categorize
+endpoints.post_many = fake_post_many
+endpoints.send_poke_notification = notifications.append
+
+
+def wait_finished(job_id, timeout=5):
+    return wait_until(
+        lambda: job_store.get(job_id)["status"] in ("completed", "failed"), timeout
+    )
+
+
+def test_bulk_post():
+    print("🧪 Testing post_many_to_kijiji...")
+    failures = 0
+
+    # The first item is free: price 0 is valid
+    items = [
+        {"title": f"Qwzx {n}", "description": "Blorft", "price": n * 10}
+        for n in range(5)
+    ]
+    items.append({"title": "broken lamp", "description": "As is", "price": "5"})
+    response = asyncio.run(endpoints.post_many_to_kijiji(items))
+    job_id = response["job_id"]
+    wait_finished(job_id)
+    job = job_store.get(job_id)
+
+    statuses = [item["status"] for item in job["items"]]
+    if job["status"] == "completed" and statuses == ["posted"] * 5 + ["failed"]:
+        print(f"✅ {job['result']}")
+    else:
+        print(f"❌ Bulk job {job['status']}: {statuses}")
+        failures += 1
+    if len(sessions) == 1 and len(sessions[0]) == 6:
+        print("✅ All items posted from one login")
+    else:
+        print(f"❌ {len(sessions)} sessions: {sessions}")
+        failures += 1
+    if peak > 1:
+        print(f"✅ Categorized up to {peak} items at once")
+    else:
+        print("❌ Items were categorized one at a time")
+        failures += 1
+    if job["items"][-1].get("error") == "form rejected" and len(notifications) == 1:
+        print("✅ Failed item reported, one summary notification")
+    else:
+        print(f"❌ Item error / notifications: {job['items'][-1]}, {notifications}")
+        failures += 1
+
+    # Bad input is rejected before anything is queued
+    missing = asyncio.run(
+        endpoints.post_many_to_kijiji([{"title": "Chair", "price": ""}])
+    )
+    unknown = asyncio.run(endpoints.post_many_to_kijiji(items, account="nobody"))
+    if not missing["success"] and not unknown["success"] and len(sessions) == 1:
+        print(f"✅ Rejected: {missing['error']}; {unknown['error']}")
+    else:
+        print(f"❌ Bad input accepted: {missing}, {unknown}")
+        failures += 1
+
+    print(
+        "\n✅ Bulk posting test complete!"
+        if not failures
+        else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if test_bulk_post() else 0)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""Exercise cancel_job and posting stage deadlines: cooperative cancellation
+on the runtime loop and in job processes - no browser or LLM."""
+
+import asyncio
+import os
+import sys
+import textwrap
+import time
+import uuid
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+sys.path.insert(0, SRC)
+
+from test_support import isolate, wait_until  # noqa: E402
+
+# Stand-in jobs, importable by the job processes through sys.path
+TASKS = textwrap.dedent("""
+    import asyncio
+    import os
+    import time
+
+    from job_store import job_store
+
+
+    async def slow_job(job_id, seconds):
+        job_store.update(job_id, status="running", pid=os.getpid())
+        try:
+            await asyncio.sleep(seconds)
+            job_store.update(job_id, status="completed", completed_at=time.time())
+        finally:
+            # Stands in for handing the browser back to the pool
+            job_store.update(job_id, released=True)
+
+
+    async def stubborn_job(job_id):
+        job_store.update(job_id, status="running", pid=os.getpid())
+        while True:
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                pass
+    """)
+
+
+def test_runtime_cancel(tasks, new_job):
+    """Thread isolation: jobs are tasks on the runtime loop"""
+    import server
+    from job_store import job_store
+    from scheduler import Scheduler
+
+    failures = 0
+    server.scheduler = Scheduler(workers=1, max_queue=10, isolation="thread")
+
+    running = new_job()
+    server.scheduler.submit(running, tasks.slow_job, running, 30)
+    waiting = new_job()
+    server.scheduler.submit(waiting, tasks.slow_job, waiting, 0.1)
+    wait_until(lambda: job_store.get(running)["status"] == "running", 5)
+
+    queued = server.cancel_job(waiting)
+    if (
+        queued["cancelled"]
+        and "queue" in queued["message"]
+        and server.scheduler.stats()["queued"] == 0
+    ):
+        print("✅ Queued job removed before it started")
+    else:
+        print(f"❌ Queued job: {queued}")
+        failures += 1
+
+    start = time.time()
+    response = server.cancel_job(running)
+    wait_until(lambda: job_store.get(running).get("released"), 5)
+    elapsed = time.time() - start
+    after = new_job()
+    server.scheduler.submit(after, tasks.slow_job, after, 0.1)
+    job = job_store.get(running)
+    if (
+        response["cancelled"]
+        and job["status"] == "cancelled"
+        and job.get("released")
+        and wait_until(lambda: job_store.get(after)["status"] == "completed", 5)
+    ):
+        print(f"✅ Running job cancelled in {elapsed:.2f}s, cleanup ran, slot reused")
+    else:
+        print(f"❌ Running job: {job}")
+        failures += 1
+
+    again = server.cancel_job(after)
+    if not again["cancelled"] and again["status"] == "completed":
+        print("✅ Finished job left alone")
+    else:
+        print(f"❌ Finished job: {again}")
+        failures += 1
+    return failures
+
+
+def test_shared_search_cancel(tasks):
+    """A coalesced search only stops when its last caller cancels"""
+    import server
+    from job_store import job_store
+
+    failures = 0
+    server.run_browser_search_background = lambda job_id, query: tasks.slow_job(
+        job_id, 30
+    )
+    first = server.search_web("shared lamp")
+    second = server.search_web("Shared  lamp")
+    job_id = first["job_id"]
+    wait_until(lambda: job_store.get(job_id)["status"] == "running", 5)
+
+    kept = server.cancel_job(job_id)
+    if (
+        second.get("coalesced")
+        and not kept["cancelled"]
+        and kept["shared_with"] == 1
+        and job_store.get(job_id)["status"] == "running"
+    ):
+        print("✅ Shared search kept running for the other caller")
+    else:
+        print(f"❌ First cancel of a shared search: {kept}")
+        failures += 1
+
+    stopped = server.cancel_job(job_id)
+    wait_until(lambda: job_store.get(job_id).get("released"), 5)
+    status = server.get_search_status(job_id)
+    if (
+        stopped["cancelled"]
+        and status["status"] == "cancelled"
+        and status["message"] == "Browser search was cancelled"
+        and status.get("error")
+    ):
+        print("✅ Last caller's cancel stopped it, get_search_status says so")
+    else:
+        print(f"❌ Last cancel: {stopped}, status {status}")
+        failures += 1
+    return failures
+
+
+async def test_process_cancel(tasks, new_job):
+    """Process isolation: the child cancels its job, or is killed"""
+    from job_process import JobProcess
+    from job_store import job_store
+
+    failures = 0
+    process = JobProcess(preload=())
+    process.start()
+    try:
+        job_id = new_job()
+        run = asyncio.create_task(process.run(job_id, tasks.slow_job, (job_id, 30)))
+        while job_store.get(job_id)["status"] != "running":
+            await asyncio.sleep(0.05)
+        pid = job_store.get(job_id)["pid"]
+        start = time.time()
+        run.cancel()
+        try:
+            await run
+        except asyncio.CancelledError:
+            pass
+        elapsed = time.time() - start
+        if job_store.get(job_id).get("released") and elapsed < 2:
+            print(f"✅ Child cancelled its job in {elapsed:.2f}s, cleanup ran")
+        else:
+            print(f"❌ Child job after cancel: {job_store.get(job_id)}")
+            failures += 1
+
+        after = new_job()
+        await process.run(after, tasks.slow_job, (after, 0.1))
+        if job_store.get(after)["pid"] == pid:
+            print("✅ Same process took the next job")
+        else:
+            print("❌ Process was replaced after a clean cancel")
+            failures += 1
+
+        stubborn = new_job()
+        run = asyncio.create_task(
+            process.run(stubborn, tasks.stubborn_job, (stubborn,))
+        )
+        while job_store.get(stubborn)["status"] != "running":
+            await asyncio.sleep(0.05)
+        stubborn_pid = job_store.get(stubborn)["pid"]
+        start = time.time()
+        run.cancel()
+        try:
+            await run
+        except asyncio.CancelledError:
+            pass
+        elapsed = time.time() - start
+        try:
+            os.kill(stubborn_pid, 0)
+            alive = True
+        except ProcessLookupError:
+            alive = False
+        if not alive and elapsed < 5:
+            print(f"✅ Job ignoring its cancellation killed after {elapsed:.1f}s")
+        else:
+            print(f"❌ Stubborn job: alive={alive} after {elapsed:.1f}s")
+            failures += 1
+    finally:
+        await process.stop()
+    return failures
+
+
+async def test_stage_deadline():
+    from agent_to_integrate import StageTimeout, stage_deadline
+
+    try:
+        async with stage_deadline("login", 0.2):
+            await asyncio.sleep(5)
+    except StageTimeout as e:
+        print(f"✅ Stage deadline: {e}")
+        return 0
+    print("❌ Stage deadline did not fire")
+    return 1
+
+
+def main():
+    tmp = isolate(JOB_CANCEL_GRACE=1)
+    with open(os.path.join(tmp, "cancel_test_tasks.py"), "w") as f:
+        f.write(TASKS)
+    sys.path.insert(0, tmp)
+
+    import cancel_test_tasks as tasks
+    from job_store import job_store
+
+    def new_job():
+        job_id = str(uuid.uuid4())
+        job_store.create(job_id, "post", {"product_info": {}})
+        return job_id
+
+    print("🧪 Testing job cancellation and stage deadlines...")
+    failures = test_runtime_cancel(tasks, new_job)
+    failures += test_shared_search_cancel(tasks)
+    failures += asyncio.run(test_process_cancel(tasks, new_job))
+    failures += asyncio.run(test_stage_deadline())
+
+    print(
+        "\n✅ Cancellation test complete!"
+        if not failures
+        else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
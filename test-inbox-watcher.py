@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Exercise the inbox watcher against a scripted inbox - no browser or LLM."""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+)
+
+from test_support import isolate  # noqa: E402
+
+isolate()
+
+from inbox_watcher import InboxUnreadable, InboxWatcher  # noqa: E402
+
+
+class ScriptedInboxWatcher(InboxWatcher):
+    """Reads the inbox from a list the test edits instead of a browser"""
+
+    def __init__(self, inbox, **kwargs):
+        super().__init__(browser=None, **kwargs)
+        self.inbox = inbox
+
+    async def read_inbox(self):
+        # None stands for a page with neither the list nor its empty-state
+        if self.inbox is None:
+            return None
+        return [dict(conversation) for conversation in self.inbox]
+
+
+def conversation(text):
+    return {"id": "c1", "text": f"Buyer Bob\n{text}\n2m ago"}
+
+
+async def test_inbox_watcher():
+    print("🧪 Testing the inbox watcher against a scripted inbox...")
+    failures = 0
+
+    inbox = [conversation("You: Still available!")]
+    watcher = ScriptedInboxWatcher(inbox, poll_min=0.01, poll_max=0.08, backoff=2)
+
+    # Our own last message never wakes the negotiator
+    result = await watcher.wait_for_buyer_message(timeout=0.3)
+    if result is None:
+        print(f"✅ Quiet inbox: no wake-up, {watcher.polls} polls in 0.3s")
+    else:
+        print("❌ Woke up on our own message")
+        failures += 1
+
+    fixed_interval_polls = int(0.3 / 0.01)
+    if watcher.polls < fixed_interval_polls / 2:
+        print(f"✅ Backoff: {watcher.polls} polls vs {fixed_interval_polls} unbacked")
+    else:
+        print(f"❌ No backoff: {watcher.polls} polls")
+        failures += 1
+
+    # A buyer reply arrives while we wait
+    async def buyer_replies():
+        await asyncio.sleep(0.1)
+        inbox[0] = conversation("Would you take 30?")
+
+    start = time.perf_counter()
+    _, result = await asyncio.gather(
+        buyer_replies(), watcher.wait_for_buyer_message(timeout=2)
+    )
+    elapsed = time.perf_counter() - start
+    if result and "30" in result["text"]:
+        print(f"✅ Woke up {elapsed:.2f}s after waiting, on the buyer message")
+    else:
+        print(f"❌ Missed the buyer message: {result}")
+        failures += 1
+
+    # The same state is not reported twice
+    result = await watcher.wait_for_buyer_message(timeout=0.1)
+    if result is None:
+        print("✅ Unchanged conversation is not reported again")
+    else:
+        print("❌ Reported the same buyer message twice")
+        failures += 1
+
+    # A new ad's inbox is empty until a buyer writes - keep waiting
+    inbox = []
+    watcher = ScriptedInboxWatcher(inbox, poll_min=0.01, poll_max=0.02)
+    await watcher.mark_seen()
+    result = await watcher.wait_for_buyer_message(timeout=0.1)
+    if result is None and watcher.polls > 2:
+        print(f"✅ Empty inbox polled quietly ({watcher.polls} polls)")
+    else:
+        print(f"❌ Empty inbox: {result} after {watcher.polls} polls")
+        failures += 1
+    inbox.append(conversation("Is this still available?"))
+    result = await watcher.wait_for_buyer_message(timeout=1)
+    if result and "available" in result["text"]:
+        print("✅ First buyer message in an empty inbox woke the negotiator")
+    else:
+        print(f"❌ Missed the first buyer message: {result}")
+        failures += 1
+
+    # An older ad's conversation on top is not a new message
+    inbox = [conversation("Would you take 20 for the lamp?")]
+    watcher = ScriptedInboxWatcher(inbox, poll_min=0.01, poll_max=0.02)
+    await watcher.mark_seen()
+    result = await watcher.wait_for_buyer_message(timeout=0.1)
+    if result is None:
+        print("✅ Conversation already in the inbox was not reported")
+    else:
+        print("❌ Reported a conversation from before the negotiation")
+        failures += 1
+
+    # Stale selectors: neither the list nor the empty-state - give up at once
+    watcher = ScriptedInboxWatcher(None, poll_min=0.01)
+    try:
+        await watcher.wait_for_buyer_message(timeout=2)
+        print("❌ Unrecognised page treated as a quiet inbox")
+        failures += 1
+    except InboxUnreadable as e:
+        print(f"✅ Stale selectors raised after {watcher.polls} poll: {e}")
+
+    # Reads that keep failing give up after max_read_failures tries
+    class BrokenInboxWatcher(InboxWatcher):
+        async def read_inbox(self):
+            raise RuntimeError("page crashed")
+
+    watcher = BrokenInboxWatcher(None, poll_min=0.01, max_read_failures=3)
+    try:
+        await watcher.wait_for_buyer_message(timeout=2)
+        print("❌ Failed reads polled until the timeout")
+        failures += 1
+    except InboxUnreadable:
+        if watcher.polls == 3:
+            print("✅ Failed reads raised after 3 tries")
+        else:
+            print(f"❌ Failed reads raised after {watcher.polls} tries")
+            failures += 1
+
+    print(
+        "\n✅ Inbox watcher test complete!"
+        if not failures
+        else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(test_inbox_watcher()) else 0)
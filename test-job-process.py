@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""Exercise process-isolated jobs: streamed updates, recycling, hard
+timeouts and crashes - no browser or LLM."""
+
+import asyncio
+import os
+import sys
+import textwrap
+import time
+import uuid
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+sys.path.insert(0, SRC)
+
+from test_support import isolate  # noqa: E402
+
+# Stand-in jobs, importable by the job processes through sys.path
+TASKS = textwrap.dedent("""
+    import asyncio
+    import os
+    import time
+
+    from job_store import job_store
+    from notifications import send_poke_notification
+
+    _hog = None
+
+
+    async def staged_job(job_id, stages, delay):
+        query = job_store.get(job_id)["query"]
+        job_store.update(job_id, status="running", pid=os.getpid(), seen=query)
+        for stage in stages:
+            await asyncio.sleep(delay)
+            job_store.update(job_id, stage=stage)
+        send_poke_notification(f"finished {query}")
+        job_store.update(job_id, status="completed", completed_at=time.time())
+
+
+    async def hog_job(job_id, mb):
+        global _hog
+        _hog = b"x" * (mb * 1024 * 1024)
+        job_store.update(job_id, status="completed", pid=os.getpid())
+
+
+    async def stuck_job(job_id):
+        job_store.update(job_id, status="running", pid=os.getpid())
+        # Blocks the child's loop, so only a kill can stop it
+        time.sleep(60)
+
+
+    async def crash_job(job_id):
+        os._exit(3)
+
+
+    async def follow_up_job(job_id):
+        from scheduler import QueueFull, scheduler
+
+        follow_up = f"{job_id}-next"
+        job_store.create(follow_up, "search", {"query": "next"})
+        try:
+            position = scheduler.submit(
+                follow_up, staged_job, follow_up, [], 0, priority=20, key="next"
+            )
+        except QueueFull as e:
+            position = str(e)
+        job_store.update(job_id, status="completed", position=position)
+    """)
+
+
+async def test_job_process():
+    tmp = isolate()
+    with open(os.path.join(tmp, "process_test_tasks.py"), "w") as f:
+        f.write(TASKS)
+    sys.path.insert(0, tmp)
+
+    import notifications
+    import process_test_tasks as tasks
+    import scheduler
+    from job_process import JobProcess
+    from job_store import job_store
+
+    sent = []
+    notifications.send_poke_notification = sent.append
+    arrivals = []
+    job_store.watch(None, lambda job_id: arrivals.append((time.time(), job_id)))
+
+    def new_job():
+        job_id = str(uuid.uuid4())
+        job_store.create(job_id, "search", {"query": job_id[:8]})
+        return job_id
+
+    print("🧪 Testing process-isolated jobs...")
+    failures = 0
+    process = JobProcess(max_jobs=3, max_rss_mb=300, preload=())
+    process.start()
+    try:
+        # Updates reach the server's store while the job is still running
+        job_id = new_job()
+        start = time.time()
+        await process.run(job_id, tasks.staged_job, (job_id, ["a", "b", "c"], 0.3), 10)
+        job = job_store.get(job_id)
+        spread = arrivals[-1][0] - arrivals[0][0]
+        if job["status"] == "completed" and job["seen"] == job_id[:8] and spread > 0.8:
+            elapsed = time.time() - start
+            print(
+                f"✅ Stage updates streamed over {spread:.1f}s of a {elapsed:.1f}s job"
+            )
+        else:
+            print(f"❌ Updates not streamed: {job}, spread {spread:.2f}s")
+            failures += 1
+        if sent == [f"finished {job_id[:8]}"]:
+            print("✅ Notification handed to the server's outbox")
+        else:
+            print(f"❌ Notifications: {sent}")
+            failures += 1
+
+        # Recycled after max_jobs
+        pids = []
+        for _ in range(3):
+            job_id = new_job()
+            await process.run(job_id, tasks.staged_job, (job_id, [], 0), 10)
+            pids.append(job_store.get(job_id)["pid"])
+        if pids[0] == pids[1] != pids[2]:
+            print("✅ Process replaced after 3 jobs")
+        else:
+            print(f"❌ Job pids {pids}")
+            failures += 1
+
+        # Recycled past the RSS limit
+        job_id = new_job()
+        await process.run(job_id, tasks.hog_job, (job_id, 400), 10)
+        hog_pid = job_store.get(job_id)["pid"]
+        job_id = new_job()
+        await process.run(job_id, tasks.staged_job, (job_id, [], 0), 10)
+        if job_store.get(job_id)["pid"] != hog_pid:
+            print("✅ Process replaced after passing the RSS limit")
+        else:
+            print("❌ Process kept after passing the RSS limit")
+            failures += 1
+
+        # Killed hard on timeout
+        job_id = new_job()
+        start = time.time()
+        await process.run(job_id, tasks.stuck_job, (job_id,), 1.0)
+        elapsed = time.time() - start
+        job = job_store.get(job_id)
+        stuck_pid = job["pid"]
+        if job["status"] == "failed" and "timed out" in job["error"] and elapsed < 5:
+            print(f"✅ Stuck job killed after {elapsed:.1f}s")
+        else:
+            print(f"❌ Stuck job: {job['status']} after {elapsed:.1f}s")
+            failures += 1
+        try:
+            os.kill(stuck_pid, 0)
+            print("❌ Stuck job's process is still alive")
+            failures += 1
+        except ProcessLookupError:
+            print("✅ Stuck job's process is gone")
+
+        # A crash fails the job and the next one gets a fresh process
+        job_id = new_job()
+        await process.run(job_id, tasks.crash_job, (job_id,), 10)
+        job = job_store.get(job_id)
+        after = new_job()
+        await process.run(after, tasks.staged_job, (after, [], 0), 10)
+        if (
+            job["status"] == "failed"
+            and "exited (3)" in job["error"]
+            and job_store.get(after)["status"] == "completed"
+        ):
+            print("✅ Crashed job failed, next job ran in a new process")
+        else:
+            print(f"❌ Crashed job: {job['status']} {job.get('error')}")
+            failures += 1
+
+        # A job queues a follow-up on the server's scheduler, not its own
+        submitted = []
+
+        def submit(job_id, fn, *args, **options):
+            if submitted:
+                raise scheduler.QueueFull("Job queue is full (1 waiting)")
+            submitted.append((job_id, fn, args, options))
+            return 2
+
+        scheduler.scheduler.submit = submit
+        job_id = new_job()
+        await process.run(job_id, tasks.follow_up_job, (job_id,), 10)
+        job = job_store.get(job_id)
+        expected = [
+            (
+                f"{job_id}-next",
+                tasks.staged_job,
+                (f"{job_id}-next", [], 0),
+                {"priority": 20, "key": "next"},
+            )
+        ]
+        if (
+            job["position"] == 2
+            and submitted == expected
+            and job_store.get(f"{job_id}-next")["query"] == "next"
+        ):
+            print("✅ Follow-up job created and queued on the server's scheduler")
+        else:
+            print(f"❌ Follow-up: {job.get('position')} {submitted}")
+            failures += 1
+        job_id = new_job()
+        await process.run(job_id, tasks.follow_up_job, (job_id,), 10)
+        if "full" in str(job_store.get(job_id)["position"]):
+            print("✅ A full queue is raised in the job as QueueFull")
+        else:
+            print(f"❌ Full queue: {job_store.get(job_id)}")
+            failures += 1
+    finally:
+        await process.stop()
+
+    print(
+        "\n✅ Job process test complete!"
+        if not failures
+        else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(test_job_process()) else 0)
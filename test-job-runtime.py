@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Exercise the job runtime: jobs as tasks on one event loop, semaphore
+limits, timeouts and shared clients - no browser or LLM."""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import uuid
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+sys.path.insert(0, SRC)
+
+from test_support import isolate, wait_until  # noqa: E402
+
+isolate()
+
+import notifications  # noqa: E402
+from handleImage import get_async_client  # noqa: E402
+from job_store import job_store  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+
+notifications.send_poke_notification = lambda message: None
+
+running = 0
+peak = 0
+seen = []
+
+
+async def sleep_job(job_id, seconds):
+    global running, peak
+    job_store.update(job_id, status="running", started_at=time.time())
+    running += 1
+    peak = max(peak, running)
+    seen.append((threading.get_ident(), id(asyncio.get_running_loop())))
+    client = get_async_client()
+    await asyncio.sleep(seconds)
+    running -= 1
+    job_store.update(
+        job_id, status="completed", client=id(client), completed_at=time.time()
+    )
+
+
+def test_job_runtime():
+    scheduler = Scheduler(workers=2, max_queue=10, isolation="thread")
+
+    def submit(seconds, key=None, timeout=None):
+        job_id = str(uuid.uuid4())
+        job_store.create(job_id, "search", {"query": "test"})
+        scheduler.submit(
+            job_id, sleep_job, job_id, seconds, key=key, key_limit=1, timeout=timeout
+        )
+        return job_id
+
+    def finished(*job_ids):
+        return lambda: all(
+            job_store.get(job_id)["status"] in ("completed", "failed")
+            for job_id in job_ids
+        )
+
+    print("🧪 Testing the job runtime with 2 slots...")
+    failures = 0
+    threads_before = threading.active_count()
+
+    # Jobs share one thread and loop, at most `workers` at a time
+    start = time.time()
+    jobs = [submit(0.3) for _ in range(4)]
+    wait_until(finished(*jobs), 5)
+    elapsed = time.time() - start
+    statuses = {job_store.get(job_id)["status"] for job_id in jobs}
+    if statuses == {"completed"} and len(set(seen)) == 1 and peak == 2:
+        print(f"✅ 4 jobs ran 2 at a time on one loop in {elapsed:.2f}s")
+    else:
+        print(f"❌ Jobs {statuses} on {len(set(seen))} loop(s), peak {peak}")
+        failures += 1
+    if threading.active_count() - threads_before <= 1:
+        print("✅ No thread per job")
+    else:
+        print(f"❌ {threading.active_count() - threads_before} new threads")
+        failures += 1
+    clients = {job_store.get(job_id)["client"] for job_id in jobs}
+    if len(clients) == 1:
+        print("✅ Jobs shared one Anthropic client")
+    else:
+        print(f"❌ Jobs used {len(clients)} Anthropic clients")
+        failures += 1
+
+    # Jobs sharing a key run one after another
+    first, second = submit(0.3, key="shop"), submit(0.1, key="shop")
+    wait_until(finished(first, second), 5)
+    if job_store.get(second)["started_at"] >= job_store.get(first)["completed_at"]:
+        print("✅ Jobs for the same account ran one at a time")
+    else:
+        print("❌ Jobs for the same account overlapped")
+        failures += 1
+
+    # An overrunning job is cancelled and frees its slot
+    stuck = submit(30, timeout=0.5)
+    wait_until(finished(stuck), 5)
+    job = job_store.get(stuck)
+    after = submit(0.1)
+    if (
+        job["status"] == "failed"
+        and "timed out" in job["error"]
+        and wait_until(finished(after), 5)
+        and scheduler.stats()["active"] == 0
+    ):
+        print("✅ Overrunning job cancelled, slot reused")
+    else:
+        print(f"❌ Overrunning job: {job['status']} {job.get('error')}")
+        failures += 1
+
+    print(
+        "\n✅ Job runtime test complete!"
+        if not failures
+        else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if test_job_runtime() else 0)
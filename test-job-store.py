@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Exercise the in-memory job store's size cap - no browser or LLM."""
+
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+)
+
+from test_support import isolate  # noqa: E402
+
+isolate()
+
+from job_store import MemoryJobStore  # noqa: E402
+
+
+def test_job_store():
+    print("🧪 Testing the in-memory job store cap...")
+    failures = 0
+    store = MemoryJobStore(max_jobs=3)
+
+    store.create("live", "search", {"query": "oldest, still running"})
+    store.update("live", status="running")
+    store.create("done", "search", {"query": "finished"})
+    store.update("done", status="completed", completed_at=time.time())
+    store.create("queued", "search", {"query": "waiting"})
+
+    # Over the cap: the finished job goes, the older live one stays
+    store.create("new", "search", {"query": "newest"})
+    if store.get("done") is None and store.get("live") is not None:
+        print("✅ Finished job evicted before an older running one")
+    else:
+        print("❌ Wrong job evicted")
+        failures += 1
+
+    store.update("live", status="completed", result="ok", completed_at=time.time())
+    if store.get("live")["result"] == "ok":
+        print("✅ Updates still land on the long-running job")
+    else:
+        print("❌ Update for a live job was dropped")
+        failures += 1
+
+    # With nothing finished to evict, live jobs are kept over the cap
+    store = MemoryJobStore(max_jobs=2)
+    for job_id in ("a", "b", "c"):
+        store.create(job_id, "search", {"query": job_id})
+    if all(store.get(job_id) for job_id in ("a", "b", "c")):
+        print("✅ Live jobs kept even past the cap")
+    else:
+        print("❌ A queued job was evicted")
+        failures += 1
+
+    print(
+        "\n✅ Job store test complete!"
+        if not failures
+        else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if test_job_store() else 0)
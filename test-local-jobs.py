@@ -3,6 +3,10 @@ import asyncio
 from fastmcp import Client
 
 
+async def report_progress(progress, total, message):
+    print(f"📊 Stage {int(progress)}/{int(total)}: {message}")
+
+
 async def test_local_background_jobs():
     print("🧪 Testing local MCP server with background jobs...")
 
@@ -26,31 +30,25 @@ async def test_local_background_jobs():
 
             job_id = job_data["job_id"]
 
-            # Poll for results
-            print(f"\n⏳ Polling job {job_id}...")
-            for i in range(10):  # Poll up to 10 times (100 seconds)
-                await asyncio.sleep(10)
-
-                status_result = await client.call_tool(
-                    "get_search_status", {"job_id": job_id}
-                )
-                status = status_result.data
-
-                print(f"📊 Poll {i + 1}: {status['status']}")
-                if "message" in status:
-                    print(f"   💬 {status['message']}")
-                if "running_for" in status:
-                    print(f"   ⏱️  Running for: {status['running_for']}")
-
-                if status["status"] == "completed":
-                    print("🎉 SUCCESS! Browser search completed!")
-                    print(f"📤 Result: {status['result']}")
-                    print(f"⏱️  Total time: {status['total_time']}")
-                    break
-                elif status["status"] == "failed":
-                    print("❌ FAILED!")
-                    print(f"💥 Error: {status['error']}")
-                    break
+            # Wait for results - the server holds the call open until the job
+            # finishes and streams progress notifications meanwhile
+            print(f"\n⏳ Waiting for job {job_id}...")
+            status_result = await client.call_tool(
+                "wait_for_job",
+                {"job_id": job_id, "timeout": 100},
+                progress_handler=report_progress,
+            )
+            status = status_result.data
+
+            if status["status"] == "completed":
+                print("🎉 SUCCESS! Browser search completed!")
+                print(f"📤 Result: {status['result']}")
+                print(f"⏱️  Total time: {status['total_time']}")
+            elif status["status"] == "failed":
+                print("❌ FAILED!")
+                print(f"💥 Error: {status['error']}")
+            else:
+                print(f"⌛ Still {status['status']} after 100 seconds")
 
             print("\n✅ Background job pattern test complete!")
 
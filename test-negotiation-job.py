@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Exercise buyer negotiation as its own job: postings finish once the ad is
+up, negotiations queue behind one another and never take every worker - no
+browser or LLM."""
+
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+sys.path.insert(0, SRC)
+
+from test_support import isolate, wait_until  # noqa: E402
+
+isolate(
+    JOB_ISOLATION="thread",
+    SCHEDULER_WORKERS=2,
+    KIJIJI_ACCOUNTS=json.dumps({"shop": {"username": "shop", "password": "pw"}}),
+)
+
+import endpoints  # noqa: E402
+from job_store import job_store  # noqa: E402
+from scheduler import scheduler  # noqa: E402
+
+negotiations = []
+released = False
+
+
+async def fake_categorize(title, description):
+    return "Other"
+
+
+async def fake_post(product_info, username, password, on_stage):
+    on_stage("login")
+    on_stage("form_fill")
+    await asyncio.sleep(0.05)
+    on_stage("posted")
+    return f"inbox-before-{product_info['title']}"
+
+
+async def fake_negotiate(price, username, password, last_seen=None, on_stage=None):
+    negotiations.append((price, username, last_seen))
+    on_stage("login")
+    on_stage("negotiating")
+    # Stands in for hours of waiting on buyers
+    while not released:
+        await asyncio.sleep(0.02)
+
+
+async def search_job(job_id):
+    job_store.update(job_id, status="completed", completed_at=time.time())
+
+
+endpoints.categorize_product_with_anthropic_async = fake_categorize
+endpoints.run_agent = fake_post
+endpoints.negotiate_listing = fake_negotiate
+endpoints.send_poke_notification = lambda message: None
+
+
+def status(job_id):
+    return job_store.get(job_id)["status"]
+
+
+def test_negotiation_job():
+    global released
+    print("🧪 Testing buyer negotiation as a separate job...")
+    failures = 0
+
+    posts = [
+        asyncio.run(endpoints.post_to_kijiji("Lamp", "Brass", "20")),
+        asyncio.run(endpoints.post_to_kijiji("Desk", "Oak", "0", account="shop")),
+    ]
+    post_ids = [post["job_id"] for post in posts]
+    wait_until(lambda: all(status(job_id) == "completed" for job_id in post_ids), 5)
+    negotiation_ids = [
+        job_store.get(job_id)["negotiation_job_id"] for job_id in post_ids
+    ]
+    if all(status(job_id) == "completed" for job_id in post_ids) and all(
+        negotiation_ids
+    ):
+        print("✅ Postings completed once the ads were up, each queued a negotiation")
+    else:
+        print(f"❌ Postings: {[job_store.get(job_id) for job_id in post_ids]}")
+        return 1
+
+    wait_until(lambda: negotiations, 5)
+    time.sleep(0.2)
+    if [status(job_id) for job_id in negotiation_ids] == ["running", "queued"]:
+        print("✅ One negotiation at a time, the other waits its turn")
+    else:
+        print(f"❌ Negotiations: {[status(job_id) for job_id in negotiation_ids]}")
+        failures += 1
+    if negotiations == [("20", None, "inbox-before-Lamp")]:
+        print("✅ Negotiation starts from the inbox as it was right after posting")
+    else:
+        print(f"❌ Negotiation arguments: {negotiations}")
+        failures += 1
+
+    # A search still gets a worker while a negotiation waits on buyers
+    search_id = str(uuid.uuid4())
+    job_store.create(search_id, "search", {"query": "lamp"})
+    scheduler.submit(search_id, search_job, search_id)
+    if wait_until(lambda: status(search_id) == "completed", 2):
+        print("✅ Search ran alongside the negotiation")
+    else:
+        print(f"❌ Search stuck behind negotiations: {scheduler.stats()}")
+        failures += 1
+
+    finished = endpoints.conversation_finished(post_ids[0])
+    if not finished["success"] and finished["status"] == "running":
+        print("✅ conversation_finished follows the posting to its negotiation")
+    else:
+        print(f"❌ conversation_finished: {finished}")
+        failures += 1
+
+    released = True
+    wait_until(
+        lambda: all(status(job_id) == "completed" for job_id in negotiation_ids), 5
+    )
+    if (
+        negotiations[1] == ("0", "shop", "inbox-before-Desk")
+        and endpoints.conversation_finished(post_ids[1])["success"]
+    ):
+        print("✅ Second negotiation ran once the first finished")
+    else:
+        print(f"❌ Second negotiation: {negotiations}")
+        failures += 1
+
+    print(
+        "\n✅ Negotiation job test complete!"
+        if not failures
+        else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if test_negotiation_job() else 0)
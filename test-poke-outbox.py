@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Exercise the Poke notification outbox against a local stand-in webhook."""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+)
+from test_support import isolate, wait_until  # noqa: E402
+
+# Keep the module-level outbox away from the real one
+isolate()
+
+from notifications import NotificationOutbox  # noqa: E402
+from stand_ins import PokeWebhookStandIn  # noqa: E402
+
+
+def test_poke_outbox():
+    print("🧪 Testing Poke outbox against a local stand-in webhook...")
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "outbox.db")
+
+        # Retries: the first two deliveries get a 503
+        with PokeWebhookStandIn(fail_first=2) as webhook:
+            outbox = NotificationOutbox(path, url=webhook.url, base_delay=0.1)
+            outbox.enqueue("hello after retries")
+            if wait_until(lambda: webhook.messages == ["hello after retries"], 10):
+                print("✅ Delivered after 2 failed attempts")
+            else:
+                print(f"❌ Not delivered, webhook saw {webhook.messages}")
+                failures += 1
+            outbox.stop()
+
+        # Strict timeouts + persistence: a slow webhook must not lose messages
+        with PokeWebhookStandIn(latency=1.0) as slow_webhook:
+            outbox = NotificationOutbox(
+                path, url=slow_webhook.url, timeout=0.2, base_delay=0.1
+            )
+            outbox.enqueue("survives a restart")
+            time.sleep(0.5)
+            outbox.stop()
+            if outbox.pending() == 1:
+                print("✅ Timed-out message is still pending in the outbox")
+            else:
+                print(f"❌ Expected 1 pending message, found {outbox.pending()}")
+                failures += 1
+
+        with PokeWebhookStandIn() as webhook:
+            restarted = NotificationOutbox(path, url=webhook.url, base_delay=0.1)
+            restarted.start()
+            if wait_until(lambda: webhook.messages == ["survives a restart"], 10):
+                print("✅ Restarted outbox delivered the persisted message")
+            else:
+                print(f"❌ Persisted message not delivered: {webhook.messages}")
+                failures += 1
+            restarted.stop()
+
+    print(
+        "\n✅ Outbox test complete!" if not failures else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if test_poke_outbox() else 0)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Exercise search_web coalescing and the result cache with a stand-in
+search job - no browser or LLM."""
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+sys.path.insert(0, SRC)
+
+from test_support import isolate, wait_until  # noqa: E402
+
+isolate(JOB_ISOLATION="thread")
+
+import server  # noqa: E402
+from job_store import job_store  # noqa: E402
+
+searches = []
+
+
+async def fake_search(job_id, query):
+    searches.append(query)
+    job_store.update(job_id, status="running", started_at=time.time())
+    await asyncio.sleep(0.5)
+    if "broken" in query:
+        job_store.update(
+            job_id, status="failed", error="no results", completed_at=time.time()
+        )
+        return
+    job_store.update(
+        job_id,
+        status="completed",
+        result=f"top result for {query}",
+        completed_at=time.time(),
+    )
+
+
+server.run_browser_search_background = fake_search
+
+
+def wait_finished(job_id, timeout=5):
+    return wait_until(
+        lambda: job_store.get(job_id)["status"] in ("completed", "failed"), timeout
+    )
+
+
+def test_search_cache():
+    print("🧪 Testing search_web coalescing and caching...")
+    failures = 0
+
+    # Identical queries in flight share one job
+    queries = ["Standing desk", "standing  desk", "STANDING DESK "]
+    with ThreadPoolExecutor(len(queries)) as pool:
+        responses = list(pool.map(server.search_web, queries))
+    job_ids = {response["job_id"] for response in responses}
+    coalesced = sum(bool(response.get("coalesced")) for response in responses)
+    if len(job_ids) == 1 and coalesced == 2:
+        print("✅ 3 identical queries in flight shared one job")
+    else:
+        print(f"❌ {len(job_ids)} jobs, {coalesced} coalesced: {responses}")
+        failures += 1
+
+    # Once finished, a repeat is answered from the cache
+    wait_finished(job_ids.pop())
+    start = time.perf_counter()
+    repeat = server.search_web("standing desk")
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if (
+        repeat["cached"]
+        and repeat["status"] == "completed"
+        and repeat["result"] == "top result for Standing desk"
+        and len(searches) == 1
+    ):
+        print(f"✅ Repeat query served from cache in {elapsed_ms:.1f}ms")
+    else:
+        print(f"❌ Repeat query: {repeat}, {len(searches)} searches")
+        failures += 1
+
+    # A different query starts its own search
+    other = server.search_web("bookshelf")
+    if not other["cached"] and not other.get("coalesced"):
+        print("✅ Different query started a new search")
+    else:
+        print(f"❌ Different query: {other}")
+        failures += 1
+    wait_finished(other["job_id"])
+
+    # Failed searches are not cached
+    broken = server.search_web("broken query")
+    wait_finished(broken["job_id"])
+    retry = server.search_web("broken query")
+    if retry["job_id"] != broken["job_id"] and not retry["cached"]:
+        print("✅ Failed search retried instead of cached")
+    else:
+        print(f"❌ Failed search reused: {retry}")
+        failures += 1
+    wait_finished(retry["job_id"])
+
+    # Stale results are searched again
+    server.search_cache.ttl = 0.2
+    time.sleep(0.3)
+    stale = server.search_web("standing desk")
+    if not stale["cached"] and stale["job_id"] not in (r["job_id"] for r in responses):
+        print("✅ Result older than the TTL searched again")
+    else:
+        print(f"❌ Stale result reused: {stale}")
+        failures += 1
+    wait_finished(stale["job_id"])
+
+    print(f"📊 {server.search_cache.stats()}")
+    print(
+        "\n✅ Search cache test complete!"
+        if not failures
+        else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if test_search_cache() else 0)
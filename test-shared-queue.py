@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Exercise the split deployment: a front end queues jobs in SQLite and
+worker.py processes run them - no browser or LLM."""
+
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+import uuid
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+
+# Stand-in jobs, importable by the worker processes through PYTHONPATH
+TASKS = textwrap.dedent("""
+    import asyncio
+    import os
+    import time
+
+    from job_store import job_store
+
+
+    async def sleep_job(job_id, seconds):
+        job_store.update(
+            job_id, status="running", started_at=time.time(), worker_pid=os.getpid()
+        )
+        await asyncio.sleep(seconds)
+        job_store.update(
+            job_id, status="completed", result="done", completed_at=time.time()
+        )
+    """)
+
+
+def test_shared_queue():
+    sys.path.insert(0, SRC)
+    from test_support import isolate, wait_until
+
+    tmp = isolate(
+        JOB_QUEUE="sqlite",
+        JOB_QUEUE_POLL="0.1",
+        JOB_STORE="sqlite",
+    )
+    with open(os.path.join(tmp, "queue_test_tasks.py"), "w") as f:
+        f.write(TASKS)
+    os.environ.update(
+        {
+            "JOB_QUEUE_PATH": os.path.join(tmp, "queue.db"),
+            "JOB_STORE_PATH": os.path.join(tmp, "jobs.db"),
+            "PYTHONPATH": os.pathsep.join([tmp, SRC]),
+        }
+    )
+    sys.path.insert(0, tmp)
+
+    from job_store import FINISHED_STATUSES, job_store
+    from queue_test_tasks import sleep_job
+    from scheduler import mark_cancelled, scheduler
+
+    def submit(seconds, key=None):
+        job_id = str(uuid.uuid4())
+        job_store.create(job_id, "search", {"query": "test"})
+        scheduler.submit(job_id, sleep_job, job_id, seconds, key=key, key_limit=1)
+        return job_id
+
+    def finished(*job_ids):
+        return lambda: all(
+            job_store.get(job_id)["status"] in FINISHED_STATUSES for job_id in job_ids
+        )
+
+    print("🧪 Testing the shared job queue with 2 worker processes...")
+    failures = 0
+    workers = subprocess.Popen(
+        [sys.executable, "worker.py", "--processes", "2"], cwd=SRC
+    )
+    try:
+        if not wait_until(lambda: scheduler.stats()["workers"] == 2, 60):
+            print("❌ Worker processes did not register")
+            return 1
+
+        # Jobs spread across both processes
+        jobs = [submit(0.5) for _ in range(4)]
+        start = time.time()
+        wait_until(finished(*jobs), 20)
+        elapsed = time.time() - start
+        pids = {job_store.get(job_id).get("worker_pid") for job_id in jobs}
+        statuses = {job_store.get(job_id)["status"] for job_id in jobs}
+        if statuses == {"completed"} and len(pids) == 2 and elapsed < 1.8:
+            print(f"✅ 4 jobs ran on 2 processes in {elapsed:.2f}s")
+        else:
+            print(f"❌ Jobs {statuses} on {len(pids)} process(es) in {elapsed:.2f}s")
+            failures += 1
+
+        # Another process (a second front end) sees the same jobs and queue
+        blocker, waiting = submit(1.0, key="shop"), submit(0.1, key="shop")
+        wait_until(lambda: job_store.get(blocker)["status"] == "running", 5)
+        other = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys; from job_store import job_store; "
+                "from scheduler import scheduler; "
+                "print(job_store.get(sys.argv[1])['status'], "
+                "scheduler.position(sys.argv[1]))",
+                waiting,
+            ],
+            cwd=SRC,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        if other == "queued 1":
+            print("✅ Another front end reports the queued job and its position")
+        else:
+            print(f"❌ Another front end saw: {other!r}")
+            failures += 1
+
+        # Jobs sharing a key run one after another
+        wait_until(finished(blocker, waiting), 10)
+        first, second = job_store.get(blocker), job_store.get(waiting)
+        if second["started_at"] >= first["completed_at"]:
+            print("✅ Jobs for the same account ran one at a time")
+        else:
+            print("❌ Jobs for the same account overlapped")
+            failures += 1
+
+        # A cancelled job stops on its worker, which then takes the next job
+        cancelled = submit(30)
+        wait_until(lambda: job_store.get(cancelled)["status"] == "running", 5)
+        outcome = scheduler.cancel(cancelled)
+        mark_cancelled(cancelled)
+        start = time.time()
+        wait_until(lambda: scheduler.stats()["active"] == 0, 5)
+        elapsed = time.time() - start
+        after = submit(0.1)
+        if (
+            outcome == "cancelling"
+            and job_store.get(cancelled)["status"] == "cancelled"
+            and elapsed < 2
+            and wait_until(finished(after), 5)
+        ):
+            print(f"✅ Running job cancelled on its worker in {elapsed:.2f}s")
+        else:
+            print(f"❌ Cancel: {outcome} {job_store.get(cancelled)} {elapsed:.2f}s")
+            failures += 1
+
+        # A worker that dies mid-job fails that job and gets replaced
+        doomed = submit(30)
+        wait_until(lambda: job_store.get(doomed).get("worker_pid"), 5)
+        os.kill(job_store.get(doomed)["worker_pid"], signal.SIGKILL)
+        wait_until(finished(doomed), 10)
+        job = job_store.get(doomed)
+        after = submit(0.1)
+        if (
+            job["status"] == "failed"
+            and "Worker process exited" in job["error"]
+            and wait_until(finished(after), 60)
+        ):
+            print("✅ Killed worker's job failed, replacement took the next job")
+        else:
+            print(f"❌ Killed worker's job: {job['status']} {job.get('error')}")
+            failures += 1
+    finally:
+        workers.send_signal(signal.SIGTERM)
+        workers.wait(30)
+
+    if scheduler.stats()["workers"] == 0:
+        print("✅ Workers deregistered on shutdown")
+    else:
+        print(f"❌ Workers still registered: {scheduler.stats()}")
+        failures += 1
+
+    print(
+        "\n✅ Shared queue test complete!"
+        if not failures
+        else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if test_shared_queue() else 0)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Exercise streamed create_listing analysis against a local fake Anthropic
+endpoint: early fields, schema-enforced requests and surfaced failures."""
+
+import asyncio
+import base64
+import io
+import os
+import sys
+import time
+
+from PIL import Image
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+)
+
+from stand_ins import AnthropicStandIn  # noqa: E402
+from test_support import isolate  # noqa: E402
+
+LISTING = {
+    "title": "Oak bookshelf",
+    "category": "Furniture",
+    "price": "40",
+    "description": "Solid oak, five shelves, light wear on the top edge. " * 8,
+}
+
+
+def photo() -> str:
+    output = io.BytesIO()
+    Image.new("RGB", (640, 480), "navy").save(output, "JPEG")
+    return base64.b64encode(output.getvalue()).decode()
+
+
+def responder(request: dict):
+    text = request["messages"][-1]["content"][-1]["text"]
+    if "refuse" in text:
+        return "I can't help with that."
+    if "partial" in text:
+        return {"title": "Oak bookshelf", "category": "Furniture"}
+    return LISTING
+
+
+async def test_streaming_analysis():
+    print("🧪 Testing streamed listing analysis against a local Anthropic stand-in...")
+    failures = 0
+
+    with AnthropicStandIn(
+        responder=responder, chunk_size=8, chunk_delay=0.01
+    ) as anthropic:
+        isolate(ANTHROPIC_BASE_URL=anthropic.url)
+        import handleImage
+
+        arrivals = {}
+        start = time.perf_counter()
+        product_info = await handleImage.analyze_image_async(
+            photo(),
+            "image/jpeg",
+            on_field=lambda name, value: arrivals.setdefault(
+                name, time.perf_counter() - start
+            ),
+        )
+        total = time.perf_counter() - start
+
+        request = handleImage.build_analysis_request(photo(), "image/jpeg")
+        if (
+            request["tool_choice"]["name"] == "create_listing"
+            and product_info == LISTING
+        ):
+            print("✅ Listing came back through the enforced create_listing tool")
+        else:
+            print(f"❌ Unexpected listing: {product_info}")
+            failures += 1
+
+        order = sorted(arrivals, key=arrivals.get)
+        if order == ["title", "category", "price", "description"] and (
+            arrivals["category"] < total / 2
+        ):
+            print(
+                f"✅ Title at {arrivals['title']:.2f}s, category at "
+                f"{arrivals['category']:.2f}s, description at "
+                f"{arrivals['description']:.2f}s of {total:.2f}s"
+            )
+        else:
+            print(f"❌ Fields arrived {arrivals} of {total:.2f}s")
+            failures += 1
+
+        # A cached guess for the same text never overrides the vision answer
+        handleImage.category_cache.put(
+            LISTING["title"], LISTING["description"], "Books"
+        )
+        again = await handleImage.analyze_image_async(photo(), "image/jpeg")
+        if (
+            again["category"] == "Furniture"
+            and handleImage.category_cache.get(LISTING["title"], LISTING["description"])
+            == "Furniture"
+        ):
+            print("✅ Vision category kept over a cached guess, and cached")
+        else:
+            print(f"❌ Vision category replaced: {again['category']}")
+            failures += 1
+
+        seen = []
+        handleImage.analyze_image(
+            photo(), "image/jpeg", on_field=lambda name, value: seen.append(name)
+        )
+        if seen == list(handleImage.LISTING_FIELDS):
+            print("✅ Blocking analyze_image streams the same fields")
+        else:
+            print(f"❌ Blocking analyze_image fields: {seen}")
+            failures += 1
+
+        # Bad replies raise instead of turning into a placeholder listing
+        for prompt in ("refuse", "partial"):
+            request = handleImage.build_analysis_request(photo(), "image/jpeg")
+            request["messages"][-1]["content"][-1]["text"] = prompt
+            try:
+                result = await handleImage.stream_analysis(request)
+                print(f"❌ '{prompt}' reply returned {result}")
+                failures += 1
+            except ValueError as e:
+                print(f"✅ '{prompt}' reply raised: {e}")
+
+    print(
+        "\n✅ Streaming analysis test complete!"
+        if not failures
+        else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(test_streaming_analysis()) else 0)
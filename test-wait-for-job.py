@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Exercise wait_for_job with jobs driven through their stages by hand:
+progress reports, the timeout return and unknown IDs - no browser or LLM."""
+
+import asyncio
+import os
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp", "src")
+sys.path.insert(0, SRC)
+
+from test_support import isolate  # noqa: E402
+
+isolate(JOB_ISOLATION="thread")
+
+import server  # noqa: E402
+from job_store import JOB_STAGES, job_store  # noqa: E402
+
+
+class RecordingContext:
+    """Stands in for the MCP Context, keeping every progress report"""
+
+    def __init__(self):
+        self.reports = []
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.reports.append((progress, total, message))
+
+
+async def drive(job_id, updates, delay=0.05):
+    for fields in updates:
+        await asyncio.sleep(delay)
+        job_store.update(job_id, **fields)
+
+
+async def test_stages():
+    job_id = "post-job"
+    job_store.create(job_id, "post", {"product_info": {"title": "Desk"}})
+    stages = JOB_STAGES["post"]
+    updates = [{"status": "running", "stage": stage} for stage in stages[1:-1]]
+    updates.append(
+        {
+            "status": "completed",
+            "stage": "completed",
+            "result": "Posted",
+            "completed_at": time.time(),
+        }
+    )
+    ctx = RecordingContext()
+    response, _ = await asyncio.gather(
+        server.wait_for_job(job_id, timeout=5, ctx=ctx), drive(job_id, updates)
+    )
+
+    expected = [(n, len(stages), stage) for n, stage in enumerate(stages, 1)]
+    if ctx.reports == expected:
+        print(f"✅ Progress reported for each of the {len(stages)} post stages")
+    else:
+        print(f"❌ Progress reports: {ctx.reports}")
+        return 1
+    if response["status"] == "completed" and response["result"] == "Posted":
+        print("✅ Returned the result once the job finished")
+        return 0
+    print(f"❌ Final response: {response}")
+    return 1
+
+
+async def test_bulk_items():
+    job_id = "bulk-job"
+    items = [{"title": name, "status": "pending"} for name in ("Lamp", "Rug")]
+    job_store.create(job_id, "bulk_post", {"items": items, "account": "default"})
+    posted = [dict(item, status="posted") for item in items]
+    updates = [
+        {"status": "running", "stage": "posting"},
+        {"items": [posted[0], items[1]]},
+        {"items": posted},
+        {"status": "completed", "stage": "completed", "completed_at": time.time()},
+    ]
+    ctx = RecordingContext()
+    response, _ = await asyncio.gather(
+        server.wait_for_job(job_id, timeout=5, ctx=ctx), drive(job_id, updates)
+    )
+    messages = [message for _, _, message in ctx.reports]
+    if messages == ["queued", "posting 0/2", "posting 1/2", "posting 2/2", "completed"]:
+        print(f"✅ Bulk post reported per item: {messages[1:-1]}")
+    else:
+        print(f"❌ Bulk progress: {messages}")
+        return 1
+    if response["items"] == posted:
+        print("✅ Item statuses returned with the job")
+        return 0
+    print(f"❌ Bulk response: {response}")
+    return 1
+
+
+async def test_timeout_and_not_found():
+    failures = 0
+    job_store.create("stuck-job", "search", {"query": "desk"})
+    start = time.perf_counter()
+    response = await server.wait_for_job("stuck-job", timeout=0.3)
+    elapsed = time.perf_counter() - start
+    if response.get("timed_out") and response["status"] == "queued" and elapsed < 1:
+        print(f"✅ Unfinished job returned timed_out after {elapsed:.2f}s")
+    else:
+        print(f"❌ Timeout response after {elapsed:.2f}s: {response}")
+        failures += 1
+
+    response = await server.wait_for_job("no-such-job", timeout=5)
+    if response["status"] == "not_found" and response.get("error"):
+        print("✅ Unknown job ID returned not_found")
+    else:
+        print(f"❌ Unknown job response: {response}")
+        failures += 1
+    return failures
+
+
+async def test_wait_for_job():
+    print("🧪 Testing wait_for_job against hand-driven jobs...")
+    failures = await test_stages()
+    failures += await test_bulk_items()
+    failures += await test_timeout_and_not_found()
+    print(
+        "\n✅ wait_for_job test complete!"
+        if not failures
+        else f"\n❌ {failures} failure(s)"
+    )
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(test_wait_for_job()) else 0)